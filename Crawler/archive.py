@@ -0,0 +1,268 @@
+"""
+Append-only, content-addressed archive of every fetched listing page, for offline re-extraction.
+When a site changes its markup, the SCHEMA_FOR_EXTRACTION fix used to need a full, polite live re-crawl.
+Now every page Output_Pipeline fetches is kept:
+    1. the raw HTML is Brotli compressed and appended to a pack file (pages-<n>.pack, rolled at MAX_PACK_BYTES),
+       keyed by its xxh3-128 hash, so an identical page crawled again costs nothing,
+    2. an SQLite index (archive.db) maps hash -> pack, offset & length, and records each capture
+       (url, site, entry_url, fetched_at, hash), queryable by URL and crawl time.
+Replay runs a schema (the site's own, or a JSON file being worked on) over the archived pages on all cores,
+no network, then organizes & normalizes the rows like a crawl would, and optionally writes them to the database.
+Pages answered 304 / byte-identical (page_cache.py) arrive without HTML and aren't archived again.
+
+Usage:: python archive.py stats                                   Pages, captures & size of the archive
+        python archive.py replay <site> [--schema file.json] [--since 2025-01-01] [--all-captures] [--workers N] [--write] [--csv file]
+"""
+
+import argparse, asyncio, csv, importlib, json, os, sqlite3, threading, time
+from concurrent.futures import ProcessPoolExecutor
+import brotli, xxhash
+import storage
+
+## CONTROL VARIABLES
+ARCHIVE_PAGES = True # False: pages are not archived while crawling
+ARCHIVE_DIR = os.path.join(storage.DATABASE_DIR, "archive")
+TEST_ARCHIVE_DIR = os.path.join(os.path.dirname(storage.TEST_DB_FILE), "archive")
+BROTLI_QUALITY = 5 # 0-11, 5 compresses listing pages ~10-20x in about a millisecond
+MAX_PACK_BYTES = 256 * 1024 * 1024 # A new pack file is started past this size
+REPLAY_BATCH = 32 # Pages per task sent to a replay worker
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY, -- xxh3-128 of the raw HTML
+    pack TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL, -- Compressed bytes
+    size INTEGER NOT NULL -- Raw bytes
+);
+CREATE TABLE IF NOT EXISTS captures (
+    url TEXT NOT NULL,
+    site TEXT NOT NULL,
+    entry_url TEXT, -- Category the page belongs to, for organize() on replay
+    page_number INTEGER,
+    fetched_at TEXT NOT NULL,
+    hash TEXT NOT NULL REFERENCES blobs(hash)
+);
+CREATE INDEX IF NOT EXISTS idx_captures_url_time ON captures(url, fetched_at);
+CREATE INDEX IF NOT EXISTS idx_captures_site_time ON captures(site, fetched_at);
+"""
+
+
+def page_hash(html):
+    return xxhash.xxh3_128_hexdigest(html.encode("utf-8"))
+
+
+class Page_Archive:
+    # Synchronous sqlite3 & file appends, the pipeline calls put() through asyncio.to_thread
+    def __init__(self, archive_dir=ARCHIVE_DIR, max_pack_bytes=MAX_PACK_BYTES):
+        self.archive_dir = archive_dir
+        self.max_pack_bytes = max_pack_bytes
+        self.lock = threading.Lock()
+        os.makedirs(archive_dir, exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(archive_dir, "archive.db"), check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        packs = sorted(file for file in os.listdir(archive_dir) if file.startswith("pages-") and file.endswith(".pack"))
+        self.pack = packs[-1] if packs else "pages-00001.pack"
+        self.stored_count = 0
+        self.duplicate_count = 0
+
+    def pack_path(self, pack):
+        return os.path.join(self.archive_dir, pack)
+
+    def next_pack(self):
+        number = int(self.pack[6:-5]) + 1
+        self.pack = f"pages-{number:05d}.pack"
+
+    def put(self, url, site, html, entry_url=None, page_number=None, fetched_at=None):
+        # Returns the page's hash, the HTML is only written if no capture had the same bytes
+        key = page_hash(html)
+        fetched_at = fetched_at or storage.now()
+        with self.lock:
+            if self.db.execute("SELECT 1 FROM blobs WHERE hash = ?", (key,)).fetchone() is None:
+                data = brotli.compress(html.encode("utf-8"), quality=BROTLI_QUALITY)
+                path = self.pack_path(self.pack)
+                if os.path.exists(path) and os.path.getsize(path) + len(data) > self.max_pack_bytes:
+                    self.next_pack()
+                    path = self.pack_path(self.pack)
+                with open(path, mode='ab') as pack_file:
+                    offset = pack_file.tell()
+                    pack_file.write(data)
+                    pack_file.flush()
+                    os.fsync(pack_file.fileno()) # Bytes on disk before the index points at them
+                self.db.execute("INSERT INTO blobs (hash, pack, offset, length, size) VALUES (?, ?, ?, ?, ?)",
+                                (key, self.pack, offset, len(data), len(html.encode("utf-8"))))
+                self.stored_count += 1
+            else:
+                self.duplicate_count += 1
+            self.db.execute("INSERT INTO captures (url, site, entry_url, page_number, fetched_at, hash) VALUES (?, ?, ?, ?, ?, ?)",
+                            (url, site, entry_url, page_number, fetched_at, key))
+            self.db.commit()
+        return key
+
+    def get(self, key):
+        row = self.db.execute("SELECT pack, offset, length FROM blobs WHERE hash = ?", (key,)).fetchone()
+        return None if row is None else read_blob(self.pack_path(row["pack"]), row["offset"], row["length"])
+
+    def history(self, url):
+        # Every capture of a URL, oldest first, captures of the same second in the order they were stored
+        return [dict(row) for row in self.db.execute("SELECT * FROM captures WHERE url = ? ORDER BY fetched_at, rowid", (url,))]
+
+    def captures(self, site, since=None, until=None, latest_only=True):
+        # Captures of a site with their blob location, newest first, latest per URL unless latest_only is False
+        query = """
+            SELECT c.url, c.entry_url, c.page_number, c.fetched_at, c.hash, b.pack, b.offset, b.length
+            FROM captures c JOIN blobs b ON b.hash = c.hash
+            WHERE c.site = ? AND c.fetched_at >= ? AND c.fetched_at <= ?
+            """
+        rows = self.db.execute(query + " ORDER BY c.fetched_at DESC, c.rowid DESC", (site, since or "", until or "9999")).fetchall()
+        if latest_only:
+            latest = {}
+            for row in rows:
+                latest.setdefault(row["url"], row) # The first one is the newest
+            rows = list(latest.values())
+        return [dict(row) for row in rows]
+
+    def stats(self):
+        blobs = self.db.execute("SELECT COUNT(*), COALESCE(SUM(length), 0), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+        captures = self.db.execute("SELECT site, COUNT(*), COUNT(DISTINCT url), MIN(fetched_at), MAX(fetched_at) FROM captures GROUP BY site").fetchall()
+        return blobs, captures
+
+    def report(self):
+        return f"ARCHIVE: {self.stored_count} pages stored, {self.duplicate_count} identical to an archived page."
+
+
+# ARCHIVES SHARED BY EVERY PIPELINE IN THE PROCESS, OPENED ON FIRST USE
+ARCHIVES = {}
+ARCHIVES_LOCK = threading.Lock() # Pipelines archive from worker threads, one Page_Archive (and pack writer) per directory
+
+def get_archive(archive_dir=ARCHIVE_DIR):
+    with ARCHIVES_LOCK:
+        if archive_dir not in ARCHIVES:
+            ARCHIVES[archive_dir] = Page_Archive(archive_dir)
+        return ARCHIVES[archive_dir]
+
+def archive_page(archive_dir, url, site, html, entry_url=None, page_number=None):
+    # Called by Output_Pipeline.fetch through asyncio.to_thread
+    return get_archive(archive_dir).put(url, site, html, entry_url, page_number)
+
+def latest_html(archive_dir, url):
+    # Last archived HTML of a URL, "" if never archived
+    history = get_archive(archive_dir).history(url)
+    return get_archive(archive_dir).get(history[-1]["hash"]) if history else ""
+
+
+## REPLAY, IN WORKER PROCESSES
+def read_blob(path, offset, length):
+    with open(path, mode='rb') as pack_file:
+        pack_file.seek(offset)
+        return brotli.decompress(pack_file.read(length)).decode("utf-8")
+
+def extract_batch(archive_dir, schema, css_selector, captures):
+    # Worker: decompress & extract a batch of captures, returns (capture, extracted items) pairs
+    from extraction_engine import compile_schema
+    compiled = compile_schema(schema)
+    return [(capture, compiled.extract(read_blob(os.path.join(archive_dir, capture["pack"]), capture["offset"], capture["length"]), css_selector))
+            for capture in captures]
+
+
+async def replay(site_name, schema_file=None, since=None, until=None, latest_only=True, workers=None, write=False, csv_file=None, archive_dir=ARCHIVE_DIR):
+    from main import SITES
+    import normalize
+    site = importlib.import_module(SITES.get(site_name, site_name))
+    schema = site.SCHEMA_FOR_EXTRACTION
+    if schema_file:
+        with open(schema_file, encoding="utf-8") as file:
+            schema = json.load(file)
+    # One Output_Pipeline per category, for organize() (category names, URL building) & its css_selector
+    pipelines = {}
+    for crawl_number in range(len(site.URLS_TO_CRAWL)):
+        output_pipeline = site.Output_Pipeline(crawl_number=crawl_number)
+        pipelines.setdefault(output_pipeline.entry_url, output_pipeline)
+    css_selector = next(iter(pipelines.values())).get_crawler_config().css_selector
+    captures = get_archive(archive_dir).captures(site.Output_Pipeline.site, since, until, latest_only)
+    if not captures:
+        print(f"No archived pages of {site_name} in {archive_dir}.")
+        return []
+
+    start_time = time.perf_counter()
+    batches = [captures[start:start + REPLAY_BATCH] for start in range(0, len(captures), REPLAY_BATCH)]
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = await asyncio.gather(*(loop.run_in_executor(executor, extract_batch, archive_dir, schema, css_selector, batch) for batch in batches))
+    extract_time = time.perf_counter() - start_time
+
+    records = []
+    empty_pages = 0
+    for capture, extracted in (pair for batch in results for pair in batch):
+        output_pipeline = pipelines.get(capture["entry_url"])
+        products = extracted and output_pipeline and normalize.normalize_records(output_pipeline.organize(extracted), base_url=capture["url"])
+        if not products:
+            empty_pages += 1
+            continue
+        products = output_pipeline.drop_duplicates(products) # Captures come newest first, a product keeps its latest price & name
+        records.extend(dict(product, site=site.Output_Pipeline.site) for product in products)
+    elapsed = time.perf_counter() - start_time
+    print(f"REPLAYED {len(captures)} archived pages of {site_name} in {elapsed:.2f}s ({len(captures) / elapsed:.0f} pages/s, extraction {extract_time:.2f}s on {workers or os.cpu_count()} workers).")
+    print(f"{len(records)} products, {empty_pages} pages without products.")
+
+    if write:
+        import dedup
+        # Into the URL index too (like Output_Pipeline.write), an incremental crawl knows the replayed products
+        index = await dedup.get_index(dedup.INDEX_FILE, storage.DB_FILE)
+        try:
+            store = await storage.get_store(storage.DB_FILE)
+            new_count = await store.upsert(records)
+            for record in records:
+                if record.get("url"):
+                    index.add(record["url"])
+            dedup.save_indexes()
+        finally:
+            await storage.close_stores()
+        print(f"Written to {storage.DB_FILE}, {new_count} new products.")
+    if csv_file:
+        with open(csv_file, mode='w', newline='', encoding='utf-8') as file:
+            writer = csv.DictWriter(file, fieldnames=storage.COLUMNS, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(records)
+        print(f"Saved to {csv_file}.")
+    return records
+
+
+def print_stats(archive_dir=ARCHIVE_DIR):
+    (blob_count, compressed, raw), captures = get_archive(archive_dir).stats()
+    ratio = raw / compressed if compressed else 0
+    print(f"{blob_count} distinct pages, {compressed / 1024 ** 2:.1f} MB compressed ({raw / 1024 ** 2:.1f} MB raw, {ratio:.1f}x) in {archive_dir}.")
+    for site, capture_count, url_count, first, last in captures:
+        print(f"    {site}: {capture_count} captures of {url_count} URLs, {first} .. {last}")
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Archive of fetched listing pages & offline re-extraction.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats", help="Pages, captures & size of the archive")
+    replay_parser = commands.add_parser("replay", help="Run a schema over the archived pages of a site")
+    replay_parser.add_argument("site", help="gsmarena, startech, ryans, vertech (or a configs module name)")
+    replay_parser.add_argument("--schema", help="JSON file with the schema to try (default: the site's SCHEMA_FOR_EXTRACTION)")
+    replay_parser.add_argument("--since", help="Captures fetched at or after this ISO time")
+    replay_parser.add_argument("--until", help="Captures fetched at or before this ISO time")
+    replay_parser.add_argument("--all-captures", action="store_true", help="Every capture, not only the latest per URL")
+    replay_parser.add_argument("--workers", type=int, help="Worker processes (default: all cores)")
+    replay_parser.add_argument("--write", action="store_true", help="Upsert the products into the database")
+    replay_parser.add_argument("--csv", help="Also save the products to this CSV")
+    for command in commands.choices.values():
+        command.add_argument("--archive-dir", default=ARCHIVE_DIR)
+    return parser.parse_args(argv)
+
+async def main(argv=None):
+    arguments = parse_arguments(argv)
+    if arguments.command == "stats":
+        print_stats(arguments.archive_dir)
+    else:
+        await replay(arguments.site, arguments.schema, arguments.since, arguments.until, not arguments.all_captures,
+                     arguments.workers, arguments.write, arguments.csv, arguments.archive_dir)
+
+if __name__ == '__main__':
+    asyncio.run(main())
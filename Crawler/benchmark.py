@@ -0,0 +1,361 @@
+"""
+Offline benchmark suite, measures the crawler without touching the live sites.
+    record: listing pages of a site are fetched ONCE (through the site's own fetcher & config, so browser sites
+            are saved as rendered HTML) into trials/fixtures/<site>/page_<n>.html
+    run:    a local aiohttp stand-in server serves those fixtures with configurable latency, jitter & error rate,
+            the site's Output_Pipeline crawls it through each engine in ENGINES, into a throwaway database.
+Reported per site & engine: pages/sec, p50/p99 page latency, extraction time per schema, writer throughput,
+peak RSS. Every result is appended to trials/bench_results.jsonl and compared with the previous run, so
+regressions show up as a drop from one run to the next.
+
+Fixtures are replayed over plain HTTP (FETCH_MODE "http"), they are already rendered.
+
+Usage:: python benchmark.py record <site> [pages]          Save listing pages of gsmarena/startech/ryans/vertech
+        python benchmark.py run [site ...] [options]        Benchmark every recorded site, see --help
+"""
+
+import argparse, asyncio, contextlib, importlib, io, json, os, random, re, shutil, sys, tempfile, time
+from datetime import datetime, timezone
+import psutil
+from aiohttp import web
+import storage, dedup, page_cache, http_fetcher, rate_limiter, worker_pool
+from extraction_engine import compile_schema
+from main import SITES
+
+## CONTROL VARIABLES
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "trials", "fixtures")
+RESULTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "trials", "bench_results.jsonl")
+RECORD_PAGES = 5 # Listing pages saved per site
+LATENCY_MS = 50 # Stand-in server response time
+JITTER_MS = 20 # +/- uniform around LATENCY_MS
+ERROR_RATE = 0.0 # Share of requests answered 503 (the rate limiter backs off & retries them)
+REPEAT_PAGES = 20 # The recorded pages are served this many times over, as one long category
+EXTRACTION_REPEAT = 20 # Passes over the fixtures when timing extraction alone
+WRITER_ROWS = 20_000 # Rows upserted when timing the writer alone
+RSS_SAMPLE_INTERVAL = 0.02 # Seconds
+BENCH_MAX_RATE = 1000.0 # Requests/sec allowed by the benchmark's own rate limiter, the server's latency is what's measured
+SEED = 1 # Same latency & errors on every run
+QUIET = True # Hide the pipeline's per-page log while benchmarking
+EMPTY_PAGE = "<html><body></body></html>" # Past the last page, the category ends like a real one
+HREF = re.compile(r'href="([^"#]*)')
+
+
+## FIXTURES
+def fixture_dir(name):
+    return os.path.join(FIXTURE_DIR, name)
+
+def load_fixtures(name):
+    directory = fixture_dir(name)
+    if not os.path.isdir(directory):
+        return []
+    files = sorted((file for file in os.listdir(directory) if file.startswith("page_")), key=lambda file: int(file[5:-5]))
+    pages = []
+    for file in files:
+        with open(os.path.join(directory, file), encoding="utf-8") as html_file:
+            pages.append(html_file.read())
+    return pages
+
+async def record(name, pages=RECORD_PAGES):
+    site = importlib.import_module(SITES[name])
+    output_pipeline = site.Output_Pipeline()
+    directory = fixture_dir(name)
+    os.makedirs(directory, exist_ok=True)
+    manifest = {"site": name, "entry_url": output_pipeline.entry_url, "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"), "pages": []}
+    async with http_fetcher.get_crawler(site) as crawler:
+        for page_number in range(1, pages + 1):
+            url = output_pipeline.page_url(page_number)
+            result = await rate_limiter.RATE_LIMITER.fetch(crawler=crawler, url=url, config=output_pipeline.get_crawler_config(), initial_interval=site.DELAY_TIME)
+            if not result.success or not json.loads(result.extracted_content or "[]"):
+                print(f"Page {page_number} failed or has no products ({result.error_message}), stopping.")
+                break
+            with open(os.path.join(directory, f"page_{page_number}.html"), mode='w', encoding='utf-8') as html_file:
+                html_file.write(result.html)
+            manifest["pages"].append({"page": page_number, "url": url, "bytes": len(result.html.encode("utf-8"))})
+            print(f"Recorded page {page_number} of {name}.")
+    with open(os.path.join(directory, "manifest.json"), mode='w', encoding='utf-8') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    print(f"{len(manifest['pages'])} pages of {name} saved in {directory}.")
+
+
+## STAND-IN SERVER
+def repeated_page(html, repeat_number):
+    # Product links get ?bench=<n> on every pass after the first, or the pipeline drops them as duplicates and stops
+    if repeat_number == 0:
+        return html
+    return HREF.sub(lambda match: f'href="{match.group(1)}{"&" if "?" in match.group(1) else "?"}bench={repeat_number}', html)
+
+
+class Stand_In_Server:
+    # GET /<site>/<page number>, fixture pages in a loop REPEAT_PAGES times, then an empty page
+    def __init__(self, fixtures, latency_ms=LATENCY_MS, jitter_ms=JITTER_MS, error_rate=ERROR_RATE, repeat=REPEAT_PAGES, seed=SEED):
+        self.fixtures = fixtures # site name -> list of page HTML
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.repeat = repeat
+        self.random = random.Random(seed)
+        self.pages = {} # (site, page number) -> HTML served
+        self.runner = None
+        self.url = None
+        self.request_count = 0
+        self.error_count = 0
+
+    async def handle(self, request):
+        self.request_count += 1
+        await asyncio.sleep(max(0.0, self.latency_ms + self.random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000)
+        if self.random.random() < self.error_rate:
+            self.error_count += 1
+            return web.Response(status=503, text="Service Unavailable")
+        return web.Response(text=self.page(request.match_info["site"], int(request.match_info["page"])), content_type="text/html")
+
+    def page(self, name, page_number):
+        pages = self.fixtures.get(name, [])
+        if not pages or not 1 <= page_number <= len(pages) * self.repeat:
+            return EMPTY_PAGE
+        if (name, page_number) not in self.pages:
+            repeat_number, index = divmod(page_number - 1, len(pages))
+            # Recorded pagination links point at the live site, the stand-in category gets its own
+            pagination = f'<div class="bench-pages"><a href="/{name}/{len(pages) * self.repeat}">Last</a></div>'
+            self.pages[(name, page_number)] = repeated_page(pages[index], repeat_number) + pagination
+        return self.pages[(name, page_number)]
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/{site}/{page:\\d+}", self.handle)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, "127.0.0.1", 0).start() # Any free port
+        self.url = "http://127.0.0.1:{}".format(self.runner.addresses[0][1])
+        return self
+
+    async def close(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+## ENGINES, EACH CRAWLS ONE Output_Pipeline TO THE END OF ITS CATEGORY
+async def run_staged(output_pipeline, crawler):
+    await output_pipeline.run(crawler)
+
+async def run_sequential(output_pipeline, crawler):
+    while await output_pipeline(crawler):
+        pass
+
+async def run_inline(output_pipeline, crawler):
+    pool = worker_pool.PROCESS_POOL
+    worker_pool.PROCESS_POOL = False
+    try:
+        await output_pipeline.run(crawler)
+    finally:
+        worker_pool.PROCESS_POOL = pool
+
+async def run_in_order(output_pipeline, crawler):
+    await output_pipeline.run_in_order(crawler)
+
+ENGINES = {
+    "pipeline": run_staged, # Output_Pipeline.run(), page count from the pagination & all pages fetched concurrently
+    "in_order": run_in_order, # Staged, in order until an empty page, fetch, extraction & writing overlap
+    "inline": run_inline, # Output_Pipeline.run(), extraction & normalization on the event loop instead of worker_pool's processes
+    "sequential": run_sequential, # One page at a time, as before the staged pipeline
+}
+
+
+## MEASUREMENTS
+def time_fetches(crawler):
+    # Records how long every arun() takes (server time + transfer + in-fetcher extraction)
+    # Patched on the instance, the pipeline still sees an Http_Crawler (conditional requests)
+    latencies = []
+    arun = crawler.arun
+
+    async def timed_arun(*args, **kwargs):
+        start_time = time.perf_counter()
+        try:
+            return await arun(*args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - start_time)
+
+    crawler.arun = timed_arun
+    return latencies
+
+
+class Rss_Sampler:
+    def __init__(self, interval=RSS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.process = psutil.Process()
+        self.peak = self.process.memory_info().rss
+        self.task = None
+
+    async def sample(self):
+        while True:
+            self.peak = max(self.peak, self.process.memory_info().rss)
+            await asyncio.sleep(self.interval)
+
+    def __enter__(self):
+        self.task = asyncio.create_task(self.sample())
+        return self
+
+    def __exit__(self, *exc_info):
+        self.task.cancel()
+        self.peak = max(self.peak, self.process.memory_info().rss)
+
+
+def percentile(values, percent):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))]
+
+def time_extraction(site, pages):
+    # ms per page, the compiled schema alone, as http_fetcher applies it
+    schema = compile_schema(site.SCHEMA_FOR_EXTRACTION)
+    css_selector = getattr(site, "CSS_SELECTOR", None)
+    start_time = time.perf_counter()
+    for _ in range(EXTRACTION_REPEAT):
+        for page in pages:
+            schema.extract(page, css_selector)
+    return (time.perf_counter() - start_time) * 1000 / (EXTRACTION_REPEAT * len(pages))
+
+async def time_writer(work_dir, rows=WRITER_ROWS, batch_size=50):
+    # rows/sec upserted into a fresh database, one transaction per batch like one listing page
+    records = [{"site": "bench", "category": "Bench", "name": f"Product {number}", "price": 1000 + number, "url": f"https://bench.local/product/{number}"}
+               for number in range(rows)]
+    async with storage.Product_Store(os.path.join(work_dir, "writer.db")) as store:
+        start_time = time.perf_counter()
+        for start in range(0, rows, batch_size):
+            await store.upsert(records[start:start + batch_size], count_new=False)
+        elapsed = time.perf_counter() - start_time
+    return rows / elapsed
+
+
+async def bench_engine(name, site, engine, server, work_dir):
+    class Stand_In_Pipeline(site.Output_Pipeline):
+        def page_url(self, page_number):
+            return f"{server.url}/{name}/{page_number}"
+
+    output_pipeline = Stand_In_Pipeline()
+    output_pipeline.db_file = os.path.join(work_dir, f"{name}-{engine}.db")
+    output_pipeline.index_file = os.path.join(work_dir, f"{name}-{engine}.bin")
+    output_pipeline.archive_dir = os.path.join(work_dir, "archive")
+    output_pipeline.rate_limiter = rate_limiter.Host_Rate_Limiter(max_rate=BENCH_MAX_RATE)
+    output_pipeline.delay_time = 1 / BENCH_MAX_RATE
+    output_pipeline.test_mode = False
+    site.FETCH_MODE = "http"
+    log = io.StringIO() if QUIET else sys.stdout
+    async with http_fetcher.get_crawler(site) as crawler:
+        latencies = time_fetches(crawler)
+        with Rss_Sampler() as rss, contextlib.redirect_stdout(log):
+            start_time = time.perf_counter()
+            await ENGINES[engine](output_pipeline, crawler)
+            elapsed = time.perf_counter() - start_time
+    await storage.close_stores()
+    dedup.INDEXES.pop(output_pipeline.index_file, None)
+    page_cache.CACHES.pop(output_pipeline.db_file, None)
+    return {
+        "pages": output_pipeline.crawled_page_count,
+        "products": output_pipeline.product_count,
+        "pages_per_sec": output_pipeline.crawled_page_count / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "peak_rss_mb": rss.peak / 1024 ** 2,
+    }
+
+
+## REPORT
+def previous_results():
+    previous = {}
+    if os.path.exists(RESULTS_FILE):
+        with open(RESULTS_FILE, encoding="utf-8") as results_file:
+            for line in results_file:
+                result = json.loads(line)
+                previous[(result["site"], result["engine"])] = result
+    return previous
+
+def change(current, before, key):
+    if not before or not before.get(key):
+        return ""
+    return f" ({(current[key] - before[key]) / before[key]:+.0%})"
+
+def print_result(result, before):
+    print(f"{result['site']:<9} {result['engine']:<11} {result['pages']:>5} pages  "
+          f"{result['pages_per_sec']:8.1f} pages/s{change(result, before, 'pages_per_sec')}  "
+          f"p50 {result['p50_ms']:6.1f} ms  p99 {result['p99_ms']:6.1f} ms{change(result, before, 'p99_ms')}  "
+          f"extract {result['extraction_ms']:5.2f} ms/page  writer {result['writer_rows_per_sec']:,.0f} rows/s  "
+          f"peak RSS {result['peak_rss_mb']:.0f} MB")
+
+
+async def run(names, engines, latency_ms=LATENCY_MS, jitter_ms=JITTER_MS, error_rate=ERROR_RATE, repeat=REPEAT_PAGES):
+    fixtures = {name: load_fixtures(name) for name in names}
+    for name in [name for name, pages in fixtures.items() if not pages]:
+        print(f"No fixtures for {name}, record them first: python benchmark.py record {name}")
+        del fixtures[name]
+    if not fixtures:
+        return []
+    import normalize # Loaded by the pipeline on its first page, imported here so no engine's timing pays for it
+    previous = previous_results()
+    results = []
+    work_dir = tempfile.mkdtemp(prefix="crawler-bench-")
+    try:
+        writer_rows_per_sec = await time_writer(work_dir)
+        async with Stand_In_Server(fixtures, latency_ms, jitter_ms, error_rate, repeat) as server:
+            print(f"Stand-in server at {server.url}: {latency_ms} ms +/- {jitter_ms} ms latency, {error_rate:.0%} errors.")
+            for name, pages in fixtures.items():
+                site = importlib.import_module(SITES[name])
+                extraction_ms = time_extraction(site, pages)
+                for engine in engines:
+                    result = {
+                        "site": name,
+                        "engine": engine,
+                        "at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                        "latency_ms": latency_ms,
+                        "error_rate": error_rate,
+                        **await bench_engine(name, site, engine, server, work_dir),
+                        "extraction_ms": extraction_ms,
+                        "writer_rows_per_sec": writer_rows_per_sec,
+                    }
+                    print_result(result, previous.get((name, engine)))
+                    results.append(result)
+            print(f"Stand-in server answered {server.request_count} requests, {server.error_count} with errors.")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    os.makedirs(os.path.dirname(RESULTS_FILE), exist_ok=True)
+    with open(RESULTS_FILE, mode='a', encoding='utf-8') as results_file:
+        for result in results:
+            results_file.write(json.dumps(result) + "\n")
+    return results
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Offline crawler benchmarks on recorded fixtures.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record_parser = commands.add_parser("record", help="Save listing pages of a site as fixtures (needs the network)")
+    record_parser.add_argument("site", choices=SITES)
+    record_parser.add_argument("pages", nargs="?", type=int, default=RECORD_PAGES)
+    run_parser = commands.add_parser("run", help="Benchmark recorded sites against the stand-in server")
+    run_parser.add_argument("sites", nargs="*", help=f"Sites to benchmark, of {', '.join(SITES)} (default: every recorded one)")
+    run_parser.add_argument("--engine", action="append", choices=ENGINES, help="Engine to benchmark, repeatable (default: all)")
+    run_parser.add_argument("--latency", type=float, default=LATENCY_MS, help="Server latency in ms")
+    run_parser.add_argument("--jitter", type=float, default=JITTER_MS, help="+/- ms around the latency")
+    run_parser.add_argument("--error-rate", type=float, default=ERROR_RATE, help="Share of requests answered 503")
+    run_parser.add_argument("--repeat", type=int, default=REPEAT_PAGES, help="Times the recorded pages are served over")
+    arguments = parser.parse_args(argv)
+    unknown = [name for name in getattr(arguments, "sites", []) if name not in SITES]
+    if unknown:
+        parser.error(f"unknown site {', '.join(unknown)}, choose from {', '.join(SITES)}")
+    return arguments
+
+async def main(argv=None):
+    arguments = parse_arguments(argv)
+    if arguments.command == "record":
+        await record(arguments.site, arguments.pages)
+    else:
+        names = arguments.sites or [name for name in SITES if load_fixtures(name)] or list(SITES)
+        await run(names, arguments.engine or list(ENGINES), arguments.latency, arguments.jitter, arguments.error_rate, arguments.repeat)
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,145 @@
+"""
+Pool of browser tabs inside ONE Chromium, for parallel page loads with predictable memory.
+Every crawl used to share one fixed session_id (one tab), so browser pages loaded one at a time,
+and a second AsyncWebCrawler for parallelism costs a whole browser process.
+Browser_Pool keeps POOL_SIZE crawl4ai sessions (tabs) in one AsyncWebCrawler and lends one per arun():
+    1. session IDs rotate per tab, so concurrent page loads never share a page,
+    2. a tab is health checked before use and replaced if it closed or stopped responding,
+    3. a tab is recycled after RECYCLE_AFTER pages, long lived pages grow (JS heaps, caches).
+It has the same arun(url, config) call as AsyncWebCrawler, so the rate limiter and Output_Pipeline use it unchanged.
+"""
+
+import asyncio, copy
+from crawl4ai import AsyncWebCrawler
+from metrics import METRICS, log
+
+## CONTROL VARIABLES
+POOL_SIZE = 8 # Open tabs = max concurrent page loads, ~30-80 MB each instead of a browser each
+RECYCLE_AFTER = 50 # Pages loaded in a tab before it is closed & reopened
+HEALTH_CHECK_TIMEOUT = 5 # Seconds for a tab to answer before it is replaced
+CRASH_ERRORS = ("Target closed", "Target page, context or browser has been closed", "crashed", "Browser closed")
+
+
+def is_crash(result):
+    return not result.success and any(error in (result.error_message or "") for error in CRASH_ERRORS)
+
+
+def with_session(config, session_id):
+    # Shallow copy, CrawlerRunConfig.clone() deep copies the strategies (~30 ms a page)
+    config = copy.copy(config)
+    config.session_id = session_id
+    return config
+
+
+class Pool_Slot:
+    # One tab, session_id changes every time the tab is recycled
+    def __init__(self, prefix, number):
+        self.prefix = prefix
+        self.number = number
+        self.generation = 0
+        self.page_count = 0
+
+    @property
+    def session_id(self):
+        return f"{self.prefix}-{self.number}-{self.generation}"
+
+    def rotate(self):
+        self.generation += 1
+        self.page_count = 0
+
+
+class Browser_Pool:
+    def __init__(self, browser_config=None, size=POOL_SIZE, recycle_after=RECYCLE_AFTER, prefix="pool", render_profile=None):
+        self.crawler = AsyncWebCrawler(config=browser_config)
+        self.render_profile = render_profile # Blocks images, fonts & trackers in every tab, see render_profiles.py
+        if render_profile is not None:
+            self.crawler.crawler_strategy.set_hook("on_page_context_created", render_profile.attach)
+        self.size = size
+        self.recycle_after = recycle_after
+        self.slots = [Pool_Slot(prefix, number) for number in range(size)]
+        self.idle = asyncio.Queue()
+        for slot in self.slots:
+            self.idle.put_nowait(slot)
+        self.page_count = 0
+        self.recycled_count = 0
+        self.unhealthy_count = 0
+
+    async def start(self):
+        await self.crawler.start()
+        return self
+
+    async def close(self):
+        for slot in self.slots:
+            await self.kill(slot)
+        await self.crawler.close()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+        log(f"BROWSER POOL: {self.page_count} pages in {self.size} tabs, {self.recycled_count} tabs recycled ({self.unhealthy_count} unhealthy).",
+            event="browser_pool", pages=self.page_count, tabs=self.size, recycled=self.recycled_count, unhealthy=self.unhealthy_count)
+        if self.render_profile is not None:
+            log(self.render_profile.report(), event="render_profile", blocked=self.render_profile.blocked_count, allowed=self.render_profile.allowed_count)
+
+    @property
+    def sessions(self):
+        # crawl4ai's session_id -> (context, page, last_used)
+        return self.crawler.crawler_strategy.browser_manager.sessions
+
+    ## TAB LIFECYCLE
+    async def kill(self, slot):
+        # Closes the page only, crawl4ai shares one context between tabs with the same config
+        # (its own kill_session closes that shared context too, breaking the other tabs)
+        session = self.sessions.pop(slot.session_id, None)
+        if session is None:
+            return
+        try:
+            await session[1].close()
+        except Exception as error:
+            log(f"BROWSER POOL: closing tab {slot.session_id} failed: {error!r}", event="tab_close_failed", session_id=slot.session_id)
+
+    async def recycle(self, slot):
+        await self.kill(slot)
+        slot.rotate()
+        self.recycled_count += 1
+
+    async def is_healthy(self, slot):
+        session = self.sessions.get(slot.session_id)
+        if session is None:
+            return True # Not opened yet, crawl4ai opens it on first use
+        page = session[1]
+        if page.is_closed():
+            return False
+        try:
+            await asyncio.wait_for(page.evaluate("1"), HEALTH_CHECK_TIMEOUT)
+        except Exception:
+            return False
+        return True
+
+    ## CRAWLING
+    async def arun(self, url, config, **kwargs):
+        slot = await self.idle.get() # Waits here while every tab is busy
+        try:
+            if not await self.is_healthy(slot):
+                log(f"BROWSER POOL: tab {slot.session_id} unhealthy, replacing it.", event="tab_unhealthy", session_id=slot.session_id)
+                self.unhealthy_count += 1
+                METRICS.inc("unhealthy_tabs")
+                await self.recycle(slot)
+            try:
+                with METRICS.time("render"):
+                    result = await self.crawler.arun(url, config=with_session(config, slot.session_id), **kwargs)
+            except Exception:
+                await self.recycle(slot) # Tab state unknown after a failed load
+                raise
+            slot.page_count += 1
+            self.page_count += 1
+            if is_crash(result):
+                self.unhealthy_count += 1
+                await self.recycle(slot)
+            elif slot.page_count >= self.recycle_after:
+                await self.recycle(slot)
+            return result
+        finally:
+            self.idle.put_nowait(slot)
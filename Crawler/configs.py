@@ -3,17 +3,23 @@ This script has all CONFIGURATION SETTINGS TO RUN CRAWLER FROM main.py
 Change configuration based on website & crawling strategy
 """
 
-import os, csv, json, asyncio
+import pipeline
 from pydantic import BaseModel
-from crawl4ai import BrowserConfig, CrawlerRunConfig, LLMConfig, LLMExtractionStrategy, JsonCssExtractionStrategy, CacheMode
+from http_fetcher import Http_Config
+# crawl4ai is imported inside the functions below, it loads its whole LLM stack (slow start for cron crawls)
+from render_profiles import Render_Profile
 
 ## CONTROL VARIABLES
 TEST_MODE = False
 CRAWL_NUMBER = 16
 PAGE_NUMBER = 1
 DELAY_TIME = 5
-MAIN_FILE= "D:/My Codes/Projects/Project-001/Database/gsmarena_products.csv"
-TEST_FILE= "D:/My Codes/Projects/Project-001/Crawler/trials/test_csv.csv"
+INCREMENTAL = False # True: daily delta crawl, stop a category at the first page of only known products (listing is newest first)
+FETCH_MODE = "http" # "http": server-rendered pages fetched without a browser (http_fetcher.py), "browser": Chromium
+SESSION_ID = "project-002"
+CRAWL_ALL = False # Crawl every entry of URLS_TO_CRAWL concurrently through scheduler.py
+MAX_CONCURRENT_CRAWLS = 4 # Global cap on categories crawled at once
+MAX_CRAWLS_PER_HOST = 2 # Cap on categories crawled at once from the same website
 URLS_TO_CRAWL = [
     {"brand": "Samsung", "url": "https://www.gsmarena.com/samsung-phones-f-9-0-p.php"},
     {"brand": "Apple", "url": "https://www.gsmarena.com/apple-phones-f-48-0-p.php"},
@@ -77,116 +83,54 @@ class Products(BaseModel):
     url : str
 
 def get_browser_config():
+    from crawl4ai import BrowserConfig
     return BrowserConfig(
         browser_type='chromium',
         headless=False,
         verbose=True
     ) 
 
-def get_crawler_config():
+RENDER_PROFILE = Render_Profile("gsmarena") # Browser path only, see render_profiles.py
+
+def get_crawler_config(session_id=SESSION_ID):
+    if FETCH_MODE == "http":
+        return Http_Config(css_selector=".makers", schema=SCHEMA_FOR_EXTRACTION, session_id=session_id)
+    from crawl4ai import CrawlerRunConfig, CacheMode
+    from css_strategy import get_strategy
     return CrawlerRunConfig(
             css_selector=".makers",
-            extraction_strategy=JsonCssExtractionStrategy(SCHEMA_FOR_EXTRACTION),
-            session_id="project-002",
-            cache_mode=CacheMode.BYPASS
+            extraction_strategy=get_strategy(SCHEMA_FOR_EXTRACTION), # Compiled once, see css_strategy.py
+            session_id=session_id,
+            cache_mode=CacheMode.BYPASS,
+            **RENDER_PROFILE.run_config(".makers") # Wait for the listing only, ignored by the HTTP fast path
         )
 
 
 ## OUTPUT
-class Output_Pipeline:
-    def __init__(self):
-        self.page_number = PAGE_NUMBER
-        self.product_count = 0
-        self.crawled_page_count = 0
-        self.seen_product = set()
-        self.delay_time = DELAY_TIME
-        self.test_mode = TEST_MODE
-        self.main_file = MAIN_FILE
-        self.test_file = TEST_FILE
-    
-    # DYNAMICALLY UPDATE URL
-    @property
-    def url(self):
-        return BASE_URL + f"{self.page_number}.php"
-    
-    # WRITER METHOD
-    def csv_writer(self, file_to_be_written, product_info):
-        headers = ["Brand", "Model", "URL"]
-        file_exists = os.path.isfile(file_to_be_written)
-        with open(file_to_be_written, mode='a', newline='', encoding='utf-8') as file:
-            writer = csv.writer(file)
-
-        # Write header only if file is new, otherwise assume, there is already a header
-        if not file_exists:
-            writer.writerow(headers)
-        
-        for product in product_info:
-            row = [product.get(field, '') for field in headers]
-            writer.writerow(row)
-
-
-    async def __call__(self, crawler):
-        ## MODULE 1:: CRAWLING & EXTRACTION
-        # RUN THE CRAWLER
-        result = await crawler.arun(
-            url = self.url,
-            config=get_crawler_config()
+class Output_Pipeline(pipeline.Output_Pipeline):
+    site = "gsmarena"
+
+    def __init__(self, crawl_number=CRAWL_NUMBER, session_id=SESSION_ID):
+        super().__init__(
+            entry=URLS_TO_CRAWL[crawl_number],
+            session_id=session_id,
+            page_number=PAGE_NUMBER,
+            delay_time=DELAY_TIME,
+            test_mode=TEST_MODE,
+            incremental=INCREMENTAL
             )
-        # SEE IF THE CRAWLING WAS SUCCESSFUL
-        if not result.success:
-            print("STATUS: CRAWLING ERROR!!")
-            return False
-        print("STATUS: CRAWLING SUCCESSFUL. PROCESSING OUTPUT.")
-        # SEE IF EXTRACTION WAS SUCCESSFUL
-        extracted_data = json.loads(result.extracted_content)
-        if not extracted_data:
-            print(f"No products found in Page {self.page_number}.")
-            return False
-        print(f"PAGE NO: {self.page_number}, DATA EXTRACTION COMPLETED.")        
-        
-        
-        
-        # MODULE 2 :: ORGANIZE EXTRACTED DATA FOR WRITING (APPEND NEW DATA, CHECK FOR DUPLICATES)
-        new_products = []
-        model_entries = extracted_data[0].get("model", [])
-        for entry in model_entries:
-                relative_url = entry.get("model", "")
-                if relative_url:
-                    model_name = relative_url.split("-")[0].replace("_", " ").title()
-                    full_url = f"https://www.gsmarena.com/{relative_url}"
-                    new_products.append({"Brand": URLS_TO_CRAWL[CRAWL_NUMBER]['brand'], "Model": model_name, "URL": full_url})
-        print(f"Update: Page {self.page_number}: Extracted {len(new_products)} URLs.")
 
+    # URL OF A PAGE OF THE CATEGORY
+    def page_url(self, page_number):
+        return self.entry['url'][:-4] + f"{page_number}.php"
 
-        ## MODULE 3 :: WRITING
-        if self.test_mode:
-            print("RUNNING ON TEST MODE")
-            self.csv_writer(
-                file_to_be_written=self.test_file,
-                products=new_products
-                )
-        else:
-            self.csv_writer(
-                file_to_be_written=self.main_file,
-                products=new_products
-                )
-        
-        
-        ## MODUEL 4 :: COUNTERS
-        self.product_count = self.product_count + len(new_products)
-        self.crawled_page_count += 1
-        print(f"Update: Page {self.page_number}: Written {len(new_products)} new URLs to database. Total written: {self.product_count}")
-        if self.test_mode:
-            print(f"TEST MODE SUCCESSFUL. WAIT FOR FINAL LOG")
-            return False
-        self.page_number += 1
-        self.crawled_page_count += 1
-        # STOP IF NOTHING FOUND
-        if len(new_products) == 0:
-            print(f"No Products found in Page{self.page_number}")
-            return False            
-        # DELAY LOG
-        print(f"Proceeding to next page after {self.delay_time} seconds...")
-        await asyncio.sleep(self.delay_time) # Be polite and avoid overwhelming the server
+    def get_crawler_config(self):
+        return get_crawler_config(session_id=self.session_id)
 
-        return True
\ No newline at end of file
+    # ORGANIZE EXTRACTED DATA FOR WRITING
+    def organize(self, extracted_data):
+        import normalize
+        relative_urls = [entry.get("model", "") for entry in extracted_data[0].get("model", []) if entry.get("model")]
+        model_names = normalize.model_names(relative_urls) # Whole page at once
+        return [{"category": self.entry['brand'], "name": model_name, "url": f"https://www.gsmarena.com/{relative_url}"}
+                for relative_url, model_name in zip(relative_urls, model_names)]
@@ -2,11 +2,21 @@
 This script contains configuration settings for the main script. 
 Alter/Set configuration here to try Crawl/Extraction techniques.  
 """
-from crawl4ai import BrowserConfig, CrawlerRunConfig, LLMConfig, LLMExtractionStrategy, JsonCssExtractionStrategy, CacheMode
+import pipeline
+from http_fetcher import Http_Config
+# crawl4ai is imported inside the functions below, it loads its whole LLM stack (slow start for cron crawls)
 
+TEST_MODE = False
+CRAWL_NUMBER = 0
+PAGE_NUMBER = 1
+DELAY_TIME = 5
+INCREMENTAL = False # True: stop a category at the first page of only known products (only if the listing is sorted newest first)
+FETCH_MODE = "browser" # "http": server-rendered pages fetched without a browser (http_fetcher.py), "browser": Chromium
+SESSION_ID = "ryans-session"
 
 
 def get_browser_config():
+    from crawl4ai import BrowserConfig
     return BrowserConfig(
         browser_type='chromium', # Chrome Browser
         headless=False, # Headless == No GUI
@@ -16,9 +26,13 @@ def get_browser_config():
 
 
 def get_crawler_config(session_id, css_selector, schema): # ARGUMENTS THAT NEED TO BE PASSED FROM THE MAIN SCRIPT, MUST BE DEFINED BEFORE EXECUTING THIS FUNCTION
+    if FETCH_MODE == "http":
+        return Http_Config(css_selector=css_selector, schema=schema, session_id=session_id)
+    from crawl4ai import CrawlerRunConfig, CacheMode
+    from css_strategy import get_strategy
     return CrawlerRunConfig(
         session_id=session_id, # Unique session ID for the crawl
-        extraction_strategy=JsonCssExtractionStrategy(schema=schema),
+        extraction_strategy=get_strategy(schema), # Compiled once per schema, see css_strategy.py
         css_selector=css_selector,  # Decides what part of an encountered webpage crawler will crawl through
         cache_mode=CacheMode.BYPASS
     )
@@ -60,4 +74,35 @@ SCHEMA_FOR_EXTRACTION = {
 
 
 # CSS Selector for crawler
-CSS_SELECTOR = ".card.h-100"
\ No newline at end of file
+CSS_SELECTOR = ".card.h-100"
+
+
+## OUTPUT
+class Output_Pipeline(pipeline.Output_Pipeline):
+    site = "ryans"
+
+    def __init__(self, crawl_number=CRAWL_NUMBER, session_id=SESSION_ID):
+        super().__init__(
+            entry=URLS_TO_CRAWL[crawl_number],
+            session_id=session_id,
+            page_number=PAGE_NUMBER,
+            delay_time=DELAY_TIME,
+            test_mode=TEST_MODE,
+            incremental=INCREMENTAL
+            )
+
+    # URL OF A PAGE OF THE CATEGORY
+    def page_url(self, page_number):
+        return f"{self.entry['base_url']}?page={page_number}"
+
+    def get_crawler_config(self):
+        return get_crawler_config(session_id=self.session_id, css_selector=CSS_SELECTOR, schema=SCHEMA_FOR_EXTRACTION)
+
+    # ORGANIZE EXTRACTED DATA FOR WRITING
+    def organize(self, extracted_data):
+        new_products = []
+        for product in extracted_data:
+            product['category'] = self.entry['category']
+            product["description"] = [feature.get("feature", "") for feature in product.get("description", [])]
+            new_products.append(product)
+        return new_products
@@ -2,13 +2,20 @@
 This script has all CONFIGURATION SETTINGS TO RUN CRAWLER FROM main.py
 Change configuration based on website & crawling strategy
 """
-import os, csv
+import pipeline
 from pydantic import BaseModel
-from crawl4ai import BrowserConfig, CrawlerRunConfig, LLMConfig, LLMExtractionStrategy, JsonCssExtractionStrategy, CacheMode
+from http_fetcher import Http_Config
+# crawl4ai is imported inside the functions below, it loads its whole LLM stack (slow start for cron crawls)
+from render_profiles import Render_Profile
 
 TEST_MODE = False
-MAIN_FILE= "D:/My Codes/Projects/Project-001/Crawler/Database/Vertech_products.csv"
-TEST_FILE= "D:/My Codes/Projects/Project-001/Crawler/test_csv.csv"
+CRAWL_NUMBER = 0
+PAGE_NUMBER = 1
+DELAY_TIME = 5
+INCREMENTAL = False # True: stop a category at the first page of only known products (only if the listing is sorted newest first)
+FETCH_MODE = "browser" # "http": server-rendered pages fetched without a browser (http_fetcher.py), "browser": Chromium
+SESSION_ID = "vertech-session" # Prefix of the pooled tabs' session IDs
+POOL_SIZE = 8 # Browser tabs in the one Chromium, see browser_pool.py
 CSS_SELECTOR = r".grid.grid-cols-2"
 URLS_TO_CRAWL = [
     {"category": "Laptop", "base_url": "https://www.vertech.com.bd/category/laptop"},
@@ -19,18 +26,29 @@ URLS_TO_CRAWL = [
 
 ## CONFIGURATION SETTINGS
 def get_browser_config():
+    from crawl4ai import BrowserConfig
     return BrowserConfig(
         browser_type='chromium', # Chrome Browser
         headless=True, # Headless == No GUI
         verbose=True # Verbose logging
     ) 
 
+RENDER_PROFILE = Render_Profile(
+    "vertech",
+    blocked_patterns=(r"adminapi\.vertech\.com\.bd/.*\.(?:png|jpe?g|webp|gif|svg)", r"/_next/image\?") # Product images, src is still in the DOM
+    )
+
 def get_crawler_config(session_id, css_selector, schema): # ARGUMENTS THAT NEED TO BE PASSED FROM THE MAIN SCRIPT, MUST BE DEFINED BEFORE EXECUTING THIS FUNCTION
+    if FETCH_MODE == "http":
+        return Http_Config(css_selector=css_selector, schema=schema, session_id=session_id)
+    from crawl4ai import CrawlerRunConfig, CacheMode
+    from css_strategy import get_strategy
     return CrawlerRunConfig(
         session_id=session_id, # Unique session ID for the crawl
-        extraction_strategy=JsonCssExtractionStrategy(schema=schema),
+        extraction_strategy=get_strategy(schema), # Compiled once per schema, see css_strategy.py
         css_selector=css_selector,  # Decides what part of an encountered webpage crawler will crawl through
-        cache_mode=CacheMode.BYPASS
+        cache_mode=CacheMode.BYPASS,
+        **RENDER_PROFILE.run_config(css_selector) # Wait for the listing only, ignored by the HTTP fast path
     )
 
 ## SCHEMA FOR EXTRACTION
@@ -58,22 +76,33 @@ class Products(BaseModel):
     url : str
 
 
-## WRITING
-HEADERS = ['category'] + [field['name'] for field in SCHEMA_FOR_EXTRACTION['fields']]
+## OUTPUT
+class Output_Pipeline(pipeline.Output_Pipeline):
+    site = "vertech"
+
+    def __init__(self, crawl_number=CRAWL_NUMBER, session_id=SESSION_ID):
+        super().__init__(
+            entry=URLS_TO_CRAWL[crawl_number],
+            session_id=session_id,
+            page_number=PAGE_NUMBER,
+            delay_time=DELAY_TIME,
+            test_mode=TEST_MODE,
+            incremental=INCREMENTAL
+            )
 
-def custom_csv_writer(file_to_be_written, headers, products):    
-    file_exists = os.path.isfile(file_to_be_written)            # Write to CSV
-    with open(file_to_be_written, mode='a', newline='', encoding='utf-8') as file:
-        writer = csv.writer(file)
+    # URL OF A PAGE OF THE CATEGORY
+    def page_url(self, page_number):
+        return f"{self.entry['base_url']}?page={page_number}"
 
-        # Write header only if file is new, otherwise assume, there is already a header
-        if not file_exists:
-            writer.writerow(headers)
-        
-        # THIS SECTION IS EXTRACTION SPECIFIC::: Write as per extracted data
-        for product in products:
+    def get_crawler_config(self):
+        return get_crawler_config(session_id=self.session_id, css_selector=CSS_SELECTOR, schema=SCHEMA_FOR_EXTRACTION)
+
+    # ORGANIZE EXTRACTED DATA FOR WRITING
+    def organize(self, extracted_data):
+        new_products = []
+        for product in extracted_data:
+            product['category'] = self.entry['category']
             if "url" in product and not product["url"].startswith("http"):
                 product["url"] = "https://www.vertech.com.bd/" + product["url"]
-
-            row = [product.get('category', '')] + [product.get(field, '') for field in headers[1:]]
-            writer.writerow(row)
\ No newline at end of file
+            new_products.append(product)
+        return new_products
@@ -0,0 +1,30 @@
+"""
+Compiled extraction engine (extraction_engine.py) as a crawl4ai extraction strategy, for the browser path.
+Kept apart from the engine because importing crawl4ai loads its whole LLM stack (litellm, openai, ...),
+only crawls that go through Chromium import this module.
+"""
+
+from crawl4ai import JsonCssExtractionStrategy
+from extraction_engine import compile_schema
+from metrics import METRICS
+
+
+class Compiled_Css_Strategy(JsonCssExtractionStrategy):
+    # Drop-in for JsonCssExtractionStrategy inside CrawlerRunConfig, build once per site & reuse
+    # Holds only the schema dict, so it can still be copied/pickled like any crawl4ai strategy
+    def __init__(self, schema, **kwargs):
+        super().__init__(schema, **kwargs)
+        compile_schema(schema)
+
+    def extract(self, url, html_content, *q, **kwargs):
+        with METRICS.time("extraction"): # crawl4ai calls this inside arun(), on the page's task
+            return compile_schema(self.schema).extract(html_content)
+
+
+STRATEGIES = {}
+
+def get_strategy(schema):
+    # One strategy per schema for the whole run, instead of one per page
+    if id(schema) not in STRATEGIES:
+        STRATEGIES[id(schema)] = (schema, Compiled_Css_Strategy(schema))
+    return STRATEGIES[id(schema)][1]
@@ -0,0 +1,179 @@
+"""
+Persistent cross-run dedup index for product URLs.
+URLs are normalized and hashed to 64 bit keys with xxhash. The index keeps a Bloom filter in front
+of a sorted array of keys, both saved to one binary file, so it loads in milliseconds and most
+"never seen" checks are answered by the Bloom filter alone without touching the key array.
+
+Usage:: python dedup.py build [csv file ...]    Rebuild the index from products.db (and/or CSV files with a url column)
+"""
+
+import asyncio, csv, math, os, struct, sys
+from array import array
+from bisect import bisect_left
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import xxhash
+import storage
+
+## CONTROL VARIABLES
+INDEX_FILE = os.path.join(storage.DATABASE_DIR, "url_index.bin")
+TEST_INDEX_FILE = os.path.join(os.path.dirname(storage.TEST_DB_FILE), "test_url_index.bin")
+INITIAL_CAPACITY = 10_000 # Bloom filter is rebuilt with double the capacity when exceeded
+FALSE_POSITIVE_RATE = 0.01
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid")
+
+MAGIC = b"URLIDX1\0"
+HEADER = struct.Struct("<8sQQQQ") # magic, bloom capacity, bloom bits, bloom hashes, key count
+
+
+## URL NORMALIZATION & HASHING
+def normalize_url(url):
+    # Same product reached by different spellings of its URL gets one key
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    path = "/".join(segment for segment in parts.path.split("/") if segment) # Collapse '//' & trailing '/'
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith(TRACKING_PARAMS)
+        ))
+    return urlunsplit(("https", host, "/" + path, query, ""))
+
+def url_key(url):
+    return xxhash.xxh3_64_intdigest(normalize_url(url))
+
+
+class Bloom_Filter:
+    def __init__(self, capacity, false_positive_rate=FALSE_POSITIVE_RATE, num_bits=None, num_hashes=None):
+        self.capacity = capacity
+        self.num_bits = num_bits or max(64, int(-capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.num_hashes = num_hashes or max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def positions(self, key):
+        # Double hashing on the two halves of the 64 bit key, no extra hashing needed
+        low, high = key & 0xFFFFFFFF, key >> 32
+        return ((low + i * high) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, key):
+        for position in self.positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def might_contain(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.positions(key))
+
+
+class Url_Index:
+    def __init__(self, index_file=INDEX_FILE):
+        self.index_file = index_file
+        self.keys = array("Q") # Sorted keys as loaded from disk
+        self.new_keys = set() # Keys added since load
+        self.bloom = Bloom_Filter(INITIAL_CAPACITY)
+
+    def __len__(self):
+        return len(self.keys) + len(self.new_keys)
+
+    def __contains__(self, url):
+        return self.contains_key(url_key(url))
+
+    def contains_key(self, key):
+        if not self.bloom.might_contain(key):
+            return False
+        if key in self.new_keys:
+            return True
+        position = bisect_left(self.keys, key)
+        return position < len(self.keys) and self.keys[position] == key
+
+    # RETURNS TRUE IF THE URL WAS NOT IN THE INDEX
+    def add(self, url):
+        key = url_key(url)
+        if self.contains_key(key):
+            return False
+        self.new_keys.add(key)
+        if len(self) > self.bloom.capacity:
+            self.rebuild_bloom(2 * len(self))
+        else:
+            self.bloom.add(key)
+        return True
+
+    def rebuild_bloom(self, capacity):
+        self.bloom = Bloom_Filter(capacity)
+        for key in self.keys:
+            self.bloom.add(key)
+        for key in self.new_keys:
+            self.bloom.add(key)
+
+    ## PERSISTENCE
+    def load(self):
+        if not os.path.isfile(self.index_file):
+            return self
+        with open(self.index_file, "rb") as file:
+            magic, capacity, num_bits, num_hashes, count = HEADER.unpack(file.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{self.index_file} is not a URL index file")
+            bloom = Bloom_Filter(capacity=capacity, num_bits=num_bits, num_hashes=num_hashes)
+            bloom.bits = bytearray(file.read(len(bloom.bits)))
+            keys = array("Q")
+            keys.frombytes(file.read(count * keys.itemsize))
+        if sys.byteorder != "little":
+            keys.byteswap()
+        self.bloom, self.keys, self.new_keys = bloom, keys, set()
+        return self
+
+    def save(self):
+        if self.new_keys:
+            self.keys = array("Q", sorted([*self.keys, *self.new_keys]))
+            self.new_keys = set()
+        keys = array("Q", self.keys)
+        if sys.byteorder != "little":
+            keys.byteswap()
+        os.makedirs(os.path.dirname(self.index_file), exist_ok=True)
+        temp_file = self.index_file + ".tmp"
+        with open(temp_file, "wb") as file:
+            file.write(HEADER.pack(MAGIC, self.bloom.capacity, self.bloom.num_bits, self.bloom.num_hashes, len(keys)))
+            file.write(self.bloom.bits)
+            file.write(keys.tobytes())
+        os.replace(temp_file, self.index_file) # Readers never see a half written index
+
+
+# INDEXES SHARED BY EVERY PIPELINE IN THE PROCESS, LOADED ON FIRST USE
+INDEXES = {}
+
+async def get_index(index_file=INDEX_FILE, db_file=storage.DB_FILE):
+    if index_file not in INDEXES:
+        index = Url_Index(index_file).load()
+        if not os.path.isfile(index_file) and os.path.isfile(db_file):
+            # First run next to an existing database, seed from it once
+            store = await storage.get_store(db_file)
+            async for row in store.rows():
+                index.add(row["url"])
+            index.save()
+        INDEXES.setdefault(index_file, index) # Concurrent pipelines keep the first one loaded
+    return INDEXES[index_file]
+
+def save_indexes():
+    for index in INDEXES.values():
+        index.save()
+
+
+async def build(csv_files, index_file=INDEX_FILE, db_file=storage.DB_FILE):
+    index = Url_Index(index_file)
+    if os.path.isfile(db_file):
+        async with storage.Product_Store(db_file) as store:
+            async for row in store.rows():
+                index.add(row["url"])
+    for csv_file in csv_files:
+        with open(csv_file, newline='', encoding='utf-8') as file:
+            for row in csv.DictReader(file):
+                url = row.get("url") or row.get("URL")
+                if url:
+                    index.add(url)
+    index.save()
+    print(f"Saved {len(index)} URLs to {index_file}.")
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ["build"]:
+        asyncio.run(build(sys.argv[2:]))
+    else:
+        print(__doc__)
@@ -0,0 +1,199 @@
+"""
+Second-stage crawler for product DETAIL pages (gsmarena spec sheets).
+The listing crawl only stores brand, model & URL. This streams those URLs (from the products database, or a CSV
+with a url/URL column such as Database/gsmarena_products.csv) and fetches the spec pages in bulk:
+    1. CONCURRENCY worker tasks share the site's fetcher (HTTP fast path, or the browser tab pool),
+       every request still paced by the per-host rate limiter,
+    2. new fetches wait while system memory use is above MEMORY_THRESHOLD_PERCENT (psutil),
+    3. every spec table row becomes one (category, name, value) row in the specs table,
+       written as pages arrive, BATCH_SIZE pages per transaction,
+    4. finished pages are recorded in detail_pages, a restarted job skips them and retries only failures & new URLs.
+
+Usage:: python detail_crawler.py [csv file]    Crawl the specs of every gsmarena product (or of the URLs in a CSV)
+"""
+
+import asyncio, csv, sys, time
+import psutil
+from lxml import etree
+from dotenv import load_dotenv
+from rate_limiter import RATE_LIMITER
+from extraction_engine import compile_selector, parse
+import configs, storage, http_fetcher
+
+load_dotenv()
+
+## CONTROL VARIABLES
+TEST_MODE = False # First TEST_LIMIT pages only, into the test database
+TEST_LIMIT = 5
+SITE = "gsmarena" # products.site whose URLs are crawled when no CSV is given
+CONCURRENCY = 8 # Detail pages in flight
+MEMORY_THRESHOLD_PERCENT = 85 # New fetches wait while system memory use is above this
+MEMORY_CHECK_INTERVAL = 1.0 # Seconds between checks while waiting
+BATCH_SIZE = 20 # Detail pages per database transaction
+FLUSH_INTERVAL = 5.0 # Seconds before a partly filled batch is written anyway
+
+SPEC_TABLES = compile_selector("#specs-list table")
+TABLE_ROWS = etree.XPath("./tr | ./tbody/tr")
+ROW_HEADER = etree.XPath("./th")
+ROW_TITLE = etree.XPath("./td[contains(concat(' ', normalize-space(@class), ' '), ' ttl ')]")
+ROW_INFO = etree.XPath("./td[contains(concat(' ', normalize-space(@class), ' '), ' nfo ')]")
+TEXT_NODES = etree.XPath(".//text()")
+
+
+## SPEC EXTRACTION
+def cell_text(element):
+    # <br> separated lines stay separate lines
+    return "\n".join(line for line in (" ".join(text.split()) for text in TEXT_NODES(element)) if line)
+
+def extract_specs(html):
+    # One dict per spec row: {"category": "Display", "name": "Size", "value": "6.7 inches ..."}
+    root = parse(html)
+    specs = []
+    if root is None:
+        return specs
+    for table in SPEC_TABLES(root):
+        category = ""
+        for row in TABLE_ROWS(table):
+            header, title, info = ROW_HEADER(row), ROW_TITLE(row), ROW_INFO(row)
+            if header:
+                category = cell_text(header[0]) or category
+            if not info:
+                continue
+            name = cell_text(title[0]) if title else ""
+            value = cell_text(info[0])
+            if not name and specs and specs[-1]["category"] == category:
+                # Continuation row (empty title), belongs to the spec above it
+                specs[-1]["value"] = "\n".join(part for part in (specs[-1]["value"], value) if part)
+                continue
+            specs.append({"category": category, "name": name or category, "value": value})
+    return specs
+
+
+## MEMORY THROTTLE
+class Memory_Throttle:
+    def __init__(self, threshold_percent=MEMORY_THRESHOLD_PERCENT):
+        self.threshold_percent = threshold_percent
+        self.pause_count = 0
+        self.paused_seconds = 0.0
+
+    async def wait(self):
+        if psutil.virtual_memory().percent <= self.threshold_percent:
+            return
+        self.pause_count += 1
+        start_time = time.perf_counter()
+        print(f"MEMORY ABOVE {self.threshold_percent}%, PAUSING NEW FETCHES.")
+        while psutil.virtual_memory().percent > self.threshold_percent:
+            await asyncio.sleep(MEMORY_CHECK_INTERVAL)
+        self.paused_seconds += time.perf_counter() - start_time
+
+
+class Detail_Crawler:
+    def __init__(self, site=configs, concurrency=CONCURRENCY, test_mode=TEST_MODE):
+        self.site = site # configs module, its FETCH_MODE, DELAY_TIME & browser config are used
+        self.concurrency = concurrency
+        self.test_mode = test_mode
+        self.db_file = storage.TEST_DB_FILE if test_mode else storage.DB_FILE
+        self.throttle = Memory_Throttle()
+        self.done_count = 0
+        self.failed_count = 0
+        self.spec_count = 0
+        self.skipped_count = 0
+        self.start_time = time.perf_counter()
+
+    def get_crawler_config(self):
+        if self.site.FETCH_MODE == "http":
+            return http_fetcher.Http_Config(session_id=f"{self.site.SESSION_ID}-details") # Raw HTML, no listing schema
+        from crawl4ai import CrawlerRunConfig, CacheMode
+        return CrawlerRunConfig(session_id=f"{self.site.SESSION_ID}-details", wait_for="css:#specs-list", cache_mode=CacheMode.BYPASS)
+
+    # STREAM THE URL LIST, NOTHING IS LOADED WHOLE
+    async def urls(self, store, csv_file=None):
+        if csv_file:
+            with open(csv_file, newline='', encoding='utf-8') as file:
+                for row in csv.DictReader(file):
+                    url = row.get("url") or row.get("URL")
+                    if url:
+                        yield url
+        else:
+            async for row in store.rows(SITE):
+                yield row["url"]
+
+    async def run(self, csv_file=None):
+        store = await storage.get_store(self.db_file)
+        done = await store.detail_urls("done")
+        urls = asyncio.Queue(maxsize=2 * self.concurrency) # Producer waits here while workers are busy
+        details = asyncio.Queue(maxsize=BATCH_SIZE * 2)
+        async with http_fetcher.get_crawler(self.site) as crawler:
+            config = self.get_crawler_config()
+            workers = [asyncio.create_task(self.worker(crawler, config, urls, details)) for _ in range(self.concurrency)]
+            writer = asyncio.create_task(self.writer(store, details))
+            try:
+                queued = 0
+                async for url in self.urls(store, csv_file):
+                    if url in done:
+                        self.skipped_count += 1
+                        continue
+                    await urls.put(url)
+                    queued += 1
+                    if self.test_mode and queued >= TEST_LIMIT:
+                        break
+                for _ in workers:
+                    await urls.put(None)
+                await asyncio.gather(*workers)
+                await details.put(None)
+                await writer
+            finally:
+                for task in [*workers, writer]: # A failed task would leave the others waiting on their queues
+                    task.cancel()
+        self.print_report()
+
+    async def worker(self, crawler, config, urls, details):
+        while (url := await urls.get()) is not None:
+            await self.throttle.wait()
+            result = await RATE_LIMITER.fetch(crawler=crawler, url=url, config=config, initial_interval=self.site.DELAY_TIME)
+            specs = extract_specs(result.html) if result.success else []
+            if not specs:
+                print(f"FAILED: {url} ({result.error_message or 'no spec table'})")
+            await details.put((url, "done" if specs else "failed", specs))
+
+    async def writer(self, store, details):
+        batch = []
+        while True:
+            try:
+                item = await asyncio.wait_for(details.get(), FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                item = False # Nothing arrived for a while, write what there is
+            if item:
+                batch.append(item)
+            if batch and (item is None or item is False or len(batch) >= BATCH_SIZE):
+                await self.write(store, batch)
+                batch = []
+            if item is None:
+                return
+
+    async def write(self, store, batch):
+        await store.upsert_specs(batch)
+        for _, status, specs in batch:
+            self.done_count += status == "done"
+            self.failed_count += status == "failed"
+            self.spec_count += len(specs)
+        elapsed = time.perf_counter() - self.start_time
+        rss = psutil.Process().memory_info().rss / 1024 ** 2
+        print(f"Update: {self.done_count} pages done, {self.failed_count} failed, {self.spec_count} specs. "
+              f"{(self.done_count + self.failed_count) * 60 / elapsed:.1f} pages/min, RSS {rss:.0f} MB.")
+
+    # FINAL LOG
+    def print_report(self):
+        print("DETAIL CRAWLING COMPLETE.")
+        print(f"{self.done_count} pages done ({self.skipped_count} skipped, done by an earlier run), {self.failed_count} failed, {self.spec_count} specs written.")
+        print(f"Memory throttle paused {self.throttle.pause_count} times, {self.throttle.paused_seconds:.0f}s in total.")
+
+
+async def main(csv_file=None):
+    try:
+        await Detail_Crawler().run(csv_file)
+    finally:
+        await storage.close_stores()
+
+if __name__ == '__main__':
+    asyncio.run(main(*sys.argv[1:2]))
@@ -0,0 +1,201 @@
+"""
+Precompiled CSS-schema extraction engine.
+compile_schema() turns a SCHEMA_FOR_EXTRACTION dict into compiled lxml XPath objects ONCE (cached per schema),
+then applies them to any number of pages. Output matches crawl4ai's JsonCssExtractionStrategy
+(text = stripped text nodes joined without separator, first match for single fields, doc order for lists),
+without re-parsing the schema or re-translating selectors on every page.
+
+css_strategy.Compiled_Css_Strategy plugs the engine into CrawlerRunConfig for the browser path,
+http_fetcher uses compile_schema directly on the raw HTML. This module doesn't import crawl4ai,
+so browserless crawls start without it.
+
+Usage:: python extraction_engine.py bench <configs module> <saved page.html ...>
+        Compare JsonCssExtractionStrategy vs the compiled engine on saved pages of a site
+"""
+
+import importlib, json, re, sys, time
+from lxml import etree
+from cssselect import GenericTranslator
+
+TRANSLATOR = GenericTranslator()
+TEXT_NODES = etree.XPath(".//text()")
+PARSER = etree.HTMLParser(recover=True)
+
+# Selector -> compiled XPath, shared by all schemas
+SELECTORS = {}
+
+def compile_selector(selector):
+    # descendant-or-self lets a field selector start at the element it is applied to (e.g. ".makers li" on .makers)
+    if selector not in SELECTORS:
+        SELECTORS[selector] = etree.XPath(TRANSLATOR.css_to_xpath(selector, prefix="descendant-or-self::"))
+    return SELECTORS[selector]
+
+
+def element_text(element):
+    return "".join(text.strip() for text in TEXT_NODES(element))
+
+def apply_transform(value, transform):
+    if value is None:
+        return None
+    if transform == "lowercase":
+        return value.lower()
+    if transform == "uppercase":
+        return value.upper()
+    if transform == "strip":
+        return value.strip()
+    return value
+
+
+class Compiled_Field:
+    def __init__(self, field):
+        self.name = field["name"]
+        self.type = field["type"]
+        self.default = field.get("default")
+        self.attribute = field.get("attribute")
+        self.transform = field.get("transform")
+        self.pattern = re.compile(field["pattern"]) if "pattern" in field else None
+        self.expression = field.get("expression")
+        self.function = field.get("function")
+        self.xpath = compile_selector(field["selector"]) if "selector" in field else None
+        self.fields = [Compiled_Field(child) for child in field.get("fields", [])]
+
+    def select(self, element):
+        if self.xpath is None:
+            return [element]
+        return [match for match in self.xpath(element) if match is not element]
+
+    def single(self, element):
+        selected = self.select(element)
+        if not selected:
+            return self.default
+        selected = selected[0]
+        value = None
+        if self.type == "text":
+            value = element_text(selected)
+        elif self.type == "attribute":
+            value = selected.get(self.attribute)
+        elif self.type == "html":
+            value = etree.tostring(selected, encoding="unicode", method="html", with_tail=False)
+        elif self.type == "regex":
+            match = self.pattern.search(element_text(selected))
+            value = match.group(1) if match else None
+        if self.transform:
+            value = apply_transform(value, self.transform)
+        return value if value is not None else self.default
+
+    def extract(self, element, item):
+        try:
+            if self.type == "computed":
+                return eval(self.expression, {}, item) if self.expression else self.function(item)
+            if self.type == "nested":
+                selected = self.select(element)
+                return extract_item(selected[0], self.fields) if selected else {}
+            if self.type == "list":
+                return [extract_list_item(match, self.fields) for match in self.select(element)]
+            if self.type == "nested_list":
+                return [extract_item(match, self.fields) for match in self.select(element)]
+            return self.single(element)
+        except Exception:
+            return self.default
+
+
+def extract_item(element, fields):
+    item = {}
+    for field in fields:
+        value = field.extract(element, item)
+        if value is not None:
+            item[field.name] = value
+    return item
+
+def extract_list_item(element, fields):
+    item = {}
+    for field in fields:
+        value = field.single(element)
+        if value is not None:
+            item[field.name] = value
+    return item
+
+
+class Compiled_Schema:
+    def __init__(self, schema):
+        self.schema = schema
+        self.base = compile_selector(schema["baseSelector"])
+        self.base_fields = [Compiled_Field(field) for field in schema.get("baseFields", [])]
+        self.fields = [Compiled_Field(field) for field in schema["fields"]]
+
+    def __reduce__(self):
+        # Compiled XPath objects can't be pickled, other processes recompile from the schema
+        return (compile_schema, (self.schema,))
+
+    def extract_tree(self, root):
+        results = []
+        for element in self.base(root):
+            item = {}
+            for field in self.base_fields:
+                value = field.single(element)
+                if value is not None:
+                    item[field.name] = value
+            item.update(extract_item(element, self.fields))
+            if item:
+                results.append(item)
+        return results
+
+    def extract(self, html, css_selector=None):
+        # css_selector scopes extraction like crawl4ai's CrawlerRunConfig(css_selector=...)
+        root = parse(html)
+        if root is None:
+            return []
+        if not css_selector:
+            return self.extract_tree(root)
+        results = []
+        for scope in compile_selector(css_selector)(root):
+            results.extend(self.extract_tree(scope))
+        return results
+
+
+def parse(html):
+    if not html or not html.strip():
+        return None
+    return etree.fromstring(html, PARSER)
+
+
+# Schema -> Compiled_Schema, schema dicts are module constants so id() is stable
+SCHEMAS = {}
+
+def compile_schema(schema):
+    if id(schema) not in SCHEMAS:
+        SCHEMAS[id(schema)] = (schema, Compiled_Schema(schema))
+    return SCHEMAS[id(schema)][1]
+
+
+## BENCHMARK
+def bench(site_name, html_files, repeat=20):
+    from crawl4ai import JsonCssExtractionStrategy
+    site = importlib.import_module(site_name)
+    schema = site.SCHEMA_FOR_EXTRACTION
+    pages = [open(html_file, encoding="utf-8").read() for html_file in html_files]
+    compiled = compile_schema(schema)
+
+    start_time = time.perf_counter()
+    for _ in range(repeat):
+        expected = [JsonCssExtractionStrategy(schema).extract("", page) for page in pages] # As configs did, new strategy per page
+    css_time = (time.perf_counter() - start_time) / (repeat * len(pages))
+
+    start_time = time.perf_counter()
+    for _ in range(repeat):
+        actual = [compiled.extract(page) for page in pages]
+    compiled_time = (time.perf_counter() - start_time) / (repeat * len(pages))
+
+    same = json.dumps(expected, sort_keys=True) == json.dumps(actual, sort_keys=True)
+    print(f"{site_name}: {len(pages)} pages, {sum(len(result) for result in actual)} items")
+    print(f"JsonCssExtractionStrategy: {css_time * 1000:.2f} ms/page")
+    print(f"Compiled engine:           {compiled_time * 1000:.2f} ms/page ({css_time / compiled_time:.1f}x)")
+    print(f"Same output: {same}")
+    return css_time, compiled_time, same
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ["bench"]:
+        bench(sys.argv[2], sys.argv[3:])
+    else:
+        print(__doc__)
@@ -4,7 +4,7 @@ Change configuration based on website & crawling strategy
 """
 import os, csv
 from pydantic import BaseModel
-from crawl4ai import BrowserConfig, CrawlerRunConfig, LLMConfig, LLMExtractionStrategy, JsonCssExtractionStrategy, CacheMode
+# crawl4ai is imported inside the functions below, it loads its whole LLM stack (slow start for cron crawls)
 
 TEST_MODE = False
 MAIN_FILE= "D:/My Codes/Projects/Project-001/Crawler/Database/products.csv"
@@ -34,6 +34,7 @@ URLS_TO_CRAWL = [
 
 ## CONFIGURATION SETTINGS
 def get_browser_config():
+    from crawl4ai import BrowserConfig
     return BrowserConfig(
         browser_type='chromium', # Chrome Browser
         headless=False, # Headless == No GUI
@@ -41,9 +42,11 @@ def get_browser_config():
     ) 
 
 def get_crawler_config(session_id, css_selector, schema): # ARGUMENTS THAT NEED TO BE PASSED FROM THE MAIN SCRIPT, MUST BE DEFINED BEFORE EXECUTING THIS FUNCTION
+    from crawl4ai import CrawlerRunConfig, CacheMode
+    from css_strategy import get_strategy
     return CrawlerRunConfig(
         session_id=session_id, # Unique session ID for the crawl
-        extraction_strategy=JsonCssExtractionStrategy(schema=schema),
+        extraction_strategy=get_strategy(schema), # Compiled once per schema, see css_strategy.py
         css_selector=css_selector,  # Decides what part of an encountered webpage crawler will crawl through
         cache_mode=CacheMode.BYPASS
     )
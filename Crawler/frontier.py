@@ -0,0 +1,478 @@
+"""
+Durable crawl frontier, so several worker processes (on one box or several) share one crawl without double-fetching.
+Jobs are categories (an entry of a configs module's URLS_TO_CRAWL, crawled to its end by Output_Pipeline.run)
+or single listing pages (Output_Pipeline.crawl_page), any configs module in main.SITES works unchanged.
+    sharding:    jobs live in SHARDS SQLite files (Database/frontier/shard-<n>.db), by hash of their host,
+                 so the per-host cap is checked in one shard & workers starting at different shards rarely contend
+    leases:      a worker leases jobs for LEASE_SECONDS and keeps extending them while it crawls,
+                 a job is done only if the worker still held its lease
+    visibility:  a lease that runs out (worker died) puts the job back, MAX_ATTEMPTS later it is dead
+    retry:       a failed job waits RETRY_DELAY * 2^attempts before it can be leased again
+    politeness:  at most MAX_LEASES_PER_HOST jobs of one host are leased at once, over all workers
+                 (each worker still paces its own requests with rate_limiter.py)
+With pipeline.FAN_OUT a category job crawls its first page and queues the others (pagination.py) as page jobs.
+Seeding again re-opens done & dead jobs for the next crawl, a re-opened category job re-opens its pages as it fans out.
+Workers on other boxes reach the frontier through `python frontier.py serve`, a small HTTP front of the same calls,
+bound to loopback unless --host says otherwise & answering only requests carrying the shared FRONTIER_TOKEN (.env).
+Only sites of main.SITES are queued or crawled, a job naming anything else is refused.
+
+Usage:: python frontier.py seed <site> [site ...]                 Queue every category of the sites (gsmarena, startech, ...), crawled ones again
+        python frontier.py work [--concurrency N] [--remote URL]  Lease & crawl jobs until the frontier is empty (--follow: keep polling)
+        python frontier.py serve [--host 0.0.0.0] [--port 8790]   Serve the frontier to workers on other boxes (FRONTIER_TOKEN set on both ends)
+        python frontier.py stats                                   Jobs per status & host
+        python frontier.py retry-dead                              Give dead jobs another MAX_ATTEMPTS
+"""
+
+import argparse, asyncio, hmac, importlib, json, os, socket, sqlite3, threading, time, zlib
+from contextlib import AsyncExitStack
+from urllib.parse import urlparse
+from dotenv import load_dotenv
+import storage, dedup, http_fetcher, metrics, worker_pool, pipeline, pagination
+from metrics import log
+
+load_dotenv()
+
+## CONTROL VARIABLES
+FRONTIER_DIR = os.path.join(storage.DATABASE_DIR, "frontier")
+SHARDS = 4
+LEASE_SECONDS = 120 # A job not extended for this long goes back to the frontier
+MAX_ATTEMPTS = 3 # Leases of a job before it is dead
+RETRY_DELAY = 30 # Seconds before a failed job is retried, doubled on every attempt
+MAX_LEASES_PER_HOST = 2 # Jobs of one host leased at once, over all workers
+CONCURRENCY = 4 # Jobs a worker runs at once
+POLL_INTERVAL = 2.0 # Seconds between leases while the frontier has nothing ready
+SERVE_PORT = 8790
+SERVE_HOST = "127.0.0.1" # Loopback only, --host 0.0.0.0 to serve other boxes
+TOKEN = os.getenv("FRONTIER_TOKEN") # Shared secret of serve & its remote workers, serve refuses to start without one
+TOKEN_HEADER = "X-Frontier-Token"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL, -- category / page
+    site TEXT NOT NULL, -- main.SITES name or configs module
+    crawl_number INTEGER NOT NULL,
+    page_number INTEGER, -- page jobs only
+    url TEXT NOT NULL,
+    host TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'ready', -- ready, leased, done, dead
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    available_at REAL NOT NULL DEFAULT 0, -- Retry back-off
+    error TEXT,
+    updated_at TEXT,
+    UNIQUE (kind, url)
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs(status, available_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_host ON jobs(status, host);
+"""
+JOB_COLUMNS = ["kind", "site", "crawl_number", "page_number", "url", "host"]
+
+
+def shard_of(host, shards=SHARDS):
+    return zlib.crc32(host.encode("utf-8")) % shards
+
+def job_id(shard, row_id):
+    # "<shard>:<row id>", unique over all shards
+    return f"{shard}:{row_id}"
+
+def split_id(job):
+    shard, row_id = job.split(":")
+    return int(shard), int(row_id)
+
+# Upsert of a job that was crawled (or gave up) before, ready & with every attempt again
+REOPEN = ("ON CONFLICT (kind, url) DO UPDATE SET status = 'ready', attempts = 0, available_at = 0, lease_owner = NULL, "
+          "lease_expires = NULL, error = NULL, updated_at = excluded.updated_at WHERE status IN ('done', 'dead')")
+
+def site_module(site_name):
+    # configs module of a main.SITES name (or of the module name itself), anything else is refused
+    from main import SITES
+    if site_name in SITES:
+        return SITES[site_name]
+    if site_name in SITES.values():
+        return site_name
+    raise ValueError(f"Unknown site {site_name!r}, not in main.SITES")
+
+def category_job(site_name, site, crawl_number):
+    url = site.URLS_TO_CRAWL[crawl_number].get("url") or site.URLS_TO_CRAWL[crawl_number].get("base_url", "")
+    return {"kind": "category", "site": site_name, "crawl_number": crawl_number, "page_number": None, "url": url}
+
+def page_job(site_name, crawl_number, page_number, url):
+    return {"kind": "page", "site": site_name, "crawl_number": crawl_number, "page_number": page_number, "url": url}
+
+
+class Frontier:
+    # SQLite shards, synchronous calls run through asyncio.to_thread, other processes wait on busy_timeout
+    def __init__(self, frontier_dir=FRONTIER_DIR, shards=SHARDS):
+        self.frontier_dir = frontier_dir
+        self.shards = shards
+        os.makedirs(frontier_dir, exist_ok=True)
+        self.dbs = []
+        for shard in range(shards):
+            db = sqlite3.connect(os.path.join(frontier_dir, f"shard-{shard}.db"), check_same_thread=False, isolation_level=None, timeout=30)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA)
+            self.dbs.append(db)
+        self.locks = [threading.Lock() for _ in range(shards)]
+
+    # ADD JOBS, A URL ALREADY QUEUED IS NOT QUEUED AGAIN, UNLESS reopen & IT IS DONE OR DEAD (THE NEXT CRAWL OF IT)
+    async def add(self, jobs, reopen=False):
+        for job in jobs:
+            site_module(job["site"])
+        return await asyncio.to_thread(self._add, jobs, reopen)
+
+    def _add(self, jobs, reopen=False):
+        by_shard = {}
+        for job in jobs:
+            job = dict(job, host=urlparse(job["url"]).netloc)
+            by_shard.setdefault(shard_of(job["host"], self.shards), []).append(job)
+        added = 0
+        for shard, shard_jobs in by_shard.items():
+            with self.locks[shard]:
+                db = self.dbs[shard]
+                before = db.total_changes
+                db.execute("BEGIN IMMEDIATE")
+                db.executemany(f"INSERT INTO jobs ({', '.join(JOB_COLUMNS)}, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?) "
+                               + (REOPEN if reopen else "ON CONFLICT (kind, url) DO NOTHING"),
+                               [[job.get(column) for column in JOB_COLUMNS] + [storage.now()] for job in shard_jobs])
+                db.execute("COMMIT")
+                added += db.total_changes - before
+        return added
+
+    # LEASE UP TO limit READY JOBS, STARTING AT THE OWNER'S OWN SHARD
+    async def lease(self, owner, limit):
+        return await asyncio.to_thread(self._lease, owner, limit)
+
+    def _lease(self, owner, limit):
+        leased = []
+        first = zlib.crc32(owner.encode("utf-8")) % self.shards
+        for offset in range(self.shards):
+            if len(leased) >= limit:
+                break
+            leased.extend(self.lease_shard((first + offset) % self.shards, owner, limit - len(leased)))
+        return leased
+
+    def lease_shard(self, shard, owner, limit):
+        now = time.time()
+        with self.locks[shard]:
+            db = self.dbs[shard]
+            db.execute("BEGIN IMMEDIATE") # One leaser per shard at a time, over all processes
+            try:
+                # VISIBILITY TIMEOUT: LEASES OF WORKERS THAT STOPPED EXTENDING THEM
+                db.execute("UPDATE jobs SET status = 'dead', error = 'lease expired', lease_owner = NULL, updated_at = ? "
+                           "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?", (storage.now(), now, MAX_ATTEMPTS))
+                db.execute("UPDATE jobs SET status = 'ready', error = 'lease expired', lease_owner = NULL, updated_at = ? "
+                           "WHERE status = 'leased' AND lease_expires < ?", (storage.now(), now))
+                busy = dict(db.execute("SELECT host, COUNT(*) FROM jobs WHERE status = 'leased' GROUP BY host").fetchall())
+                rows = db.execute("SELECT * FROM jobs WHERE status = 'ready' AND available_at <= ? ORDER BY id LIMIT ?",
+                                  (now, limit * 8)).fetchall()
+                leased = []
+                for row in rows:
+                    if len(leased) >= limit:
+                        break
+                    if busy.get(row["host"], 0) >= MAX_LEASES_PER_HOST:
+                        continue
+                    busy[row["host"]] = busy.get(row["host"], 0) + 1
+                    db.execute("UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                               (owner, now + LEASE_SECONDS, storage.now(), row["id"]))
+                    leased.append(dict(row, id=job_id(shard, row["id"]), attempts=row["attempts"] + 1))
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return leased
+
+    # LEASE CALLS, EACH ONLY APPLIES WHILE owner STILL HOLDS THE LEASE
+    async def extend(self, job, owner):
+        return await asyncio.to_thread(self.update, job, owner, "status = 'leased', lease_expires = ?", (time.time() + LEASE_SECONDS,))
+
+    async def complete(self, job, owner):
+        return await asyncio.to_thread(self.update, job, owner, "status = 'done', lease_owner = NULL, error = NULL", ())
+
+    async def fail(self, job, owner, error=""):
+        return await asyncio.to_thread(self._fail, job, owner, error)
+
+    def _fail(self, job, owner, error):
+        shard, row_id = split_id(job)
+        row = self.dbs[shard].execute("SELECT attempts FROM jobs WHERE id = ?", (row_id,)).fetchone()
+        if row is None:
+            return False
+        if row["attempts"] >= MAX_ATTEMPTS:
+            return self.update(job, owner, "status = 'dead', lease_owner = NULL, error = ?", (error,))
+        return self.update(job, owner, "status = 'ready', lease_owner = NULL, error = ?, available_at = ?",
+                           (error, time.time() + RETRY_DELAY * 2 ** (row["attempts"] - 1)))
+
+    def update(self, job, owner, assignments, values):
+        shard, row_id = split_id(job)
+        with self.locks[shard]:
+            cursor = self.dbs[shard].execute(f"UPDATE jobs SET {assignments}, updated_at = ? WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                                             (*values, storage.now(), row_id, owner))
+        return cursor.rowcount == 1 # False: the lease ran out & the job went back (or to another worker)
+
+    # STATUS
+    async def stats(self):
+        return await asyncio.to_thread(self._stats)
+
+    def _stats(self):
+        counts = {"ready": 0, "leased": 0, "done": 0, "dead": 0}
+        hosts = {}
+        for shard, db in enumerate(self.dbs):
+            with self.locks[shard]:
+                for host, status, count in db.execute("SELECT host, status, COUNT(*) FROM jobs GROUP BY host, status"):
+                    counts[status] += count
+                    hosts.setdefault(host, {})[status] = count
+        return {"jobs": counts, "hosts": hosts}
+
+    async def retry_dead(self):
+        return await asyncio.to_thread(self._retry_dead)
+
+    def _retry_dead(self):
+        count = 0
+        for shard, db in enumerate(self.dbs):
+            with self.locks[shard]:
+                count += db.execute("UPDATE jobs SET status = 'ready', attempts = 0, available_at = 0, updated_at = ? WHERE status = 'dead'",
+                                    (storage.now(),)).rowcount
+        return count
+
+    async def close(self):
+        for db in self.dbs:
+            db.close()
+
+
+## HTTP FRONT FOR WORKERS ON OTHER BOXES
+class Remote_Frontier:
+    # Same calls as Frontier, over `python frontier.py serve`
+    def __init__(self, url, token=TOKEN):
+        self.url = url.rstrip("/")
+        self.token = token
+        self.session = None
+
+    async def call(self, name, **arguments):
+        import aiohttp
+        if self.session is None:
+            self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=60), headers={TOKEN_HEADER: self.token or ""})
+        async with self.session.post(f"{self.url}/{name}", json=arguments) as response:
+            response.raise_for_status()
+            return await response.json()
+
+    async def add(self, jobs, reopen=False):
+        return await self.call("add", jobs=jobs, reopen=reopen)
+
+    async def lease(self, owner, limit):
+        return await self.call("lease", owner=owner, limit=limit)
+
+    async def extend(self, job, owner):
+        return await self.call("extend", job=job, owner=owner)
+
+    async def complete(self, job, owner):
+        return await self.call("complete", job=job, owner=owner)
+
+    async def fail(self, job, owner, error=""):
+        return await self.call("fail", job=job, owner=owner, error=error)
+
+    async def stats(self):
+        return await self.call("stats")
+
+    async def retry_dead(self):
+        return await self.call("retry_dead")
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+
+async def serve(frontier, port=SERVE_PORT, host=SERVE_HOST, token=TOKEN):
+    # POST /<call> with the call's arguments as JSON & the token in TOKEN_HEADER, returns the aiohttp runner
+    from aiohttp import web
+    if not token:
+        raise ValueError("Set FRONTIER_TOKEN (or pass --token) to serve the frontier")
+    calls = {name: getattr(frontier, name) for name in ("add", "lease", "extend", "complete", "fail", "stats", "retry_dead")}
+
+    async def handle(request):
+        if not hmac.compare_digest(request.headers.get(TOKEN_HEADER, "").encode(), token.encode()):
+            raise web.HTTPUnauthorized()
+        name = request.match_info["call"]
+        if name not in calls:
+            raise web.HTTPNotFound()
+        arguments = await request.json() if request.can_read_body else {}
+        try:
+            return web.json_response(await calls[name](**arguments))
+        except ValueError as error: # Unknown site
+            raise web.HTTPBadRequest(text=str(error))
+
+    app = web.Application()
+    app.router.add_post("/{call}", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    log(f"FRONTIER AT http://{host}:{port}/ ({frontier.frontier_dir}, {frontier.shards} shards)", event="frontier_serving", port=port)
+    return runner
+
+
+## WORKER
+class Frontier_Worker:
+    def __init__(self, frontier, owner=None, concurrency=CONCURRENCY, follow=False):
+        self.frontier = frontier
+        self.owner = owner or f"{socket.gethostname()}-{os.getpid()}"
+        self.concurrency = concurrency
+        self.follow = follow # Keep polling once the frontier is empty
+        self.crawlers = {} # configs module -> crawler, shared by its jobs
+        self.stack = None
+        self.done_count = 0
+        self.failed_count = 0
+        self.lost_count = 0
+
+    async def crawler(self, site):
+        if site not in self.crawlers:
+            self.crawlers[site] = await self.stack.enter_async_context(http_fetcher.get_crawler(site))
+        return self.crawlers[site]
+
+    async def run(self):
+        log(f"FRONTIER WORKER {self.owner}: up to {self.concurrency} jobs at once.", event="frontier_worker", owner=self.owner)
+        running = set()
+        async with AsyncExitStack() as self.stack:
+            try:
+                while True:
+                    if len(running) < self.concurrency:
+                        for job in await self.frontier.lease(self.owner, self.concurrency - len(running)):
+                            running.add(asyncio.create_task(self.run_job(job)))
+                    if not running:
+                        jobs = (await self.frontier.stats())["jobs"]
+                        if not self.follow and jobs["ready"] + jobs["leased"] == 0:
+                            break
+                        await asyncio.sleep(POLL_INTERVAL) # Nothing ready yet: retries back off, hosts at their cap
+                        continue
+                    _, running = await asyncio.wait(running, timeout=POLL_INTERVAL, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for task in running:
+                    task.cancel()
+                dedup.save_indexes()
+                await storage.close_stores()
+                worker_pool.POOL.shutdown()
+        log(f"FRONTIER WORKER {self.owner}: {self.done_count} jobs done, {self.failed_count} failed, {self.lost_count} leases lost.",
+            event="frontier_report", owner=self.owner, done=self.done_count, failed=self.failed_count, lost=self.lost_count)
+
+    async def run_job(self, job):
+        # Nothing a job raises stops the worker or stays unread, the job goes back to the frontier
+        try:
+            await self.lease_and_crawl(job)
+        except Exception as error:
+            self.failed_count += 1
+            log(f"FRONTIER: JOB {job['id']} FAILED ({error!r}), back to the frontier.", event="job_failed", job=job["id"], error=repr(error))
+            try:
+                await self.frontier.fail(job["id"], self.owner, repr(error))
+            except Exception as fail_error:
+                log(f"FRONTIER: JOB {job['id']} NOT RELEASED ({fail_error!r}), back when its lease runs out.", event="job_lost", job=job["id"], error=repr(fail_error))
+
+    async def lease_and_crawl(self, job):
+        site = importlib.import_module(site_module(job["site"])) # An unknown site is never imported
+        output_pipeline = site.Output_Pipeline(crawl_number=job["crawl_number"], session_id=f"{site.SESSION_ID}-{job['crawl_number']}")
+        label = f"{job['site']} #{job['crawl_number']}" + (f" page {job['page_number']}" if job["kind"] == "page" else "")
+        log(f"FRONTIER: {label} LEASED (attempt {job['attempts']}).", event="job_leased", job=job["id"], kind=job["kind"], attempt=job["attempts"])
+        crawl = asyncio.create_task(self.crawl(site, output_pipeline, job))
+        try:
+            # Extend the lease while crawling, a lost lease means another worker has the job now
+            while not crawl.done():
+                await asyncio.wait([crawl], timeout=LEASE_SECONDS / 3)
+                if not crawl.done() and not await self.frontier.extend(job["id"], self.owner):
+                    crawl.cancel()
+                    self.lost_count += 1
+                    log(f"FRONTIER: {label} LEASE LOST, STOPPED.", event="job_lost", job=job["id"])
+                    return
+            error = crawl.exception() and repr(crawl.exception())
+            if error is None and output_pipeline.failed_page is not None:
+                error = f"failed at page {output_pipeline.failed_page}"
+        finally:
+            crawl.cancel()
+        if error is None:
+            await self.frontier.complete(job["id"], self.owner)
+            self.done_count += 1
+            log(f"FRONTIER: {label} DONE, {output_pipeline.crawled_page_count} pages, {output_pipeline.product_count} products.",
+                event="job_done", job=job["id"], pages=output_pipeline.crawled_page_count, products=output_pipeline.product_count)
+        else:
+            await self.frontier.fail(job["id"], self.owner, error)
+            self.failed_count += 1
+            log(f"FRONTIER: {label} FAILED ({error}), back to the frontier.", event="job_failed", job=job["id"], error=error)
+
+    async def crawl(self, site, output_pipeline, job):
+        crawler = await self.crawler(site)
+        if job["kind"] == "page":
+            result = await output_pipeline.crawl_page(crawler, job["page_number"])
+            # Pagination that links only a few pages ahead: the pages it shows are queued too (known URLs are ignored)
+            page_count = result.success and pagination.page_count_in_html(output_pipeline, await output_pipeline.page_html(result, job["page_number"]), job["page_number"])
+            if page_count and page_count > job["page_number"]:
+                await self.queue_pages(job, output_pipeline, job["page_number"] + 1, page_count)
+        elif pipeline.FAN_OUT and not output_pipeline.incremental:
+            # First page here, the rest queued as page jobs for every worker to take
+            first_page = output_pipeline.page_number
+            page_count = await output_pipeline.crawl_first_page(crawler)
+            if page_count is not None:
+                await self.queue_pages(job, output_pipeline, first_page + 1, page_count, reopen=True) # Pages of the last crawl too
+            elif output_pipeline.failed_page is None:
+                output_pipeline.page_number = first_page + 1 # No pagination to go by, in order until an empty page
+                await output_pipeline.run_in_order(crawler)
+        else:
+            await output_pipeline.run(crawler=crawler) # Resumes from its checkpoint after a failed attempt
+
+    async def queue_pages(self, job, output_pipeline, first_page, last_page, reopen=False):
+        jobs = [page_job(job["site"], job["crawl_number"], page_number, output_pipeline.page_url(page_number))
+                for page_number in range(first_page, last_page + 1)]
+        added = await self.frontier.add(jobs, reopen)
+        if added:
+            log(f"FRONTIER: {added} PAGES OF {job['site']} #{job['crawl_number']} QUEUED.", event="pages_queued", job=job["id"], pages=added)
+
+
+## COMMAND LINE
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Durable, sharded crawl frontier & its workers.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    seed_parser = commands.add_parser("seed", help="Queue every category of the sites")
+    seed_parser.add_argument("sites", nargs="+", help="gsmarena, startech, ryans, vertech (or configs module names)")
+    work_parser = commands.add_parser("work", help="Lease & crawl jobs")
+    work_parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    work_parser.add_argument("--follow", action="store_true", help="Keep polling once the frontier is empty")
+    work_parser.add_argument("--owner", help="Worker name (default: host-pid)")
+    work_parser.add_argument("--log-file", default=metrics.LOG_FILE)
+    serve_parser = commands.add_parser("serve", help="Serve the frontier to workers on other boxes")
+    serve_parser.add_argument("--port", type=int, default=SERVE_PORT)
+    serve_parser.add_argument("--host", default=SERVE_HOST, help="Interface to listen on (default: loopback only)")
+    commands.add_parser("stats", help="Jobs per status & host")
+    commands.add_parser("retry-dead", help="Give dead jobs another MAX_ATTEMPTS")
+    for command in commands.choices.values():
+        command.add_argument("--frontier-dir", default=FRONTIER_DIR)
+        command.add_argument("--remote", help="URL of `frontier.py serve` instead of the local shards")
+        command.add_argument("--token", default=TOKEN, help="Shared token of serve & --remote (default: FRONTIER_TOKEN)")
+    return parser.parse_args(argv)
+
+async def main(argv=None):
+    arguments = parse_arguments(argv)
+    frontier = Remote_Frontier(arguments.remote, arguments.token) if arguments.remote else Frontier(arguments.frontier_dir)
+    try:
+        if arguments.command == "seed":
+            jobs = []
+            for name in arguments.sites:
+                site = importlib.import_module(site_module(name))
+                jobs.extend(category_job(name, site, crawl_number) for crawl_number in range(len(site.URLS_TO_CRAWL)))
+            added = await frontier.add(jobs, reopen=True)
+            print(f"Queued {added} categories (new or crawled before), {len(jobs) - added} are still queued or running.")
+        elif arguments.command == "work":
+            metrics.configure(arguments.log_file)
+            await Frontier_Worker(frontier, arguments.owner, arguments.concurrency, arguments.follow).run()
+        elif arguments.command == "serve":
+            runner = await serve(frontier, arguments.port, arguments.host, arguments.token)
+            try:
+                await asyncio.Event().wait()
+            finally:
+                await runner.cleanup()
+        elif arguments.command == "stats":
+            print(json.dumps(await frontier.stats(), indent=2))
+        elif arguments.command == "retry-dead":
+            print(f"{await frontier.retry_dead()} dead jobs ready again.")
+    finally:
+        await frontier.close()
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,118 @@
+"""
+Browserless HTTP fast path for server-rendered listing pages (gsmarena, startech).
+Http_Crawler fetches pages with one pooled aiohttp session and runs the site's SCHEMA_FOR_EXTRACTION
+against the raw HTML with the precompiled lxml engine (extraction_engine.py).
+Output_Pipeline asks for the HTML only (arun(extract=False)) and extracts it in worker_pool.py.
+It has the same arun(url, config) call as crawl4ai's AsyncWebCrawler, so the rate limiter and Output_Pipeline use it unchanged.
+Configs modules pass it an Http_Config instead of a CrawlerRunConfig, so HTTP crawls never import crawl4ai.
+Sites that need JavaScript (e.g. Vertech) keep FETCH_MODE = "browser" and go through Chromium (browser_pool.py).
+"""
+
+import asyncio, json
+import aiohttp
+from extraction_engine import compile_schema
+from page_cache import conditional_headers, content_hash
+from metrics import METRICS
+
+## CONTROL VARIABLES
+MAX_CONNECTIONS = 32 # Pool size shared by all hosts
+MAX_CONNECTIONS_PER_HOST = 4
+REQUEST_TIMEOUT = 30 # Seconds
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/140.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+
+class Http_Result:
+    # The fields of crawl4ai's CrawlResult that the pipeline & rate limiter read
+    def __init__(self, url, success, status_code=None, html="", extracted_content=None, response_headers=None, error_message="", html_hash=None, not_modified=False, extraction=None):
+        self.url = url
+        self.success = success
+        self.status_code = status_code
+        self.html = html
+        self.extracted_content = extracted_content
+        self.response_headers = response_headers or {}
+        self.error_message = error_message
+        self.html_hash = html_hash
+        self.not_modified = not_modified # Page is the same as in page_cache, nothing extracted
+        self.extraction = extraction # (schema, css_selector) left to the caller, arun(extract=False)
+
+
+class Http_Config:
+    # The fields of crawl4ai's CrawlerRunConfig that Http_Crawler reads, built without importing crawl4ai
+    def __init__(self, css_selector=None, schema=None, session_id=None):
+        self.css_selector = css_selector
+        self.extraction_strategy = compile_schema(schema) if schema else None # Has .schema, like JsonCssExtractionStrategy
+        self.session_id = session_id
+
+
+class Http_Crawler:
+    def __init__(self):
+        self.session = None
+
+    async def start(self):
+        connector = aiohttp.TCPConnector(limit=MAX_CONNECTIONS, limit_per_host=MAX_CONNECTIONS_PER_HOST, ttl_dns_cache=300)
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            headers=HEADERS,
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+            )
+        return self
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def arun(self, url, config, cached_page=None, extract=True):
+        # cached_page: pages row from page_cache, turns the request into a conditional one
+        # extract=False: the HTML is returned unextracted with result.extraction, Output_Pipeline runs it in worker_pool
+        try:
+            with METRICS.time("fetch"):
+                async with self.session.get(url, headers=conditional_headers(cached_page)) as response:
+                    html = await response.text(errors="replace")
+                    status_code, headers = response.status, dict(response.headers)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+            return Http_Result(url, success=False, error_message=repr(error))
+        if status_code == 304:
+            return Http_Result(url, success=True, status_code=status_code, response_headers=headers, not_modified=True)
+        if status_code >= 400:
+            return Http_Result(url, success=False, status_code=status_code, html=html, response_headers=headers, error_message=f"HTTP {status_code}")
+
+        html_hash = content_hash(html)
+        if cached_page and html_hash == cached_page.get("html_hash"):
+            # Server ignores validators but sent the same bytes, skip extraction
+            return Http_Result(url, success=True, status_code=status_code, response_headers=headers, html_hash=html_hash, not_modified=True)
+
+        extracted_content = None
+        if config.extraction_strategy is not None and not extract:
+            return Http_Result(url, success=True, status_code=status_code, html=html, response_headers=headers, html_hash=html_hash,
+                               extraction=(config.extraction_strategy.schema, config.css_selector))
+        if config.extraction_strategy is not None:
+            # Parsed once, css_selector scoping & schema fields use selectors compiled on first use
+            with METRICS.time("extraction"):
+                extracted = compile_schema(config.extraction_strategy.schema).extract(html, config.css_selector)
+            extracted_content = json.dumps(extracted, ensure_ascii=False)
+        return Http_Result(url, success=True, status_code=status_code, html=html, extracted_content=extracted_content, response_headers=headers, html_hash=html_hash)
+
+
+# PICK THE FETCHER FOR A configs MODULE
+def get_crawler(site):
+    if getattr(site, "FETCH_MODE", "browser") == "http":
+        return Http_Crawler()
+    # One Chromium per configs module, POOL_SIZE tabs shared by all of its pages
+    import browser_pool # Playwright & crawl4ai load only for sites that need a browser
+    return browser_pool.Browser_Pool(
+        site.get_browser_config(),
+        size=getattr(site, "POOL_SIZE", browser_pool.POOL_SIZE),
+        prefix=site.SESSION_ID,
+        render_profile=getattr(site, "RENDER_PROFILE", None)
+        )
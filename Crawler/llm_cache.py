@@ -0,0 +1,162 @@
+"""
+Content-addressed, disk-backed cache for LLM extraction results.
+LLMExtractionStrategy sends every chunk of every page to the model, even when the product cards are the same as last run.
+Cached_LLM_Strategy keys each chunk by a hash of its whitespace-normalized text plus everything that shapes the answer
+(provider, schema, instruction, extraction type), and answers unchanged chunks from the cache without a model call.
+The cache is one SQLite file, bounded to MAX_CACHE_BYTES by evicting least recently used entries.
+Only clean answers are cached, a chunk that came back with an error is asked again next time.
+
+Usage:: python llm_cache.py stats    Entries & size of the cache
+        python llm_cache.py clear    Empty the cache
+"""
+
+import json, os, sqlite3, sys, threading, time
+import xxhash
+from crawl4ai import LLMExtractionStrategy
+import storage
+
+## CONTROL VARIABLES
+LLM_CACHE_FILE = os.path.join(storage.DATABASE_DIR, "llm_cache.db")
+MAX_CACHE_BYTES = 64 * 1024 * 1024 # Evicts down to 90% of this once exceeded
+CACHE_VERSION = 1 # Bump to invalidate every entry (e.g. after changing how answers are post-processed)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    blocks TEXT NOT NULL,
+    tokens INTEGER NOT NULL, -- Tokens the model call cost, saved on every hit
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache(last_used);
+"""
+
+
+class Llm_Cache:
+    # Synchronous sqlite3, crawl4ai runs extraction in worker threads
+    def __init__(self, cache_file=LLM_CACHE_FILE, max_bytes=MAX_CACHE_BYTES):
+        self.cache_file = cache_file
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        self.db = sqlite3.connect(cache_file, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self.total_bytes = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+        self.tokens_saved = 0
+
+    def get(self, key):
+        with self.lock:
+            row = self.db.execute("SELECT blocks, tokens FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.db.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.db.commit()
+            self.hits += 1
+            self.tokens_saved += row[1]
+        return json.loads(row[0])
+
+    def put(self, key, blocks, tokens):
+        text = json.dumps(blocks, ensure_ascii=False)
+        size = len(text.encode("utf-8"))
+        with self.lock:
+            old = self.db.execute("SELECT size FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            self.db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, blocks, tokens, size, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, text, tokens, size, time.time())
+                )
+            self.total_bytes += size - (old[0] if old else 0)
+            if self.total_bytes > self.max_bytes:
+                self.evict(int(self.max_bytes * 0.9))
+            self.db.commit()
+
+    def evict(self, target_bytes):
+        # Least recently used first, until the cache is under target_bytes
+        evicted = []
+        for key, size in self.db.execute("SELECT key, size FROM llm_cache ORDER BY last_used").fetchall():
+            if self.total_bytes <= target_bytes:
+                break
+            evicted.append((key,))
+            self.total_bytes -= size
+        self.db.executemany("DELETE FROM llm_cache WHERE key = ?", evicted)
+
+    def stats(self):
+        count = self.db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        return count, self.total_bytes
+
+    def clear(self):
+        with self.lock:
+            self.db.execute("DELETE FROM llm_cache")
+            self.db.commit()
+            self.total_bytes = 0
+
+    def report(self):
+        lookups = self.hits + self.misses
+        hit_rate = self.hits / lookups if lookups else 0
+        count, total_bytes = self.stats()
+        return (f"LLM CACHE: {self.hits} hits, {self.misses} misses ({hit_rate:.0%} hit rate), {self.tokens_saved:,} tokens saved. "
+                f"{count} entries, {total_bytes / 1024:.0f} KB.")
+
+
+# CACHES SHARED BY EVERY STRATEGY IN THE PROCESS, OPENED ON FIRST USE
+CACHES = {}
+
+def get_cache(cache_file=LLM_CACHE_FILE):
+    if cache_file not in CACHES:
+        CACHES[cache_file] = Llm_Cache(cache_file)
+    return CACHES[cache_file]
+
+
+class Cached_LLM_Strategy(LLMExtractionStrategy):
+    # Drop-in for LLMExtractionStrategy, holds only the cache file path so it can still be copied like any strategy
+    # No __init__ override, crawl4ai validates attributes against LLMExtractionStrategy.__init__'s signature
+    cache_file = LLM_CACHE_FILE
+
+    @property
+    def cache(self):
+        return get_cache(self.cache_file)
+
+    def cache_key(self, chunk):
+        prompt_inputs = json.dumps([
+            CACHE_VERSION,
+            self.llm_config.provider,
+            self.extract_type,
+            self.schema,
+            self.instruction,
+            " ".join(chunk.split()), # Whitespace-only changes don't miss
+            ], sort_keys=True, ensure_ascii=False)
+        return xxhash.xxh3_128_hexdigest(prompt_inputs.encode("utf-8"))
+
+    def extract(self, url, ix, html):
+        key = self.cache_key(html)
+        blocks = self.cache.get(key)
+        if blocks is not None:
+            if self.verbose:
+                print(f"[LOG] LLM cache hit for {url} - block index: {ix}")
+            return blocks
+        tokens_before = self.total_usage.total_tokens
+        blocks = super().extract(url, ix, html)
+        if blocks and not any(block.get("error") for block in blocks if isinstance(block, dict)):
+            # Exact for sequential providers (groq), approximate when chunks run in parallel threads
+            self.cache.put(key, blocks, self.total_usage.total_tokens - tokens_before)
+        return blocks
+
+    def show_usage(self):
+        super().show_usage()
+        print(self.cache.report())
+
+
+if __name__ == '__main__':
+    command = sys.argv[1:2]
+    if command == ["stats"]:
+        count, total_bytes = get_cache().stats()
+        print(f"{count} entries, {total_bytes / 1024:.0f} KB in {LLM_CACHE_FILE}.")
+    elif command == ["clear"]:
+        get_cache().clear()
+        print(f"Cleared {LLM_CACHE_FILE}.")
+    else:
+        print(__doc__)
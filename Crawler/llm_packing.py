@@ -0,0 +1,120 @@
+"""
+Token-budgeted pre-pruning & chunk packing for LLM extraction.
+Instead of sending each page's whole markdown inside css_selector to the model, one call per page:
+    1. every product card is pruned to what the Products model needs (url, image url, text lines without button noise),
+    2. cards are counted with tiktoken and packed, across pages, into chunks that fill CONTEXT_BUDGET
+       (crawl4ai's prompt + cards + room for the JSON answer) without exceeding it,
+    3. each full chunk is ONE LLM call, so there are fewer, denser calls per product.
+"""
+
+import json
+from crawl4ai.prompts import PROMPT_EXTRACT_SCHEMA_WITH_INSTRUCTION
+from extraction_engine import compile_selector, parse
+from lxml import etree
+
+## CONTROL VARIABLES
+ENCODING = "cl100k_base" # Budget tokenizer, the model's own differs by a few %, covered by SAFETY_MARGIN
+CONTEXT_BUDGET = 8192 # Tokens per LLM call: prompt + cards + answer
+SAFETY_MARGIN = 0.9
+OUTPUT_TOKENS_PER_CARD = 120 # Room kept for each product's JSON in the answer
+MAX_CARD_TOKENS = 400 # Longer cards are cut, spec lists run on
+WORD_TOKEN_RATE = 4 / 3 # Estimate used only if the tiktoken encoding can't be loaded (offline)
+NOISE = {"add to cart", "compare", "add to compare", "buy now", "quick view", "add to wishlist", "wishlist", "out of stock"}
+CARD_SEPARATOR = "\n---\n"
+
+CARD_TEXT = etree.XPath(".//text()[not(ancestor::script) and not(ancestor::style)]")
+CARD_LINK = etree.XPath(".//a[@href]/@href")
+CARD_IMAGE = etree.XPath(".//img/@src | .//img/@data-src")
+
+
+## TOKEN COUNTING
+ENCODER = None
+
+def get_encoder():
+    global ENCODER
+    if ENCODER is None:
+        try:
+            import tiktoken
+            ENCODER = tiktoken.get_encoding(ENCODING)
+        except Exception as error: # tiktoken downloads the encoding on first use
+            print(f"tiktoken encoding unavailable ({error!r}), estimating tokens from words.")
+            ENCODER = False
+    return ENCODER
+
+def count_tokens(text):
+    encoder = get_encoder()
+    if encoder:
+        return len(encoder.encode(text, disallowed_special=()))
+    return int(len(text.split()) * WORD_TOKEN_RATE) + 1
+
+def truncate_tokens(text, max_tokens):
+    encoder = get_encoder()
+    if encoder:
+        return encoder.decode(encoder.encode(text, disallowed_special=())[:max_tokens])
+    return " ".join(text.split()[:int(max_tokens / WORD_TOKEN_RATE)])
+
+def prompt_tokens(strategy):
+    # crawl4ai's extraction prompt with the schema & instruction, everything but the chunk itself
+    prompt = PROMPT_EXTRACT_SCHEMA_WITH_INSTRUCTION
+    for variable, value in {"URL": "", "HTML": "", "REQUEST": strategy.instruction or "", "SCHEMA": json.dumps(strategy.schema, indent=2)}.items():
+        prompt = prompt.replace("{" + variable + "}", value)
+    return count_tokens(prompt)
+
+
+## PRE-PRUNING
+def prune_card(element):
+    lines = []
+    for text in CARD_TEXT(element):
+        line = " ".join(text.split())
+        if line and line.lower() not in NOISE and line not in lines:
+            lines.append(line)
+    links, images = CARD_LINK(element), CARD_IMAGE(element)
+    card = [f"url: {links[0]}" if links else "", f"image_url: {images[0]}" if images else "", *lines]
+    card = "\n".join(line for line in card if line)
+    if count_tokens(card) > MAX_CARD_TOKENS:
+        card = truncate_tokens(card, MAX_CARD_TOKENS)
+    return card
+
+def prune_cards(html, card_selector):
+    # One pruned text block per product card on the page
+    root = parse(html)
+    if root is None:
+        return []
+    return [card for card in (prune_card(element) for element in compile_selector(card_selector)(root)) if card]
+
+
+## CHUNK PACKING
+class Chunk_Packer:
+    def __init__(self, prompt_token_count, budget=CONTEXT_BUDGET):
+        self.capacity = int(budget * SAFETY_MARGIN) - prompt_token_count
+        self.cards = []
+        self.tokens = 0
+        self.separator_tokens = count_tokens(CARD_SEPARATOR)
+        self.card_count = 0
+        self.chunk_count = 0
+        self.packed_tokens = 0
+
+    # RETURNS THE CHUNKS FILLED BY THESE CARDS, THE REST WAITS FOR MORE CARDS OR flush()
+    def add(self, cards):
+        chunks = []
+        for card in cards:
+            cost = count_tokens(card) + self.separator_tokens + OUTPUT_TOKENS_PER_CARD
+            if self.cards and self.tokens + cost > self.capacity:
+                chunks.append(self.flush())
+            self.cards.append(card)
+            self.tokens += cost
+            self.card_count += 1
+        return chunks
+
+    def flush(self):
+        if not self.cards:
+            return None
+        chunk = CARD_SEPARATOR.join(self.cards)
+        self.chunk_count += 1
+        self.packed_tokens += count_tokens(chunk)
+        self.cards, self.tokens = [], 0
+        return chunk
+
+    def report(self):
+        per_chunk = self.card_count / self.chunk_count if self.chunk_count else 0
+        return f"PACKING: {self.card_count} cards in {self.chunk_count} LLM calls ({per_chunk:.1f} cards/call), {self.packed_tokens:,} card tokens, capacity {self.capacity:,} tokens/call."
@@ -5,10 +5,8 @@ Schema is handcrafted after inspecting the webpage structure for specific websit
 
 """
 SCOPE FOR IMPROVEMENTS:
-1. Could be automated to loop through all categories in urls_to_crawl list.
 5. Error handling might need improvements.
 6. Duplicates are not handled.
-7. Logging needs to be improved. Logs needs to be written to a file. Explore logging module.
 8. Memory management for large crawls need to be checked.
 9. Later maybe build a UI to select website, generate schema using LLM, upload schema, Select crawl number/category/page number, view logs
 10. Build in Docker.
@@ -16,38 +14,83 @@ SCOPE FOR IMPROVEMENTS:
 12. Need to explore LLM based schema generation.
 """
 
-import asyncio
-from crawl4ai import AsyncWebCrawler
+import argparse, asyncio, importlib, time
+START_TIME = time.perf_counter()
 from dotenv import load_dotenv
-import configs
+import storage, dedup, http_fetcher, pipeline, metrics, worker_pool
+from metrics import log
 
 load_dotenv()
-test_mode = configs.TEST_MODE
 
-async def crawl_products(test_mode):
+# SITE NAME -> configs MODULE, imported only once picked
+SITES = {
+    "gsmarena": "configs",
+    "startech": "configs_startech",
+    "ryans": "configs_ryans",
+    "vertech": "configs_vertech",
+}
+
+async def crawl_products(site, crawl_number):
     # CONFIGURATION VARIABLES TO SET UP CRAWLING
-    browser_config = configs.get_browser_config()   
+    output_pipeline = site.Output_Pipeline(crawl_number=crawl_number)
     try:
-        async with AsyncWebCrawler(config=browser_config) as crawler:
-            output_pipeline = configs.Output_Pipeline()
-            if test_mode:
-                print("RUNNING ON TEST MODE.")
-            while True:
-                print("STATUS: INITIATING CRAWLING.")
-                should_continue = await output_pipeline(crawler=crawler)
-                print(should_continue)
-                if not should_continue:
-                    print("STOPPING OUTPUT PIPELINE.")
-                    break
+        # Chromium, or plain HTTP when site.FETCH_MODE == "http"
+        async with http_fetcher.get_crawler(site) as crawler:
+            if site.TEST_MODE:
+                log("RUNNING ON TEST MODE.", event="test_mode")
+            log("STATUS: INITIATING CRAWLING.", event="crawl_started", crawl_number=crawl_number, label=output_pipeline.label)
+            # Fetch, extraction & writing of consecutive pages overlap, see pipeline.py
+            await output_pipeline.run(crawler=crawler)
     # FINAL LOG               
     finally:
-        print("CRAWLING COMPLETE.")
-        print(f"Crawled {output_pipeline.crawled_page_count} Pages.")
-        print(f"Total {output_pipeline.product_count} information added to Database.")
+        dedup.save_indexes()
+        await storage.close_stores()
+        log(worker_pool.POOL.report(), event="worker_pool", pages=worker_pool.POOL.page_count, batches=worker_pool.POOL.batch_count)
+        worker_pool.POOL.shutdown()
+        log("CRAWLING COMPLETE.", event="crawl_complete")
+        log(f"Crawled {output_pipeline.crawled_page_count} Pages ({output_pipeline.unchanged_page_count} unchanged, {output_pipeline.pages_per_minute:.1f} pages/min).",
+            event="crawl_report", pages=output_pipeline.crawled_page_count, unchanged_pages=output_pipeline.unchanged_page_count, pages_per_minute=round(output_pipeline.pages_per_minute, 1))
+        log(f"Total {output_pipeline.product_count} information added to Database ({output_pipeline.new_product_count} new).",
+            event="crawl_report", products=output_pipeline.product_count, new_products=output_pipeline.new_product_count)
+        if output_pipeline.failed_page is not None:
+            log(f"Stopped at Page {output_pipeline.failed_page}, run again to resume from there.", event="crawl_report", failed_page=output_pipeline.failed_page)
         
 
-async def main():
-    await crawl_products(test_mode=test_mode)
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Crawl product listings of one site into the products database.")
+    parser.add_argument("site", nargs="?", default="gsmarena", choices=SITES, help="Site to crawl (default: gsmarena)")
+    parser.add_argument("--crawl-number", type=int, help="Entry of the site's URLS_TO_CRAWL (default: its CRAWL_NUMBER)")
+    parser.add_argument("--all", action="store_true", help="Crawl every entry of URLS_TO_CRAWL concurrently")
+    parser.add_argument("--test", action="store_true", help="Test mode, first page only into the test database")
+    parser.add_argument("--incremental", action="store_true", help="Stop each category at the first page of only known products")
+    parser.add_argument("--restart", action="store_true", help="Ignore checkpoints, start every category at its PAGE_NUMBER")
+    parser.add_argument("--fetch-mode", choices=["http", "browser"], help="Override the site's FETCH_MODE")
+    parser.add_argument("--log-file", default=metrics.LOG_FILE, help="JSON-lines log (default: %(default)s), '' for console only")
+    parser.add_argument("--metrics-file", default=metrics.METRICS_FILE, help="Prometheus text metrics file (default: %(default)s)")
+    parser.add_argument("--metrics-port", type=int, help="Also serve the metrics at http://HOST:PORT/metrics during the crawl")
+    parser.add_argument("--metrics-host", default=metrics.METRICS_HOST, help="Interface of --metrics-port (default: %(default)s)")
+    return parser.parse_args(argv)
+
+async def main(argv=None):
+    arguments = parse_arguments(argv)
+    site = importlib.import_module(SITES[arguments.site])
+    # COMMAND LINE OVERRIDES THE SITE'S CONTROL VARIABLES
+    site.TEST_MODE = arguments.test or site.TEST_MODE
+    site.INCREMENTAL = arguments.incremental or site.INCREMENTAL
+    site.FETCH_MODE = arguments.fetch_mode or site.FETCH_MODE
+    pipeline.RESUME = not arguments.restart and pipeline.RESUME
+    metrics.configure(arguments.log_file)
+    log(f"STARTED IN {time.perf_counter() - START_TIME:.2f}s ({arguments.site}, {site.FETCH_MODE}).",
+        event="startup", seconds=round(time.perf_counter() - START_TIME, 3), fetch_mode=site.FETCH_MODE)
+    # Time per stage & counters, see metrics.py
+    async with metrics.exporting(arguments.metrics_file, arguments.metrics_port, arguments.metrics_host):
+        if arguments.all or getattr(site, "CRAWL_ALL", False):
+            # ALL CATEGORIES, CONCURRENTLY
+            import scheduler
+            await scheduler.Crawl_Scheduler.for_sites([site]).run()
+        else:
+            crawl_number = site.CRAWL_NUMBER if arguments.crawl_number is None else arguments.crawl_number
+            await crawl_products(site, crawl_number)
 
 if __name__ == '__main__':
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
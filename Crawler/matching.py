@@ -0,0 +1,513 @@
+"""
+Cross-site product matching: which listing of ryans, startech, vertech (or gsmarena) is the same product.
+Names are tokenized with model-number normalization, so every spelling of a model number meets:
+    "ANV15-51-795H" -> anv15 51 795h + anv1551795h,   "i7-13620H" -> i7 13620h + i713620h,
+    "RTX 4050" & "RTX4050" -> rtx 4050 rtx4050,        15.6" / 15.6 inch -> 15.6in,   16 GB -> 16gb
+Tokens go into an inverted index (token -> {product: term count}) that grows in place as rows arrive, a query
+only scores the products sharing one of its rarer tokens instead of the whole corpus.
+Ranking is BM25Okapi, the same formula & parameters as rank-bm25 (bench checks the scores against it), with model
+numbers weighted up. A best match is accepted when the shorter name's model numbers are all in the longer one,
+the standalone numbers of each name (generation "6" / "6th", year "2019") are in the other and enough of the shorter
+name's IDF weight is covered; two listings are linked when each is the other's best match on its site.
+With pipeline.MATCH_ON_WRITE every page Output_Pipeline writes is linked as it arrives, against the whole database.
+Links are saved one row per direction in storage's product_links table (or a CSV file).
+
+Usage:: python matching.py link [csv file ...] [--out links.csv]    Link Database/*.csv (default) or the given files
+        python matching.py store [--out links.csv]                  Link every product of the database, saved to product_links
+        python matching.py query <name> [site]                      Best matches of a name, per site
+        python matching.py bench [copies]                           Index & link timings, BM25 scores vs rank-bm25, known pairs
+"""
+
+import asyncio, csv, functools, glob, math, os, re, sys, time
+from collections import Counter, defaultdict
+from normalize import clean_name
+from storage import DATABASE_DIR
+from metrics import log
+
+## CONTROL VARIABLES
+K1 = 1.5 # rank_bm25.BM25Okapi defaults
+B = 0.75
+EPSILON = 0.25
+MODEL_WEIGHT = 3.0 # Query weight of model-number tokens
+CANDIDATES = 16 # Products scored per query: those of its rarest token, then of further tokens in at most this many products
+MIN_CONFIDENCE = 0.75 # Share of the shorter name's IDF weight the longer one must contain
+LINKS_FILE = os.path.join(DATABASE_DIR, "product_links.csv")
+
+UNITS = re.compile(r"(\d+(?:\.\d+)?)\s*(gb|tb|mb|ghz|hz|mah|mp|w|k)\b")
+INCHES = re.compile(r"(\d+(?:\.\d+)?)\s*(?:\"|”|''|-?\s*inch(?:es)?\b)")
+CHUNK = re.compile(r"[a-z0-9]+(?:[-/.][a-z0-9]+)*") # "anv15-51-795h", "15.6in", "8gb/512gb"
+WORD = re.compile(r"\d+\.\d+[a-z]*|[a-z0-9]+")
+PREFIX = re.compile(r"^([a-z]+)(\d\w*)$") # "rtx4050" -> rtx 4050, "c3322" -> c 3322
+VERSION = re.compile(r"^(?:\d{1,4}|\d+(?:st|nd|rd|th))$") # A number on its own: "iPad mini 6", "6th gen", "(2019)"
+YEAR = re.compile(r"^(?:19|20)\d\d$")
+SPEC = re.compile(r"^\d+(?:\.\d+)?(?:gb|tb|mb|ghz|hz|mah|mp|w|k|in|st|nd|rd|th)$") # Numbers with a unit aren't models
+QUALIFIERS = {"pro", "plus", "max", "mini", "ultra", "lite", "neo", "prime", "fe", "se", "fold", "flip", "edge", "note",
+              "classic", "racing", "turbo", "power", "play", "go", "air", "slim"} # Must agree
+BRANDS = {"samsung", "apple", "xiaomi", "realme", "oppo", "vivo", "oneplus", "google", "nokia", "motorola", "huawei",
+          "honor", "sony", "lg", "htc", "infinix", "tecno", "itel", "walton", "symphony", "lenovo", "asus", "hp", "dell",
+          "acer", "msi", "gigabyte", "microsoft", "zte", "meizu", "alcatel", "blackberry"} # Must agree when both name one
+STOP_WORDS = {"with", "and", "the", "for", "of", "in", "to", "a", "new", "official", "edition"}
+SERIES_BRANDS = { # Names that often leave the brand out
+    "galaxy": "samsung", "iphone": "apple", "ipad": "apple", "macbook": "apple", "imac": "apple", "pixel": "google",
+    "redmi": "xiaomi", "poco": "xiaomi", "thinkpad": "lenovo", "ideapad": "lenovo", "legion": "lenovo",
+    "vivobook": "asus", "zenbook": "asus", "rog": "asus", "tuf": "asus", "pavilion": "hp", "victus": "hp",
+    "omen": "hp", "elitebook": "hp", "probook": "hp", "inspiron": "dell", "latitude": "dell", "vostro": "dell",
+    "xps": "dell", "aspire": "acer", "nitro": "acer", "predator": "acer", "swift": "acer",
+}
+
+
+## TOKENS
+@functools.lru_cache(maxsize=1 << 16)
+def is_model(token):
+    # Letters & digits mixed ("15irh10", "s24") or a long number ("4050"), but not a spec ("16gb", "13th")
+    if SPEC.match(token):
+        return False
+    has_digit = any(character.isdigit() for character in token)
+    return has_digit and (len(token) >= 4 if token.isdigit() else len(token) >= 2 and not token.replace(".", "").isdigit())
+
+def chunks(name, price=None):
+    # price: the row's raw price text, stripped from the end of an uncleaned name (normalize.py)
+    text = clean_name(name, price).lower().replace("+", " plus ")
+    return CHUNK.findall(INCHES.sub(r"\1in ", UNITS.sub(r"\1\2", text)))
+
+def versions(name, price=None):
+    # Standalone numbers, "ANV15-51-795H" is a model number & has none
+    return {chunk for chunk in chunks(name, price) if VERSION.match(chunk)}
+
+def tokenize(name, price=None):
+    tokens = []
+    for chunk in chunks(name, price):
+        words = WORD.findall(chunk)
+        tokens += words
+        if len(words) > 1 and any(character.isdigit() for character in chunk) and "." not in chunk.strip("."):
+            tokens.append("".join(words)) # Hyphenated model number, also spelled without hyphens
+        for word in words:
+            split = PREFIX.match(word)
+            if split:
+                tokens += split.groups() # "rtx4050" meets "rtx 4050"
+    joined = []
+    for word, following in zip(tokens, tokens[1:]):
+        if word.isalpha() and len(word) <= 4 and following[:1].isdigit() and not SPEC.match(following):
+            joined.append(word + following) # "rtx 4050" meets "rtx4050", "galaxy s 24" meets "s24"
+    tokens += joined
+    tokens += [SERIES_BRANDS[token] for token in tokens if token in SERIES_BRANDS and SERIES_BRANDS[token] not in tokens]
+    return [token for token in tokens if token not in STOP_WORDS]
+
+
+## INDEX
+class Product_Index:
+    def __init__(self, k1=K1, b=B, epsilon=EPSILON, model_weight=MODEL_WEIGHT):
+        self.k1, self.b, self.epsilon, self.model_weight = k1, b, epsilon, model_weight
+        self.products = [] # Product id -> record (None once replaced)
+        self.terms = [] # Product id -> Counter of its tokens
+        self.lengths = [] # Product id -> token count
+        self.models = [] # Product id -> set of its model-number tokens
+        self.versions = [] # Product id -> set of its standalone numbers
+        self.postings = defaultdict(dict) # Token -> {product id: term count}
+        self.site_postings = defaultdict(set) # (site, token) -> product ids, candidates of a site without filtering
+        self.by_url = {}
+        self.total_length = 0
+        self.count = 0 # Live products
+        self.sites = set()
+        self.average_idf = None # Mean IDF of every token (BM25Okapi's floor for negative IDF), None when stale
+        self.idfs = {} # Token -> IDF, emptied on every change
+        self.token_weights = {} # Token -> query weight x IDF, emptied on every change
+
+    def __len__(self):
+        return self.count
+
+    def add(self, record):
+        # Returns the product id, a known URL with a new name replaces its old entry
+        url = record.get("url") or f"#{len(self.products)}"
+        name = record.get("name") or ""
+        if url in self.by_url:
+            product_id = self.by_url[url]
+            if self.products[product_id]["name"] == name and self.products[product_id]["site"] == record.get("site"):
+                return product_id
+            self.remove(product_id)
+        terms = Counter(tokenize(name, record.get("price")))
+        product_id = len(self.products)
+        self.products.append({"site": record.get("site") or "", "name": name, "url": url})
+        self.terms.append(terms)
+        self.lengths.append(sum(terms.values()))
+        self.models.append({token for token in terms if is_model(token)})
+        self.versions.append(versions(name, record.get("price")))
+        for token, count in terms.items():
+            self.postings[token][product_id] = count
+            self.site_postings[(self.products[product_id]["site"], token)].add(product_id)
+        self.by_url[url] = product_id
+        self.total_length += self.lengths[product_id]
+        self.count += 1
+        self.sites.add(self.products[product_id]["site"])
+        self.changed()
+        return product_id
+
+    def add_all(self, records):
+        return [self.add(record) for record in records]
+
+    def remove(self, product_id):
+        site = self.products[product_id]["site"]
+        for token in self.terms[product_id]:
+            del self.postings[token][product_id]
+            if not self.postings[token]:
+                del self.postings[token]
+            self.site_postings[(site, token)].discard(product_id)
+            if not self.site_postings[(site, token)]:
+                del self.site_postings[(site, token)]
+        self.total_length -= self.lengths[product_id]
+        del self.by_url[self.products[product_id]["url"]]
+        self.products[product_id] = None
+        self.terms[product_id] = Counter()
+        self.lengths[product_id] = 0
+        self.models[product_id] = set()
+        self.versions[product_id] = set()
+        self.count -= 1
+        self.changed()
+
+    def changed(self):
+        self.average_idf = None
+        self.idfs = {}
+        self.token_weights = {}
+
+    ## BM25
+    def raw_idf(self, token):
+        frequency = len(self.postings.get(token, ()))
+        return math.log(self.count - frequency + 0.5) - math.log(frequency + 0.5)
+
+    def idf(self, token):
+        if token in self.idfs:
+            return self.idfs[token]
+        if token not in self.postings:
+            return 0.0 # Not in the corpus, rank-bm25 scores it 0 too
+        if self.average_idf is None:
+            self.average_idf = sum(map(self.raw_idf, self.postings)) / len(self.postings)
+        value = self.raw_idf(token)
+        self.idfs[token] = value if value >= 0 else self.epsilon * self.average_idf
+        return self.idfs[token]
+
+    def weights(self, tokens):
+        # Query token -> weight x IDF, a repeated token counts every time like in rank-bm25
+        weights = Counter()
+        for token in tokens:
+            weight = self.token_weights.get(token)
+            if weight is None:
+                weight = self.token_weights[token] = (self.model_weight if is_model(token) else 1.0) * self.idf(token)
+            weights[token] += weight
+        return weights
+
+    def score(self, weights, product_id, average_length):
+        terms = self.terms[product_id]
+        norm = self.k1 * (1 - self.b + self.b * self.lengths[product_id] / average_length)
+        total = 0.0
+        for token, weight in weights.items():
+            count = terms.get(token)
+            if count:
+                total += weight * count * (self.k1 + 1) / (count + norm)
+        return total
+
+    def candidates(self, weights, site=None):
+        # Products sharing the rarest tokens of the query, common ones ("laptop", "samsung") only add to the score
+        if site is None:
+            postings = [self.postings[token].keys() for token in weights if token in self.postings]
+        else:
+            postings = [self.site_postings[(site, token)] for token in weights if (site, token) in self.site_postings]
+        candidates = set()
+        for products in sorted(postings, key=len):
+            if len(candidates) >= CANDIDATES or candidates and len(products) > CANDIDATES:
+                break
+            candidates.update(products)
+        return candidates
+
+    def search(self, name, limit=5, site=None, exclude_site=None, tokens=None):
+        # [(score, product id)] best first
+        if not self.count:
+            return []
+        weights = self.weights(tokenize(name) if tokens is None else tokens)
+        average_length = self.total_length / self.count or 1
+        scored = [(self.score(weights, product_id, average_length), product_id) for product_id in self.candidates(weights, site)
+                  if exclude_site is None or self.products[product_id]["site"] != exclude_site]
+        return sorted((item for item in scored if item[0] > 0), reverse=True)[:limit]
+
+    ## MATCHES
+    def confidence(self, product_id, other_id):
+        # IDF weight of the shorter name covered by the longer one, 0 if a model number of the shorter is missing
+        # or the two disagree on brand, variant ("S23" is not "S23 Plus") or generation ("iPad mini 6" is not "Ipad Mini Wi Fi")
+        short, long = sorted((product_id, other_id), key=lambda key: (len(self.terms[key]), key))
+        short_tokens, long_tokens = self.terms[short].keys(), self.terms[long].keys()
+        if not self.models[short] <= long_tokens or self.models[long] and not self.models[short]:
+            return 0.0 # "Lenovo ThinkPad" names no model, it isn't "ThinkPad E14"
+        for one, other in ((short, long), (long, short)):
+            missing = self.versions[one] - self.terms[other].keys()
+            # Only a year may be missing, from a name with its own number & no year: "Ipad Mini 4 (2015)" is "iPad mini 4"
+            if any(not YEAR.match(number) for number in missing) or missing and not (
+                    self.versions[other] and not any(YEAR.match(number) for number in self.versions[other])):
+                return 0.0
+        if short_tokens & QUALIFIERS != long_tokens & QUALIFIERS:
+            return 0.0
+        brands = short_tokens & BRANDS, long_tokens & BRANDS
+        if all(brands) and not brands[0] & brands[1]:
+            return 0.0
+        weights = {token: self.idf(token) for token in self.terms[short]}
+        total = sum(weights.values())
+        return sum(weight for token, weight in weights.items() if token in self.terms[long]) / total if total > 0 else 0.0
+
+    def best(self, product_id, site, cache=None):
+        # (other id, score, confidence) of the best accepted match on site, or None
+        key = (product_id, site)
+        if cache is not None and key in cache:
+            return cache[key]
+        product = self.products[product_id]
+        found = None
+        for score, other_id in self.search(product["name"], limit=3, site=site, tokens=list(self.terms[product_id].elements())):
+            confidence = self.confidence(product_id, other_id)
+            if confidence >= MIN_CONFIDENCE:
+                found = (other_id, score, confidence)
+                break
+        if cache is not None:
+            cache[key] = found
+        return found
+
+    def link(self, product_id, cache=None, sites=None):
+        # [(product id, other id, score, confidence)] for every (other) site where the two are each other's best match
+        links = []
+        site = self.products[product_id]["site"]
+        for other_site in sorted((self.sites if sites is None else sites) - {site}):
+            found = self.best(product_id, other_site, cache)
+            if found is None:
+                continue
+            other_id, score, confidence = found
+            back = self.best(other_id, site, cache)
+            if back is not None and back[0] == product_id:
+                links.append((product_id, other_id, score, confidence))
+        return links
+
+    def link_all(self):
+        # Every mutual best match once, site pairs in name order
+        cache = {}
+        links = []
+        for product_id, product in enumerate(self.products):
+            if product is None:
+                continue
+            links += self.link(product_id, cache, {site for site in self.sites if site > product["site"]})
+        return links
+
+    def rows(self, links):
+        # Links as CSV/database rows, one per direction
+        for product_id, other_id, score, confidence in links:
+            for one, other in ((product_id, other_id), (other_id, product_id)):
+                yield {"site": self.products[one]["site"], "name": self.products[one]["name"], "url": self.products[one]["url"],
+                       "other_site": self.products[other]["site"], "other_name": self.products[other]["name"],
+                       "other_url": self.products[other]["url"], "score": round(score, 3), "confidence": round(confidence, 3)}
+
+
+## SOURCES
+def csv_site(csv_file):
+    # Database/Vertech_products.csv -> vertech, the site name of the crawler
+    return os.path.splitext(os.path.basename(csv_file))[0].lower().removesuffix("_products")
+
+def load_csv(index, csv_file, site=None):
+    # Same header aliases as storage.import_csv(), gsmarena's Brand/Model map to category/name
+    aliases = {"brand": "category", "model": "name"}
+    site = site or csv_site(csv_file)
+    with open(csv_file, newline='', encoding='utf-8') as file:
+        records = [dict({aliases.get(key.lower(), key.lower()): value for key, value in row.items()}, site=site)
+                   for row in csv.DictReader(file)]
+    return index.add_all(records)
+
+async def load_store(index, db_file=None):
+    import storage
+    store = await storage.get_store(db_file or storage.DB_FILE)
+    count = 0
+    async for row in store.rows():
+        index.add(row)
+        count += 1
+    return count
+
+
+## INCREMENTAL MATCHING OF WRITTEN PAGES
+class Matcher:
+    # Index of every product of the database, kept up to date by the pipelines writing to it
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self.index = Product_Index()
+        self.link_count = 0
+
+    async def open(self):
+        start_time = time.perf_counter()
+        count = await load_store(self.index, self.db_file)
+        log(f"MATCHING INDEX: {count} products in {time.perf_counter() - start_time:.2f}s.", event="matching_index", products=count)
+        return self
+
+    async def add(self, records):
+        # Index the page, then link its products, returns the links saved
+        import storage
+        product_ids = self.index.add_all(records)
+        links = [link for product_id in product_ids for link in self.index.link(product_id)]
+        if links:
+            store = await storage.get_store(self.db_file)
+            await store.upsert_links(list(self.index.rows(links)))
+        self.link_count += len(links)
+        return len(links)
+
+
+# MATCHERS SHARED BY EVERY PIPELINE IN THE PROCESS, LOADED ON FIRST USE
+MATCHERS = {}
+
+async def get_matcher(db_file):
+    if db_file not in MATCHERS:
+        matcher = await Matcher(db_file).open()
+        MATCHERS.setdefault(db_file, matcher) # Concurrent pipelines (scheduler.py), another one may have loaded it meanwhile
+    return MATCHERS[db_file]
+
+
+## COMMANDS
+LINK_COLUMNS = ["site", "name", "url", "other_site", "other_name", "other_url", "score", "confidence"]
+
+def write_links(index, links, out_file):
+    with open(out_file, mode='w', newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=LINK_COLUMNS)
+        writer.writeheader()
+        writer.writerows(row for row in index.rows(links) if row["site"] < row["other_site"])
+
+def report(index, links, index_time, link_time):
+    pairs = Counter((index.products[one]["site"], index.products[other]["site"]) for one, other, _, _ in links)
+    print(f"{len(index)} products of {len(index.sites)} sites indexed in {index_time:.3f}s ({len(index.postings)} tokens).")
+    print(f"{len(links)} links in {link_time:.3f}s: " + (", ".join(f"{one}-{other} {count}" for (one, other), count in sorted(pairs.items())) or "none"))
+
+def link_files(csv_files, out_file=LINKS_FILE):
+    index = Product_Index()
+    start_time = time.perf_counter()
+    for csv_file in csv_files:
+        load_csv(index, csv_file)
+    index_time = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    links = index.link_all()
+    report(index, links, index_time, time.perf_counter() - start_time)
+    write_links(index, links, out_file)
+    print(f"Links written to {out_file}.")
+
+async def link_store(out_file=None):
+    import storage
+    index = Product_Index()
+    start_time = time.perf_counter()
+    await load_store(index)
+    index_time = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    links = index.link_all()
+    report(index, links, index_time, time.perf_counter() - start_time)
+    store = await storage.get_store(storage.DB_FILE)
+    await store.upsert_links(list(index.rows(links)))
+    if out_file:
+        write_links(index, links, out_file)
+    await storage.close_stores()
+
+def query(name, site=None):
+    index = Product_Index()
+    for csv_file in sorted(glob.glob(os.path.join(DATABASE_DIR, "*.csv"))):
+        if os.path.abspath(csv_file) != os.path.abspath(LINKS_FILE):
+            load_csv(index, csv_file)
+    start_time = time.perf_counter()
+    for other_site in sorted({site} if site else index.sites):
+        for score, product_id in index.search(name, limit=3, site=other_site):
+            print(f"{other_site:>10} {score:7.2f}  {index.products[product_id]['name'][:100]}")
+    print(f"{len(index)} products searched in {1000 * (time.perf_counter() - start_time):.1f}ms.")
+
+def variant(name, number):
+    # Another site's spelling of a name: hyphens & spaces of model numbers moved, brand dropped, specs added
+    words = name.split()
+    if number % 3 == 0 and len(words) > 2:
+        words = words[1:]
+    text = " ".join(words)
+    text = re.sub(r"([A-Za-z]+) (\d)", r"\1\2", text) if number % 2 else re.sub(r"([A-Za-z]+)(\d)", r"\1 \2", text)
+    return text + ("", " 8GB RAM 128GB", " (Official)", " 5G Smartphone")[number % 4]
+
+# Pairs seen in the database: (site, name, price, other site, other name, same product)
+PAIRS = [
+    ("vertech", "iPad mini 646500৳70000৳Add to CartCompare", "46500৳", "gsmarena", "Apple Ipad Mini Wi Fi", False),
+    ("vertech", "iPad mini 646500৳70000৳Add to CartCompare", "46500৳", "gsmarena", "Apple Ipad Mini (2019)", False),
+    ("vertech", "iPad mini 4", None, "gsmarena", "Apple Ipad Mini 4 (2015)", True),
+    ("startech", "Samsung Galaxy S23 Plus", None, "gsmarena", "Samsung Galaxy S23", False),
+]
+
+def check_pairs():
+    # One index of every pair, the IDF of a two-product index says little
+    index = Product_Index()
+    wrong = 0
+    for number, (site, name, price, other_site, other_name, _) in enumerate(PAIRS):
+        index.add({"site": site, "name": name, "price": price, "url": f"#{number}"})
+        index.add({"site": other_site, "name": other_name, "url": f"#{number}-other"})
+    for number, (site, name, price, other_site, other_name, same) in enumerate(PAIRS):
+        product_id, other_id = index.by_url[f"#{number}"], index.by_url[f"#{number}-other"]
+        if (index.confidence(product_id, other_id) >= MIN_CONFIDENCE) != same:
+            wrong += 1
+            print(f"    {'missed' if same else 'false'} match: {name!r} ({price}) / {other_name!r}")
+    print(f"Known pairs: {len(PAIRS) - wrong}/{len(PAIRS)} right.")
+    return wrong
+
+def bench(copies=3):
+    from rank_bm25 import BM25Okapi
+    names = [row["Model"] for row in csv.DictReader(open(os.path.join(DATABASE_DIR, "gsmarena_products.csv"), encoding='utf-8'))]
+    records = [{"site": f"site{copy}", "name": variant(name, number + copy) if copy else name, "url": f"https://site{copy}/{number}"}
+               for copy in range(copies) for number, name in enumerate(names)]
+    index = Product_Index()
+    start_time = time.perf_counter()
+    index.add_all(records)
+    index_time = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    links = index.link_all()
+    link_time = time.perf_counter() - start_time
+    report(index, links, index_time, link_time)
+    correct = sum(index.products[one]["url"].rsplit("/", 1)[1] == index.products[other]["url"].rsplit("/", 1)[1] for one, other, _, _ in links)
+    print(f"{correct}/{len(links)} links join the same source row, {len(names) * copies * (copies - 1) // 2} possible.")
+    # Incremental: one more site arriving page by page (40 products)
+    extra = [{"site": "late", "name": variant(name, number + 1), "url": f"https://late/{number}"} for number, name in enumerate(names[:2000])]
+    start_time = time.perf_counter()
+    linked = 0
+    for page in range(0, len(extra), 40):
+        product_ids = index.add_all(extra[page:page + 40])
+        linked += sum(len(index.link(product_id)) for product_id in product_ids)
+    elapsed = time.perf_counter() - start_time
+    print(f"Incremental: {len(extra)} new products linked {linked} times in {elapsed:.3f}s ({1000 * elapsed / (len(extra) / 40):.1f}ms per 40-product page).")
+    # Same scores as rank-bm25 on the candidates, without the model weight
+    plain = Product_Index(model_weight=1.0)
+    plain.add_all(records[:2000])
+    corpus = [list(plain.terms[product_id].elements()) for product_id in range(2000)]
+    reference = BM25Okapi(corpus, k1=K1, b=B, epsilon=EPSILON)
+    worst = 0.0
+    for product_id in range(0, 2000, 50):
+        tokens = tokenize(records[(product_id * 7) % len(records)]["name"])
+        expected = reference.get_scores(tokens)
+        for score, other_id in plain.search("", limit=10, tokens=tokens):
+            worst = max(worst, abs(score - expected[other_id]))
+    print(f"Largest BM25 score difference to rank_bm25.BM25Okapi: {worst:.2e}.")
+    start_time = time.perf_counter()
+    for product_id in range(0, 2000, 50):
+        reference.get_scores(tokenize(records[product_id]["name"]))
+    full = (time.perf_counter() - start_time) / 40
+    start_time = time.perf_counter()
+    for product_id in range(0, 2000, 50):
+        plain.search("", tokens=tokenize(records[product_id]["name"]))
+    print(f"Query on 2000 products: {1000 * full:.2f}ms rank-bm25 (whole corpus) vs {1000 * (time.perf_counter() - start_time) / 40:.2f}ms indexed.")
+    check_pairs()
+
+
+if __name__ == '__main__':
+    arguments = sys.argv[2:]
+    out_file = None
+    if "--out" in arguments:
+        position = arguments.index("--out")
+        out_file = arguments[position + 1]
+        del arguments[position:position + 2]
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "link":
+        csv_files = arguments or [csv_file for csv_file in sorted(glob.glob(os.path.join(DATABASE_DIR, "*.csv")))
+                                  if os.path.abspath(csv_file) != os.path.abspath(LINKS_FILE)]
+        link_files(csv_files, out_file or LINKS_FILE)
+    elif command == "store":
+        asyncio.run(link_store(out_file))
+    elif command == "query" and arguments:
+        query(*arguments[:2])
+    elif command == "bench":
+        bench(*map(int, arguments[:1]))
+    else:
+        print(__doc__)
@@ -0,0 +1,200 @@
+"""
+Per-stage timings, counters & structured logs for crawls.
+    log():      the console line print() used to give, plus one JSON object per line in LOG_FILE with the event's fields
+    METRICS:    stage durations per site as histograms, counters for pages, products, retries & bytes
+                    wait           rate limiter pacing before a request
+                    fetch          HTTP download (http_fetcher)
+                    render         browser load & render (browser_pool), includes crawl4ai's in-browser extraction
+                    extraction     schema extraction (worker_pool, or crawl4ai running css_strategy)
+                    normalization  organize(), normalize.py & dedup keys (worker_pool)
+                    write          database transaction of the page
+    Prometheus text format, written to METRICS_FILE (node_exporter textfile collector) every METRICS_INTERVAL
+    seconds and at the end of a crawl, or served at http://127.0.0.1:<port>/metrics with main.py --metrics-port
+    (--metrics-host 0.0.0.0 for a Prometheus on another box).
+The site label comes from a context variable set by Output_Pipeline, tasks it starts inherit it.
+"""
+
+import asyncio, contextvars, json, logging, os, time
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime, timezone
+
+## CONTROL VARIABLES
+LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Logs")
+LOG_FILE = os.path.join(LOG_DIR, "crawl.jsonl")
+METRICS_FILE = os.path.join(LOG_DIR, "crawler.prom")
+METRICS_INTERVAL = 15 # Seconds between METRICS_FILE rewrites during a crawl
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60) # Seconds
+PREFIX = "crawler"
+METRICS_HOST = "127.0.0.1" # Loopback only, main.py --metrics-host to serve other boxes
+
+SITE = contextvars.ContextVar("site", default="")
+PAGE_TIMINGS = contextvars.ContextVar("page_timings", default=None) # Stage -> seconds of the page being fetched
+
+
+## STRUCTURED LOGGING
+class Console_Handler(logging.Handler):
+    # Through print(), so redirect_stdout (benchmark.py) still captures it
+    def emit(self, record):
+        print(record.getMessage())
+
+
+class Json_Formatter(logging.Formatter):
+    def format(self, record):
+        line = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "event": getattr(record, "event", "log"),
+            "site": getattr(record, "site", ""),
+            "message": record.getMessage(),
+            **getattr(record, "fields", {}),
+        }
+        return json.dumps(line, ensure_ascii=False, default=str)
+
+
+LOGGER = logging.getLogger("crawler")
+LOGGER.setLevel(logging.INFO)
+LOGGER.propagate = False
+LOGGER.addHandler(Console_Handler())
+
+def log(message, event="log", level=logging.INFO, **fields):
+    LOGGER.log(level, message, extra={"event": event, "site": SITE.get(), "fields": fields})
+
+def configure(log_file=LOG_FILE):
+    # JSON-lines file next to the console output, once per process
+    if log_file and not any(isinstance(handler, logging.FileHandler) for handler in LOGGER.handlers):
+        if os.path.dirname(log_file): # A bare file name is in the working directory
+            os.makedirs(os.path.dirname(log_file), exist_ok=True)
+        handler = logging.FileHandler(log_file, encoding="utf-8")
+        handler.setFormatter(Json_Formatter())
+        LOGGER.addHandler(handler)
+
+
+## METRICS
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for number, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[number] += 1
+                break
+
+
+def label_text(labels):
+    escape = lambda value: str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return ",".join(f'{key}="{escape(value)}"' for key, value in labels)
+
+
+class Metrics:
+    def __init__(self):
+        self.counters = {} # (name, sorted labels) -> value
+        self.stages = {} # (site, stage) -> Histogram
+        self.started_at = time.time()
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted({"site": SITE.get(), **labels}.items())))
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, stage, seconds, timings=None):
+        # timings: the page's own stage -> seconds dict, defaults to the one set for the page being fetched
+        key = (SITE.get(), stage)
+        if key not in self.stages:
+            self.stages[key] = Histogram()
+        self.stages[key].observe(seconds)
+        timings = PAGE_TIMINGS.get() if timings is None else timings
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def time(self, stage, timings=None):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start_time, timings)
+
+    # PROMETHEUS TEXT EXPOSITION FORMAT
+    def render(self):
+        lines = []
+        for name in sorted({name for name, _ in self.counters}):
+            lines.append(f"# TYPE {PREFIX}_{name}_total counter")
+            for (counter, labels), value in sorted(self.counters.items()):
+                if counter == name:
+                    lines.append(f"{PREFIX}_{name}_total{{{label_text(labels)}}} {value}")
+        lines.append(f"# HELP {PREFIX}_stage_seconds Seconds spent in each crawl stage, one observation per page (per request for wait & fetch).")
+        lines.append(f"# TYPE {PREFIX}_stage_seconds histogram")
+        for (site, stage), histogram in sorted(self.stages.items()):
+            labels = label_text((("site", site), ("stage", stage)))
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f'{PREFIX}_stage_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{PREFIX}_stage_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f"{PREFIX}_stage_seconds_sum{{{labels}}} {histogram.sum:.6f}")
+            lines.append(f"{PREFIX}_stage_seconds_count{{{labels}}} {histogram.count}")
+        lines.append(f"# TYPE {PREFIX}_start_time_seconds gauge")
+        lines.append(f"{PREFIX}_start_time_seconds {self.started_at:.0f}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, metrics_file=METRICS_FILE):
+        # Renamed into place, a scrape never sees half a file
+        if os.path.dirname(metrics_file):
+            os.makedirs(os.path.dirname(metrics_file), exist_ok=True)
+        with open(metrics_file + ".tmp", mode='w', encoding='utf-8') as file:
+            file.write(self.render())
+        os.replace(metrics_file + ".tmp", metrics_file)
+
+    def stage_totals(self):
+        # Seconds per stage over all sites, largest first
+        totals = {}
+        for (_, stage), histogram in self.stages.items():
+            totals[stage] = totals.get(stage, 0.0) + histogram.sum
+        return dict(sorted(totals.items(), key=lambda item: -item[1]))
+
+
+# SHARED BY EVERY PIPELINE IN THE PROCESS
+METRICS = Metrics()
+
+
+## EXPORT DURING A CRAWL
+async def write_periodically(metrics_file=METRICS_FILE, interval=METRICS_INTERVAL):
+    while True:
+        await asyncio.sleep(interval)
+        METRICS.write(metrics_file)
+
+async def serve(port, host=METRICS_HOST):
+    # GET /metrics, returns the aiohttp runner, cleanup() stops it
+    from aiohttp import web
+
+    async def handle(request):
+        return web.Response(text=METRICS.render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    log(f"METRICS AT http://{host}:{port}/metrics", event="metrics_endpoint", port=port)
+    return runner
+
+@asynccontextmanager
+async def exporting(metrics_file=METRICS_FILE, port=None, host=METRICS_HOST):
+    # Around a whole crawl: METRICS_FILE kept fresh (and served on port), final write & time per stage at the end
+    writer = asyncio.create_task(write_periodically(metrics_file))
+    server = await serve(port, host) if port else None
+    try:
+        yield METRICS
+    finally:
+        writer.cancel()
+        METRICS.write(metrics_file)
+        totals = METRICS.stage_totals()
+        log("TIME PER STAGE: " + ", ".join(f"{stage} {seconds:.1f}s" for stage, seconds in totals.items()),
+            event="stage_totals", metrics_file=metrics_file, **{f"{stage}_seconds": round(seconds, 3) for stage, seconds in totals.items()})
+        if server is not None:
+            await server.cleanup()
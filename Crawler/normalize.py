@@ -0,0 +1,183 @@
+"""
+Vectorized normalization of scraped rows with pandas string operations, for a whole page or a whole file at once.
+    price: "79990৳", "৳ 1,23,000", "Ex Tax: 5,000৳" -> 79990 (first number, nullable integer)
+    name:  trailing UI text, then the row's own price & the struck-through price after it stripped,
+           ("...Laptop79990৳87900৳Add to CartCompare" with price "79990৳"), whitespace collapsed
+    url:   relative URLs joined to the site, '//' inside the path collapsed, host lower-cased, #fragment dropped
+    model_names(): gsmarena relative URLs "samsung_galaxy_f07-14205.php" -> "Samsung Galaxy F07"
+Output_Pipeline runs every page through normalize_records() before it is deduplicated & written.
+
+Usage:: python normalize.py <csv file> <output csv> [base url]    Normalize a whole file (e.g. Database/Vertech_products.csv)
+        python normalize.py bench [csv file ...]                  Rows/sec, vectorized vs row by row, on the existing CSVs, known names
+"""
+
+import os, re, sys, time
+import numpy as np
+import pandas as pd
+
+## CONTROL VARIABLES
+CHUNK_ROWS = 50_000 # Rows per chunk when normalizing a file, bounds memory on big files
+NAME_COLUMNS = ("name", "model") # Column names are matched case-insensitively
+PRICE_COLUMNS = ("price",)
+URL_COLUMNS = ("url", "image_url")
+BENCH_REPEAT = 20 # Existing CSVs are small, each is stacked this many times for the benchmark
+
+PRICE = r"(\d[\d,]*(?:\.\d+)?)"
+NOISE_WORDS = ("add to cart", "add to compare", "compare", "buy now", "out of stock", "quick view", "pre-order", "preorder", "tba")
+# Names are cleaned spelled backwards: the noise is a prefix then, an anchored match is ~6x faster than a $ search.
+# The noise starts a word, or runs into the name capitalized like the buttons ("GPUTBAAdd to Cart"), never "Walton Primo Xtba"
+NOISE_START = r"(?:(?![^\W\d_])|(?-i:(?<=[A-Z])))" # Reversed: the end of the match
+REVERSED_NAME_NOISE = re.compile(r"^\s*(?:(?:" + "|".join(re.escape(word[::-1]) for word in NOISE_WORDS) + r")\s*)+" + NOISE_START, re.IGNORECASE)
+# Reversed "<price>\x1f<name>": the row's own price at the end of the name goes, with the struck-through price after it.
+# Only that price, a trailing number isn't stripped as a price on its own ("iPad mini 6" + "46500৳")
+REVERSED_OWN_PRICE = re.compile(r"^([^\x1f]+)\x1f\s*(?:৳\s*(?:\d+\.)?[\d,]*\d\s*)?\1")
+REVERSED_PRICE_LEFT = re.compile(r"^[^\x1f]*\x1f") # Price not found at the end of the name
+WHITESPACE = r"\s+"
+DOUBLE_SLASH = r"(?<!:)/{2,}" # Not the one after https:
+HOST = re.compile(r"^[a-z][a-z0-9+.-]*://[^/?#]+", re.IGNORECASE)
+FRAGMENT = r"#.*$"
+ABSOLUTE = r"^[a-z][a-z0-9+.-]*://"
+BENGALI_DIGITS = str.maketrans("০১২৩৪৫৬৭৮৯", "0123456789")
+SITE_ORIGIN = re.compile(r"^([a-z][a-z0-9+.-]*://[^/?#]+)", re.IGNORECASE)
+
+
+## COLUMN NORMALIZERS, EACH TAKES & RETURNS A pandas Series
+def parse_prices(prices):
+    text = prices.astype("string").str.translate(BENGALI_DIGITS)
+    numbers = text.str.extract(PRICE, expand=False).str.replace(",", "", regex=False)
+    return pd.to_numeric(numbers, errors="coerce").round().astype("Int64")
+
+def clean_names(names, prices=None):
+    # prices: the rows' raw price text, names only lose the price they were scraped with
+    text = names.astype("string").str[::-1].str.replace(REVERSED_NAME_NOISE, "", regex=True)
+    if prices is not None:
+        text = prices.astype("string").fillna("").str.strip().str[::-1] + "\x1f" + text
+        text = text.str.replace(REVERSED_OWN_PRICE, "", regex=True).str.replace(REVERSED_PRICE_LEFT, "", regex=True)
+    return text.str[::-1].str.replace(WHITESPACE, " ", regex=True).str.strip()
+
+def clean_name(name, price=None):
+    # clean_names() of one name, for row by row callers (matching.py)
+    text = REVERSED_NAME_NOISE.sub("", (name or "")[::-1])
+    if price:
+        text = REVERSED_PRICE_LEFT.sub("", REVERSED_OWN_PRICE.sub("", str(price).strip()[::-1] + "\x1f" + text))
+    return re.sub(WHITESPACE, " ", text[::-1]).strip()
+
+def canonical_urls(urls, base_url=None):
+    text = urls.astype("string").str.strip()
+    if base_url:
+        origin = SITE_ORIGIN.match(base_url).group(1)
+        relative = text.notna() & (text != "") & ~text.str.contains(ABSOLUTE, case=False, regex=True)
+        text = text.mask(relative, origin + "/" + text.str.lstrip("/"))
+    text = text.str.replace(FRAGMENT, "", regex=True).str.replace(DOUBLE_SLASH, "/", regex=True)
+    return text.str.replace(HOST, lambda match: match.group(0).lower(), regex=True)
+
+def model_names(relative_urls):
+    # gsmarena model links: "samsung_galaxy_f07-14205.php" -> "Samsung Galaxy F07"
+    text = pd.Series(relative_urls, dtype="string")
+    return text.str.split("-", n=1).str[0].str.replace("_", " ", regex=False).str.title().tolist()
+
+
+## FRAMES, PAGES & FILES
+def find_columns(frame, names):
+    return [column for column in frame.columns if column.lower() in names]
+
+def normalize_frame(frame, base_url=None):
+    frame = frame.copy()
+    price_columns = find_columns(frame, PRICE_COLUMNS)
+    for column in find_columns(frame, NAME_COLUMNS): # Before the prices are parsed, the raw price text is looked for in the name
+        frame[column] = clean_names(frame[column], frame[price_columns[0]] if price_columns else None)
+    for column in price_columns:
+        frame[column] = parse_prices(frame[column])
+    for column in find_columns(frame, URL_COLUMNS):
+        frame[column] = canonical_urls(frame[column], base_url)
+    return frame
+
+def normalize_records(records, base_url=None):
+    # One page of organized products (list of dicts) -> the same dicts normalized, missing values None
+    if not records:
+        return records
+    frame = normalize_frame(pd.DataFrame.from_records(records), base_url)
+    frame = frame.astype(object).where(frame.notna(), None)
+    return [{key: value for key, value in record.items() if value is not None or key in original}
+            for record, original in zip(frame.to_dict("records"), records)]
+
+def normalize_csv(csv_file, output_file, base_url=None, chunk_rows=CHUNK_ROWS):
+    row_count = 0
+    header = True
+    for chunk in pd.read_csv(csv_file, dtype="string", keep_default_na=False, chunksize=chunk_rows):
+        normalize_frame(chunk, base_url).to_csv(output_file, mode='w' if header else 'a', header=header, index=False)
+        header = False
+        row_count += len(chunk)
+    print(f"Normalized {row_count} rows of {csv_file} into {output_file}.")
+    return row_count
+
+
+## BENCHMARK
+def normalize_row_by_row(frame, base_url=None):
+    # Reference: the same rules one value at a time in a Python loop, how the configs modules clean rows
+    rows = []
+    for record in frame.to_dict("records"):
+        price = next((value for key, value in record.items() if key.lower() in PRICE_COLUMNS and value is not pd.NA), None)
+        for key, value in record.items():
+            if value is None or value is pd.NA:
+                continue
+            column = key.lower()
+            if column in PRICE_COLUMNS:
+                match = re.search(PRICE, str(value).translate(BENGALI_DIGITS))
+                record[key] = round(float(match.group(1).replace(",", ""))) if match else None
+            elif column in NAME_COLUMNS:
+                record[key] = clean_name(value, price)
+            elif column in URL_COLUMNS:
+                url = value.strip()
+                if base_url and url and not re.match(ABSOLUTE, url, re.IGNORECASE):
+                    url = SITE_ORIGIN.match(base_url).group(1) + "/" + url.lstrip("/")
+                url = re.sub(DOUBLE_SLASH, "/", re.sub(FRAGMENT, "", url))
+                record[key] = HOST.sub(lambda match: match.group(0).lower(), url)
+        rows.append(record)
+    return rows
+
+# Names seen in the database or reported: (scraped name, price, cleaned name)
+NAMES = [
+    ("iPad mini 646500৳70000৳Add to CartCompare", "46500৳", "iPad mini 6"),
+    ("MacBook Air M2 15-inch 8-CPU 10-GPUTBAAdd to Cart", "", "MacBook Air M2 15-inch 8-CPU 10-GPU"),
+    ("Walton Primo Xtba", "", "Walton Primo Xtba"),
+    ("Samsung Galaxy A05 Preorder", "", "Samsung Galaxy A05"),
+    ("Smart Watch Xpreorder", "", "Smart Watch Xpreorder"),
+]
+
+def check_names():
+    frame = pd.DataFrame({"name": [name for name, _, _ in NAMES], "price": [price for _, price, _ in NAMES]}, dtype="string")
+    wrong = [(name, cleaned, expected) for (name, _, expected), cleaned in zip(NAMES, clean_names(frame["name"], frame["price"]))
+             if cleaned != expected]
+    for name, cleaned, expected in wrong:
+        print(f"    {name!r} -> {cleaned!r}, expected {expected!r}")
+    print(f"Known names: {len(NAMES) - len(wrong)}/{len(NAMES)} right.")
+    return len(wrong)
+
+def bench(csv_files):
+    for csv_file in csv_files:
+        frame = pd.read_csv(csv_file, dtype="string", keep_default_na=False)
+        frame = pd.concat([frame] * BENCH_REPEAT, ignore_index=True)
+        start_time = time.perf_counter()
+        vectorized = normalize_frame(frame)
+        vectorized_time = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        looped = pd.DataFrame(normalize_row_by_row(frame), columns=frame.columns, dtype=object)
+        looped_time = time.perf_counter() - start_time
+        same = all(np.array_equal(vectorized[column].astype(object).fillna("").astype(str), looped[column].fillna("").astype(str))
+                   for column in frame.columns)
+        print(f"{os.path.basename(csv_file)}: {len(frame)} rows ({BENCH_REPEAT}x the file)")
+        print(f"    vectorized:  {len(frame) / vectorized_time:12,.0f} rows/s")
+        print(f"    row by row:  {len(frame) / looped_time:12,.0f} rows/s ({looped_time / vectorized_time:.1f}x slower). Same output: {same}")
+    check_names()
+
+
+if __name__ == '__main__':
+    arguments = sys.argv[1:]
+    database_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Database")
+    if arguments[:1] == ["bench"]:
+        bench(arguments[1:] or [os.path.join(database_dir, name) for name in ("Vertech_products.csv", "gsmarena_products.csv")])
+    elif len(arguments) >= 2:
+        normalize_csv(*arguments[:3])
+    else:
+        print(__doc__)
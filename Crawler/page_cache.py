@@ -0,0 +1,78 @@
+"""
+Listing page cache for cheap refreshes, instead of CacheMode.BYPASS re-downloading & re-extracting every page.
+For every URL it keeps the ETag / Last-Modified validators, a hash of the raw HTML and a hash of the extracted content
+(table `pages` in the products database, written in the same transaction as the page's products).
+
+A page counts as UNCHANGED, and extraction and/or writing is skipped, when:
+    1. the server answers a conditional request with 304 Not Modified (HTTP fast path), or
+    2. the raw HTML hashes the same as last time (HTTP fast path, extraction skipped), or
+    3. the extracted content hashes the same as last time (any fetcher, writing skipped).
+The browser path can't send conditional requests through crawl4ai, so only check 3 applies to it.
+"""
+
+import xxhash
+import storage
+
+## CONTROL VARIABLES
+USE_PAGE_CACHE = True # False: every page is extracted & written again
+
+
+def content_hash(text):
+    return xxhash.xxh3_64_hexdigest(text.encode("utf-8")) if text else None
+
+
+class Page_Cache:
+    def __init__(self, store):
+        self.store = store
+        self.pages = {} # url -> pages row
+
+    async def load(self):
+        self.pages = {page["url"]: page for page in await self.store.pages()}
+        return self
+
+    def get(self, url):
+        return self.pages.get(url)
+
+    def is_unchanged(self, url, result):
+        cached = self.pages.get(url)
+        if cached is None:
+            return False
+        if getattr(result, "not_modified", False):
+            return True
+        return result.extracted_content is not None and content_hash(result.extracted_content) == cached["content_hash"]
+
+    # pages ROW FOR A FETCHED PAGE, STORED BY storage.upsert ONLY ONCE ITS PRODUCTS ARE COMMITTED
+    def page_record(self, url, result, product_count):
+        cached = self.pages.get(url) or {}
+        headers = {key.lower(): value for key, value in (getattr(result, "response_headers", None) or {}).items()}
+        return {
+            "url": url,
+            "etag": headers.get("etag", cached.get("etag")),
+            "last_modified": headers.get("last-modified", cached.get("last_modified")),
+            "html_hash": getattr(result, "html_hash", None) or cached.get("html_hash"),
+            "content_hash": content_hash(result.extracted_content) or cached.get("content_hash"),
+            "product_count": product_count if product_count is not None else cached.get("product_count"),
+        }
+
+    def remember(self, page):
+        self.pages[page["url"]] = page
+
+
+# CONDITIONAL REQUEST HEADERS FOR A CACHED PAGE
+def conditional_headers(cached):
+    headers = {}
+    if cached and cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+    if cached and cached.get("last_modified"):
+        headers["If-Modified-Since"] = cached["last_modified"]
+    return headers
+
+
+# CACHES SHARED BY EVERY PIPELINE IN THE PROCESS, ONE PER DATABASE
+CACHES = {}
+
+async def get_cache(db_file=storage.DB_FILE):
+    if db_file not in CACHES:
+        cache = await Page_Cache(await storage.get_store(db_file)).load()
+        CACHES.setdefault(db_file, cache) # Concurrent pipelines keep the first one loaded
+    return CACHES[db_file]
@@ -0,0 +1,112 @@
+"""
+Page-count discovery, so a category's pages can be fetched concurrently instead of in order until an empty one.
+The site's own page_url() is the pattern: page_url(PROBE_PAGE) with the number turned into (\\d+) matches
+every pagination link of the category, on any of the four sites, without site specific selectors.
+    1. pagination widget: the highest page number linked from a listing page (absolute, relative or
+       "?page=N" links), or an OpenCart style "Showing 1 to 20 of 524 (27 Pages)" line,
+    2. sitemap.xml of the site (and the sitemaps it indexes), for sites that list their paginated URLs there,
+       fetched through the host's rate limiter once per host & process, every category of the host reads the same URLs.
+Widgets that only link a few pages ahead are handled by Output_Pipeline.run_all_pages(), which looks at the
+last known page again once it is fetched.
+
+Usage:: python pagination.py <site> [crawl number]    Page count of a category (fetches page 1, and the sitemap if needed)
+"""
+
+import asyncio, importlib, re, sys
+from urllib.parse import urljoin, urlsplit
+from rate_limiter import RATE_LIMITER
+from metrics import log
+
+## CONTROL VARIABLES
+PROBE_PAGE = 987654321 # Stand-in page number, turned into the pattern
+USE_SITEMAP = True # Fall back to sitemap.xml when the page has no pagination links
+SITEMAP_FILES = 20 # Sitemaps of a sitemap index read at most
+
+HREF = re.compile(r"""href\s*=\s*["']([^"']+)["']""", re.IGNORECASE)
+PAGES_TEXT = re.compile(r"\((\d+)\s+Pages?\)", re.IGNORECASE)
+LOC = re.compile(r"<loc>\s*([^<\s]+)\s*</loc>", re.IGNORECASE)
+
+
+def same_host(url):
+    # URLs are matched without "www.", links to either spelling count
+    parts = urlsplit(url)
+    return parts._replace(netloc=parts.netloc.lower().removeprefix("www.")).geturl()
+
+def page_pattern(output_pipeline):
+    # page_url(PROBE_PAGE) -> regex of any page of the category, group 1 the page number
+    probe = same_host(output_pipeline.page_url(PROBE_PAGE))
+    return re.compile(re.escape(probe).replace(str(PROBE_PAGE), r"(\d+)") + r"(?:[&#].*)?$", re.IGNORECASE)
+
+def page_numbers(urls, pattern):
+    numbers = []
+    for url in urls:
+        match = pattern.match(same_host(url.replace("&amp;", "&")))
+        if match:
+            numbers.append(int(match.group(1)))
+    return numbers
+
+def page_count_in_html(output_pipeline, html, page_number=1):
+    # Highest page linked from (or stated on) a listing page, None if it shows no pagination
+    pattern = page_pattern(output_pipeline)
+    page_url = output_pipeline.page_url(page_number)
+    numbers = page_numbers((urljoin(page_url, href) for href in HREF.findall(html or "")), pattern)
+    numbers += [int(count) for count in PAGES_TEXT.findall(html or "")]
+    return max(numbers) if numbers else None
+
+
+## SITEMAP
+SITEMAPS = {} # Host -> task of the <loc> URLs of its sitemaps, shared by the host's categories
+
+async def fetch_text(crawler, url):
+    # Same per-host pacing, 429/503 back off & Retry-After as the listing pages
+    import http_fetcher
+    result = await RATE_LIMITER.fetch(crawler, url, http_fetcher.Http_Config())
+    return result.html if result.success else ""
+
+async def sitemap_urls(scheme, host):
+    import http_fetcher
+    async with http_fetcher.Http_Crawler() as crawler:
+        text = await fetch_text(crawler, f"{scheme}://{host}/sitemap.xml")
+        if not text:
+            log(f"SITEMAP OF {host} UNAVAILABLE.", event="sitemap_failed", host=host)
+        urls = LOC.findall(text)
+        if "<sitemapindex" in text:
+            for sitemap in urls[:SITEMAP_FILES]:
+                urls += LOC.findall(await fetch_text(crawler, sitemap))
+    return urls
+
+async def page_count_in_sitemap(output_pipeline):
+    parts = urlsplit(output_pipeline.page_url(1))
+    if parts.netloc not in SITEMAPS:
+        SITEMAPS[parts.netloc] = asyncio.ensure_future(sitemap_urls(parts.scheme, parts.netloc))
+    numbers = page_numbers(await asyncio.shield(SITEMAPS[parts.netloc]), page_pattern(output_pipeline)) # A cancelled category leaves it to the others
+    return max(numbers) if numbers else None
+
+
+async def discover(output_pipeline, html, page_number=1):
+    # Page count of the category from a fetched listing page, then the sitemap, None if neither tells
+    page_count = page_count_in_html(output_pipeline, html, page_number)
+    source = "pagination"
+    if page_count is None and USE_SITEMAP:
+        page_count = await page_count_in_sitemap(output_pipeline)
+        source = "sitemap"
+    if page_count is not None:
+        page_count = max(page_count, page_number)
+        log(f"[{output_pipeline.label}] {page_count} PAGES ({source}).", event="pages_discovered", label=output_pipeline.label, pages=page_count, source=source)
+    return page_count
+
+
+async def main(site_name, crawl_number=None):
+    import http_fetcher
+    from main import SITES
+    site = importlib.import_module(SITES.get(site_name, site_name))
+    output_pipeline = site.Output_Pipeline(crawl_number=site.CRAWL_NUMBER if crawl_number is None else int(crawl_number))
+    async with http_fetcher.get_crawler(site) as crawler:
+        result = await output_pipeline.fetch(crawler, 1)
+    print(f"{output_pipeline.label}: {await discover(output_pipeline, result.html) or 'unknown'} pages.")
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print(__doc__)
+    else:
+        asyncio.run(main(*sys.argv[1:3]))
@@ -0,0 +1,470 @@
+"""
+This script has the SITE-AGNOSTIC OUTPUT PIPELINE used by every configs module.
+A configs module subclasses Output_Pipeline and only defines how a page URL is built,
+which crawler config to use and how extracted data is organized into rows.
+
+Output_Pipeline.run() crawls a whole category. With FAN_OUT, the page count is read from the first page's
+pagination (or the sitemap, see pagination.py) and the remaining pages are fetched concurrently, paced only
+by the per-host rate limiter. Without a page count (or when resuming / incremental) run_in_order() crawls it
+as three asyncio stages joined by bounded queues:
+    FETCH --> [fetched pages] --> EXTRACT, ORGANIZE & NORMALIZE --> [rows] --> WRITE
+so page N+1 is fetched while page N is extracted and written. A full queue blocks the stage
+before it (backpressure), so the fetcher never runs more than QUEUE_SIZE pages ahead of the writer.
+Calling the pipeline directly (await output_pipeline(crawler)) still crawls one page at a time.
+
+Every page written in order commits a checkpoint (next page, counters, URL index size) in the same transaction as its products.
+A run that died resumes at the page after the last committed one, a failing page is retried PAGE_RETRIES times
+and then stops only its own category, left resumable. A fan-out crawl keeps no checkpoint, it is simply run again,
+pages that didn't change cost a conditional request (page_cache.py).
+Extraction, organize() & normalization run in worker processes (worker_pool.py), the event loop only fetches & writes.
+Every fetched page's HTML is also kept in archive.py (ARCHIVE_PAGES), for re-extraction without re-crawling.
+With MATCH_ON_WRITE the written products are linked to the same products of the other sites (matching.py).
+"""
+
+import asyncio, time
+from rate_limiter import RATE_LIMITER
+import storage, dedup, page_cache, http_fetcher, metrics, archive, worker_pool, pagination
+from metrics import METRICS, log
+
+## CONTROL VARIABLES
+QUEUE_SIZE = 2 # Pages buffered between two stages
+RESUME = True # Continue an unfinished category from its checkpoint, False: always start at page_number
+PAGE_RETRIES = 2 # Fetches of a failing page after the first, before its category stops
+FAN_OUT = True # Read the page count from the first page (pagination.py) & fetch all pages concurrently, False: in order until an empty page
+FAN_OUT_CONCURRENCY = 8 # Pages of one category in flight at once
+END_STATUS = {404, 410} # Answer to a page past the last one, the category ends there (not resumable)
+WAIT_FAILED = "Wait condition failed" # crawl4ai's wait_for timeout, past the last page the listing never appears (render_profiles.py)
+MATCH_ON_WRITE = False # Link every written page's products to the other sites' (matching.py), the index loads on the first page
+
+
+class Output_Pipeline:
+    # SITE SPECIFIC, SET BY SUBCLASS IN configs MODULE
+    site = ""
+
+    def __init__(self, entry, session_id, page_number, delay_time, test_mode, incremental=False):
+        self.entry = entry # One item of URLS_TO_CRAWL
+        self.session_id = session_id
+        self.page_number = page_number
+        self.product_count = 0
+        self.crawled_page_count = 0
+        self.seen_product = set() # URL keys written by this pipeline, drops repeats within a run
+        self.delay_time = delay_time # Starting interval between requests, adapted by rate_limiter
+        self.rate_limiter = RATE_LIMITER
+        self.test_mode = test_mode
+        self.db_file = storage.TEST_DB_FILE if test_mode else storage.DB_FILE
+        self.index_file = dedup.TEST_INDEX_FILE if test_mode else dedup.INDEX_FILE
+        self.archive_dir = archive.TEST_ARCHIVE_DIR if test_mode else archive.ARCHIVE_DIR
+        self.new_product_count = 0
+        self.unchanged_page_count = 0
+        self.page_cache = None # Loaded on first fetch when page_cache.USE_PAGE_CACHE
+        self.incremental = incremental # Newest-first listing, stop at the first page of only known products
+        self.url_index = None # Loaded on first fetch in incremental mode
+        self.caught_up = False # Incremental crawl stopped at known products
+        self.failed_page = None # Page that still failed after PAGE_RETRIES, the category resumes there
+        self.resumed_page_count = 0 # Pages counted from the checkpoint, crawled by an earlier run
+        self.page_timings = {} # Page number -> stage -> seconds, logged once the page is written, see metrics.py
+        self.elapsed = 0.0
+
+    def __reduce__(self):
+        # Sent to worker_pool for organize(): the category only, not the crawl's state (page cache, rate limiter)
+        # Rebuilt as the class that defines organize(), subclasses made on the fly (benchmark.py) can't be imported
+        organizer = next(cls for cls in type(self).__mro__ if "organize" in cls.__dict__)
+        return (restore, (organizer, self.entry, self.session_id, self.test_mode))
+
+    # SITE SPECIFIC METHODS
+    def page_url(self, page_number):
+        raise NotImplementedError
+
+    @property
+    def url(self):
+        return self.page_url(self.page_number)
+
+    @property
+    def entry_url(self):
+        return self.entry.get("url") or self.entry.get("base_url", "")
+
+    @property
+    def label(self):
+        return self.entry.get("brand") or self.entry.get("category", "")
+
+    @property
+    def pages_per_minute(self):
+        return (self.crawled_page_count - self.resumed_page_count) * 60 / self.elapsed if self.elapsed else 0.0
+
+    def get_crawler_config(self):
+        raise NotImplementedError
+
+    def organize(self, extracted_data):
+        # Returns a list of dicts keyed by storage.COLUMNS
+        raise NotImplementedError
+
+
+    ## MODULE 1:: CRAWLING
+    async def fetch(self, crawler, page_number):
+        url = self.page_url(page_number)
+        arun_kwargs = {"extract": False} if isinstance(crawler, http_fetcher.Http_Crawler) else {} # Extracted in worker_pool
+        if self.incremental:
+            self.url_index = self.url_index or await dedup.get_index(self.index_file, self.db_file)
+        if page_cache.USE_PAGE_CACHE:
+            self.page_cache = self.page_cache or await page_cache.get_cache(self.db_file)
+            if isinstance(crawler, http_fetcher.Http_Crawler):
+                arun_kwargs["cached_page"] = self.page_cache.get(url) # Conditional request
+        # RUN THE CRAWLER, PACED BY THE PER-HOST RATE LIMITER, RETRY A FAILING PAGE BEFORE GIVING UP ON IT
+        token = metrics.PAGE_TIMINGS.set(self.page_timings.setdefault(page_number, {})) # Rate limiter & fetcher time into it
+        try:
+            for attempt in range(PAGE_RETRIES + 1):
+                result = await self.rate_limiter.fetch(
+                    crawler=crawler,
+                    url=url,
+                    config=self.get_crawler_config(),
+                    initial_interval=self.delay_time,
+                    **arun_kwargs
+                    )
+                METRICS.inc("bytes", len((result.html or "").encode("utf-8")))
+                if result.success or self.past_last_page(page_number, result):
+                    break
+                METRICS.inc("retries", reason="page")
+                log(f"[{self.label}] PAGE NO: {page_number} FAILED ({result.error_message}), attempt {attempt + 1} of {PAGE_RETRIES + 1}.",
+                    event="page_retry", label=self.label, page=page_number, attempt=attempt + 1, error=result.error_message)
+        finally:
+            metrics.PAGE_TIMINGS.reset(token)
+        # KEEP THE RAW PAGE FOR OFFLINE RE-EXTRACTION, a page answered "not modified" is archived already
+        if archive.ARCHIVE_PAGES and result.success and result.html and not getattr(result, "not_modified", False):
+            await asyncio.to_thread(archive.archive_page, self.archive_dir, url, self.site, result.html, self.entry_url, page_number)
+        return result
+
+    ## MODULE 2 :: EXTRACTION & ORGANIZE EXTRACTED DATA FOR WRITING
+    async def process(self, page_number, result):
+        # Returns (rows of the page, pages row for page_cache), None if crawling should stop here
+        # SEE IF THE CRAWLING WAS SUCCESSFUL, A MISSING PAGE PAST THE FIRST ENDS THE CATEGORY
+        if not result.success and self.past_last_page(page_number, result):
+            status_code = getattr(result, "status_code", None)
+            reason = f"HTTP {status_code}" if status_code in END_STATUS else "no listing before the wait_for timeout"
+            log(f"[{self.label}] Page {page_number} doesn't exist ({reason}), last page reached.", event="last_page", label=self.label, page=page_number, status_code=status_code)
+            self.page_timings.pop(page_number, None)
+            return None
+        if not result.success:
+            METRICS.inc("pages", status="failed")
+            log(f"[{self.label}] STATUS: CRAWLING ERROR!! Stopping at Page {page_number}, resumable from there.",
+                event="page_failed", label=self.label, page=page_number, error=result.error_message, **self.page_timings.pop(page_number, {}))
+            self.failed_page = page_number
+            return None
+        log(f"[{self.label}] STATUS: CRAWLING SUCCESSFUL. PROCESSING OUTPUT.", event="page_fetched", label=self.label, page=page_number)
+        # SEE IF THE PAGE CHANGED SINCE IT WAS LAST WRITTEN
+        url = self.page_url(page_number)
+        if self.page_cache and self.page_cache.is_unchanged(url, result):
+            return self.unchanged(page_number, url)
+        # EXTRACT (HTTP FAST PATH), ORGANIZE & NORMALIZE IN A WORKER PROCESS, SEE worker_pool.py
+        extraction = getattr(result, "extraction", None)
+        extracted_content, found, products, keys, worker_timings = await worker_pool.POOL.process(
+            self, url, result.html if extraction else None, result.extracted_content, extraction)
+        timings = self.page_timings.setdefault(page_number, {})
+        for stage, seconds in worker_timings.items():
+            METRICS.observe(stage, seconds, timings)
+        if extraction:
+            result.extracted_content = extracted_content # For page_cache's content hash
+            if self.page_cache and self.page_cache.is_unchanged(url, result):
+                return self.unchanged(page_number, url)
+        # SEE IF EXTRACTION WAS SUCCESSFUL
+        if not found:
+            log(f"[{self.label}] No products found in Page {page_number}.", event="page_empty", label=self.label, page=page_number)
+            self.page_timings.pop(page_number, None)
+            return None
+        new_products = self.drop_duplicates(products, keys)
+        log(f"[{self.label}] PAGE NO: {page_number}, DATA EXTRACTION COMPLETED.", event="page_extracted", label=self.label, page=page_number)
+        log(f"[{self.label}] Update: Page {page_number}: Extracted {len(new_products)} products.", event="page_organized", label=self.label, page=page_number, products=len(new_products))
+        # Raw count, a page of listings already seen this run (shifted from the page before) is not an empty one
+        page = self.page_cache.page_record(url, result, len(products)) if self.page_cache else None
+        return new_products, page
+
+    def past_last_page(self, page_number, result):
+        # 404/410, or no listing container before the wait_for timeout, on any page but the first
+        # Network errors, 5xx & 429 stay failures, resumable from the page
+        if result.success or page_number <= 1:
+            return False
+        return getattr(result, "status_code", None) in END_STATUS or WAIT_FAILED in (result.error_message or "")
+
+    def unchanged(self, page_number, url):
+        log(f"[{self.label}] PAGE NO: {page_number} UNCHANGED, SKIPPING EXTRACTION & WRITING.", event="page_unchanged", label=self.label, page=page_number)
+        return [], dict(self.page_cache.get(url), unchanged=True)
+
+    def is_last_page(self, new_products, page):
+        # STOP IF NOTHING FOUND, an unchanged page has what it had last time
+        # The pages row counts products before in-run duplicates are dropped
+        if page:
+            product_count = page.get("product_count")
+        else:
+            product_count = len(new_products)
+        if not product_count:
+            log(f"[{self.label}] No Products found, last page reached.", event="last_page", label=self.label)
+            return True
+        # INCREMENTAL: NEWEST FIRST, A PAGE OF ONLY KNOWN PRODUCTS MEANS THE REST WERE CRAWLED BEFORE
+        if self.incremental and ((page and page.get("unchanged")) or self.all_known(new_products)):
+            log(f"[{self.label}] INCREMENTAL: PAGE HAS ONLY KNOWN PRODUCTS, CATEGORY IS UP TO DATE.", event="caught_up", label=self.label)
+            self.caught_up = True
+            return True
+        return False
+
+    def all_known(self, new_products):
+        # Checked before the page is written, so its own products don't count as known yet
+        urls = [product["url"] for product in new_products if product.get("url")]
+        return bool(urls) and all(url in self.url_index for url in urls)
+
+    def drop_duplicates(self, products, keys=None):
+        # Listings shift while a category is crawled, the same product can show up on two pages
+        # keys: dedup.url_key of every product, computed by worker_pool off the event loop
+        unique_products = []
+        keys = keys if keys is not None else [dedup.url_key(product.get("url", "")) for product in products]
+        for product, key in zip(products, keys):
+            if key not in self.seen_product:
+                self.seen_product.add(key)
+                unique_products.append(product)
+        return unique_products
+
+    ## MODULE 3 :: WRITING, ONE TRANSACTION PER PAGE, UPSERT ON URL
+    async def write(self, new_products, page=None, page_number=None):
+        unchanged = bool(page and page.get("unchanged"))
+        if self.test_mode:
+            log("RUNNING ON TEST MODE", event="test_mode")
+        index = await dedup.get_index(self.index_file, self.db_file)
+        store = await storage.get_store(self.db_file)
+        # NEW = NOT IN THE PERSISTENT URL INDEX, O(1) PER PRODUCT INSTEAD OF A DATABASE LOOKUP
+        urls = [product["url"] for product in new_products if product.get("url")]
+        new_count = sum(url not in index for url in urls)
+        checkpoint = None
+        if page_number is not None and not self.test_mode:
+            checkpoint = self.checkpoint(page_number, len(new_products), new_count, unchanged, len(index))
+        if unchanged:
+            # Nothing to write, only the checkpoint moves on
+            await store.upsert([], count_new=False, checkpoint=checkpoint)
+            return 0
+        records = [dict(product, site=self.site) for product in new_products]
+        await store.upsert(records, count_new=False, page=page, checkpoint=checkpoint)
+        if page is not None:
+            self.page_cache.remember(page) # Only once committed, a failed write is refetched next run
+        for url in urls:
+            index.add(url)
+        if MATCH_ON_WRITE and not self.test_mode:
+            import matching # pandas (normalize.py) only loads when matching is on
+            matcher = await matching.get_matcher(self.db_file)
+            await matcher.add(records)
+        return new_count
+
+    ## CHECKPOINT & RESUME
+    def checkpoint(self, page_number, product_count, new_count, unchanged, index_size):
+        # checkpoints row for the state right after this page, see storage.py
+        return {
+            "site": self.site,
+            "entry_url": self.entry_url,
+            "next_page": page_number + 1,
+            "product_count": self.product_count + product_count,
+            "new_product_count": self.new_product_count + new_count,
+            "crawled_page_count": self.crawled_page_count + 1,
+            "unchanged_page_count": self.unchanged_page_count + unchanged,
+            "dedup_cursor": index_size + new_count,
+            "status": "running",
+        }
+
+    async def resume(self):
+        # PICK UP AN UNFINISHED CATEGORY AFTER ITS LAST COMMITTED PAGE
+        store = await storage.get_store(self.db_file)
+        checkpoint = await store.checkpoint(self.site, self.entry_url)
+        if checkpoint is None or checkpoint["status"] != "running":
+            return False
+        self.page_number = checkpoint["next_page"]
+        self.product_count = checkpoint["product_count"]
+        self.new_product_count = checkpoint["new_product_count"]
+        self.crawled_page_count = self.resumed_page_count = checkpoint["crawled_page_count"]
+        self.unchanged_page_count = checkpoint["unchanged_page_count"]
+        index = await dedup.get_index(self.index_file, self.db_file)
+        if len(index) < checkpoint["dedup_cursor"]:
+            # The run died before saving the URL index, catch it up from the committed rows
+            async for row in store.rows(self.site):
+                index.add(row["url"])
+        log(f"[{self.label}] RESUMING AT PAGE {self.page_number}, {self.crawled_page_count} pages & {self.product_count} products already committed.",
+            event="resume", label=self.label, page=self.page_number, pages=self.crawled_page_count, products=self.product_count)
+        return True
+
+    async def complete(self):
+        if self.test_mode:
+            return
+        store = await storage.get_store(self.db_file)
+        await store.complete_checkpoint(self.site, self.entry_url)
+
+    ## MODULE 4 :: COUNTERS
+    def count(self, page_number, new_products, new_count, page=None):
+        self.product_count = self.product_count + len(new_products)
+        self.new_product_count += new_count
+        self.crawled_page_count += 1
+        self.page_number = page_number + 1
+        unchanged = bool(page and page.get("unchanged"))
+        self.unchanged_page_count += unchanged
+        METRICS.inc("pages", status="unchanged" if unchanged else "ok")
+        METRICS.inc("products", len(new_products))
+        METRICS.inc("new_products", new_count)
+        timings = {f"{stage}_seconds": round(seconds, 4) for stage, seconds in self.page_timings.pop(page_number, {}).items()}
+        message = f"[{self.label}] Update: Page {page_number}: " + ("unchanged." if unchanged else
+            f"Written {len(new_products)} products ({new_count} new) to database. Total written: {self.product_count}")
+        log(message, event="page_written", label=self.label, page=page_number, products=len(new_products), new_products=new_count, unchanged=unchanged, **timings)
+
+
+    # ONE PAGE AT A TIME
+    async def __call__(self, crawler):
+        metrics.SITE.set(self.site) # Label of every metric & log line of this task
+        page_number = self.page_number
+        start_time = time.perf_counter()
+        result = await self.fetch(crawler, page_number)
+        processed = await self.process(page_number, result)
+        if processed is None:
+            if self.failed_page is None: # Empty or missing page, the category is done
+                await self.complete()
+            return False
+        new_products, page = processed
+        last_page = self.is_last_page(new_products, page) # Before writing, the page's products become known after
+        with METRICS.time("write", self.page_timings.get(page_number)):
+            new_count = await self.write(new_products, page, page_number)
+        self.count(page_number, new_products, new_count, page)
+        self.elapsed += time.perf_counter() - start_time
+        if self.test_mode:
+            log("TEST MODE SUCCESSFUL. WAIT FOR FINAL LOG", event="test_mode")
+            return False
+        if last_page:
+            await self.complete()
+            return False
+        # DELAY LOG, THE WAIT ITSELF HAPPENS IN THE RATE LIMITER BEFORE THE NEXT FETCH
+        log(f"[{self.label}] Proceeding to next page, current interval {self.rate_limiter.delay(self.url):.1f} seconds...", event="next_page", label=self.label)
+
+        return True
+
+
+    # ONE PAGE, ALSO A JOB OF frontier.py, WRITTEN WITHOUT MOVING THE CATEGORY'S CHECKPOINT
+    async def crawl_page(self, crawler, page_number, result=None):
+        # Returns the fetch result, failed_page is set if it failed
+        metrics.SITE.set(self.site)
+        result = result or await self.fetch(crawler, page_number)
+        processed = await self.process(page_number, result)
+        if processed is not None:
+            new_products, page = processed
+            with METRICS.time("write", self.page_timings.get(page_number)):
+                new_count = await self.write(new_products, page)
+            self.count(page_number, new_products, new_count, page)
+        return result
+
+    async def page_html(self, result, page_number):
+        # A page answered "not modified" has no HTML, its last archived copy stands in
+        if result.html or not archive.ARCHIVE_PAGES:
+            return result.html
+        return await asyncio.to_thread(archive.latest_html, self.archive_dir, self.page_url(page_number))
+
+    async def crawl_first_page(self, crawler):
+        # First page crawled, returns the category's page count read from it (pagination.py), None if unknown
+        result = await self.crawl_page(crawler, self.page_number)
+        if not result.success:
+            return None
+        return await pagination.discover(self, await self.page_html(result, self.page_number), self.page_number)
+
+
+    # WHOLE CATEGORY
+    async def run(self, crawler):
+        metrics.SITE.set(self.site) # Label of every metric & log line, the stage tasks inherit it
+        resumed = RESUME and not self.test_mode and await self.resume()
+        # An interrupted in-order crawl resumes in order, incremental crawls stop at known products & need the order
+        if FAN_OUT and not (resumed or self.incremental or self.test_mode):
+            await self.run_all_pages(crawler)
+        else:
+            await self.run_in_order(crawler)
+        log(f"[{self.label}] STOPPING OUTPUT PIPELINE. {self.crawled_page_count} pages ({self.unchanged_page_count} unchanged) at {self.pages_per_minute:.1f} pages/min.",
+            event="pipeline_stopped", label=self.label, pages=self.crawled_page_count, unchanged_pages=self.unchanged_page_count,
+            products=self.product_count, new_products=self.new_product_count, pages_per_minute=round(self.pages_per_minute, 1), failed_page=self.failed_page)
+
+    # PAGE COUNT DISCOVERED UP FRONT, EVERY PAGE FETCHED CONCURRENTLY UNDER THE RATE LIMITER
+    async def run_all_pages(self, crawler, concurrency=FAN_OUT_CONCURRENCY):
+        first_page = self.page_number
+        start_time = time.perf_counter()
+        page_count = await self.crawl_first_page(crawler)
+        self.elapsed += time.perf_counter() - start_time
+        if page_count is None:
+            if self.failed_page is None:
+                self.page_number = first_page + 1 # No pagination to go by, on until an empty page
+                await self.run_in_order(crawler)
+            return
+        limit = asyncio.Semaphore(concurrency) # Requests still leave at the rate limiter's pace, this bounds pages in memory
+        start_time = time.perf_counter()
+
+        async def crawl(page_number):
+            async with limit:
+                return await self.crawl_page(crawler, page_number)
+
+        crawled = first_page
+        while page_count > crawled:
+            log(f"[{self.label}] FETCHING PAGES {crawled + 1} TO {page_count} CONCURRENTLY.", event="fan_out", label=self.label, first=crawled + 1, last=page_count)
+            results = await asyncio.gather(*(crawl(page_number) for page_number in range(crawled + 1, page_count + 1)))
+            crawled = page_count
+            # Widgets that link only a few pages ahead: the last page links the next ones
+            if results[-1].success:
+                page_count = max(page_count, pagination.page_count_in_html(self, await self.page_html(results[-1], crawled), crawled) or 0)
+        self.elapsed += time.perf_counter() - start_time
+        if self.failed_page is None:
+            await self.complete()
+
+    # IN ORDER UNTIL AN EMPTY PAGE, STAGES RUNNING CONCURRENTLY
+    async def run_in_order(self, crawler):
+        fetched = asyncio.Queue(maxsize=QUEUE_SIZE)
+        organized = asyncio.Queue(maxsize=QUEUE_SIZE)
+        stop = asyncio.Event()
+        start_time = time.perf_counter()
+        stages = [
+            asyncio.create_task(self.fetch_stage(crawler, fetched, stop)),
+            asyncio.create_task(self.extract_stage(fetched, organized, stop)),
+            asyncio.create_task(self.write_stage(organized))
+            ]
+        try:
+            await asyncio.gather(*stages)
+        finally:
+            for stage in stages: # A failed stage would leave the others waiting on their queues
+                stage.cancel()
+        self.elapsed += time.perf_counter() - start_time
+        if self.failed_page is None:
+            await self.complete()
+
+    async def fetch_stage(self, crawler, fetched, stop):
+        page_number = self.page_number
+        while not stop.is_set():
+            result = await self.fetch(crawler, page_number)
+            await fetched.put((page_number, result)) # Waits here while extraction is behind
+            if self.test_mode:
+                break
+            page_number += 1
+        await fetched.put(None)
+
+    async def extract_stage(self, fetched, organized, stop):
+        while (item := await fetched.get()) is not None:
+            if stop.is_set():
+                continue # Fetched past the end of the category, drain & drop
+            page_number, result = item
+            processed = await self.process(page_number, result)
+            if processed is None:
+                stop.set()
+                continue
+            new_products, page = processed
+            last_page = self.is_last_page(new_products, page) # Before writing, the page's products become known after
+            await organized.put((page_number, new_products, page)) # Waits here while writer is behind
+            if last_page:
+                stop.set()
+        await organized.put(None)
+
+    async def write_stage(self, organized):
+        while (item := await organized.get()) is not None:
+            page_number, new_products, page = item
+            with METRICS.time("write", self.page_timings.get(page_number)):
+                new_count = await self.write(new_products, page, page_number) # aiosqlite runs the transaction off the event loop
+            self.count(page_number, new_products, new_count, page)
+        if self.test_mode:
+            log("TEST MODE SUCCESSFUL. WAIT FOR FINAL LOG", event="test_mode")
+
+
+def restore(pipeline_class, entry, session_id, test_mode):
+    # Unpickled Output_Pipeline in a worker process, only organize() is called on it
+    output_pipeline = pipeline_class.__new__(pipeline_class)
+    Output_Pipeline.__init__(output_pipeline, entry, session_id, page_number=1, delay_time=0, test_mode=test_mode)
+    return output_pipeline
@@ -0,0 +1,110 @@
+"""
+Adaptive per-host rate limiter. Every crawler.arun call goes through Host_Rate_Limiter.fetch.
+Each host has a token bucket whose rate speeds up while responses are fast & healthy,
+and backs off on slow responses, 429 (Too Many Requests), 503 (Service Unavailable) or no response at all
+(connection error or timeout).
+"""
+
+import asyncio, time
+from urllib.parse import urlparse
+from metrics import METRICS, log
+
+## CONTROL VARIABLES
+MIN_RATE = 1 / 60 # Slowest allowed rate (requests per second)
+MAX_RATE = 2.0 # Fastest allowed rate (requests per second)
+BURST = 1 # Bucket capacity, requests that may go out back to back
+SLOW_RESPONSE_TIME = 8.0 # Seconds, anything slower counts as server under load
+SPEED_UP_STEP = 0.05 # Additive increase of rate after a fast & healthy response
+BACK_OFF_FACTOR = 0.5 # Multiplicative decrease of rate after slow/429/503/no response
+BACK_OFF_STATUS = {429, 503}
+MAX_RETRIES = 3 # Retries of a page answered with 429/503
+
+
+class Token_Bucket:
+    def __init__(self, rate, capacity=BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0 # Set by Retry-After
+        self.lock = asyncio.Lock()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        # Waiters queue on the lock, so requests to one host leave in order
+        async with self.lock:
+            pause = self.blocked_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+            self.refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self.refill()
+            self.tokens -= 1
+
+
+class Host_Rate_Limiter:
+    def __init__(self, min_rate=MIN_RATE, max_rate=MAX_RATE):
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.buckets = {}
+
+    def bucket(self, url, initial_interval=None):
+        host = urlparse(url).netloc
+        if host not in self.buckets:
+            # First request to a host starts at the configured polite delay
+            rate = 1 / initial_interval if initial_interval else self.min_rate
+            self.buckets[host] = Token_Bucket(min(max(rate, self.min_rate), self.max_rate))
+        return self.buckets[host]
+
+    # ADAPT RATE TO HOW THE SERVER IS RESPONDING
+    def record(self, bucket, status_code, elapsed, retry_after=None):
+        # status_code None: connection error or timeout, a failing host is not asked faster
+        if status_code is None or status_code in BACK_OFF_STATUS or elapsed > SLOW_RESPONSE_TIME:
+            bucket.rate = max(self.min_rate, bucket.rate * BACK_OFF_FACTOR)
+            bucket.tokens = min(bucket.tokens, 0) # Drop any saved up burst
+            if retry_after:
+                bucket.blocked_until = time.monotonic() + retry_after
+        elif status_code < 400:
+            bucket.rate = min(self.max_rate, bucket.rate + SPEED_UP_STEP)
+
+    def delay(self, url):
+        # Current interval between requests to the host of url, for logs
+        host = urlparse(url).netloc
+        return 1 / self.buckets[host].rate if host in self.buckets else None
+
+    async def fetch(self, crawler, url, config, initial_interval=None, **arun_kwargs):
+        bucket = self.bucket(url, initial_interval)
+        for attempt in range(MAX_RETRIES + 1):
+            with METRICS.time("wait"):
+                await bucket.acquire()
+            start_time = time.perf_counter()
+            result = await crawler.arun(url=url, config=config, **arun_kwargs)
+            elapsed = time.perf_counter() - start_time
+            status_code = getattr(result, "status_code", None)
+            self.record(bucket, status_code, elapsed, retry_after(result))
+            if status_code not in BACK_OFF_STATUS or attempt == MAX_RETRIES:
+                break
+            METRICS.inc("retries", reason="backoff")
+            log(f"STATUS: {status_code} FROM {urlparse(url).netloc}. Backing off to {1 / bucket.rate:.1f}s between requests (retry {attempt + 1}/{MAX_RETRIES}).",
+                event="back_off", host=urlparse(url).netloc, status_code=status_code, interval=round(1 / bucket.rate, 2), attempt=attempt + 1)
+        return result
+
+
+def retry_after(result):
+    headers = getattr(result, "response_headers", None) or {}
+    for key, value in headers.items():
+        if key.lower() == "retry-after":
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                return None # HTTP-date form, rely on the rate back off instead
+    return None
+
+
+# SHARED BY EVERY PIPELINE IN THE PROCESS, SO CONCURRENT CATEGORIES OF ONE HOST SHARE ONE BUCKET
+RATE_LIMITER = Host_Rate_Limiter()
@@ -0,0 +1,119 @@
+"""
+Lightweight per-site render profiles for the browser path.
+Only text and src/href attributes are read through SCHEMA_FOR_EXTRACTION, so images, fonts, media
+and analytics/ad scripts are aborted before they download (blocking does not remove src attributes,
+so image_url still extracts). Pages wait only for the listing container (CSS_SELECTOR) instead of
+the full load event and crawl4ai's image & viewport passes.
+BrowserConfig(text_mode=True) is no substitute, it also disables JavaScript which Vertech needs to render.
+
+A configs module sets RENDER_PROFILE = Render_Profile(...), browser_pool attaches it to every tab,
+get_crawler_config() adds RENDER_PROFILE.run_config(CSS_SELECTOR) to its CrawlerRunConfig.
+
+Usage:: python render_profiles.py compare <configs module> [page number]
+        Load one listing page with & without the site's profile, report bytes and time saved
+"""
+
+import asyncio, importlib, re, sys, time
+
+## CONTROL VARIABLES
+BLOCKED_RESOURCE_TYPES = ("image", "media", "font") # Playwright request.resource_type
+TRACKER_PATTERNS = (
+    r"google-analytics\.com", r"googletagmanager\.com", r"googlesyndication\.com", r"doubleclick\.net",
+    r"adservice\.google\.", r"connect\.facebook\.net", r"facebook\.com/tr", r"hotjar\.com", r"clarity\.ms",
+    r"analytics\.tiktok\.com", r"tawk\.to", r"onesignal\.com", r"pagead", r"/gtag/js",
+)
+WAIT_TIMEOUT = 15_000 # ms to wait for the listing container, past the last page it never appears
+
+
+class Render_Profile:
+    def __init__(self, name, blocked_resource_types=BLOCKED_RESOURCE_TYPES, blocked_patterns=(), block_trackers=True):
+        self.name = name
+        self.blocked_resource_types = frozenset(blocked_resource_types)
+        patterns = [*blocked_patterns, *(TRACKER_PATTERNS if block_trackers else ())]
+        self.blocked_pattern = re.compile("|".join(patterns)) if patterns else None
+        self.pages = set() # Tabs the route handler is attached to
+        self.page_count = 0
+        self.blocked_count = 0
+        self.allowed_count = 0
+
+    def should_block(self, request):
+        if request.resource_type in self.blocked_resource_types:
+            return True
+        return self.blocked_pattern is not None and self.blocked_pattern.search(request.url) is not None
+
+    async def route(self, route):
+        if self.should_block(route.request):
+            self.blocked_count += 1
+            await route.abort()
+        else:
+            self.allowed_count += 1
+            await route.continue_()
+
+    # crawl4ai "on_page_context_created" HOOK, RUNS ON EVERY arun(), ROUTES ONCE PER TAB
+    async def attach(self, page, context=None, **kwargs):
+        self.page_count += 1
+        if page not in self.pages:
+            await page.route("**/*", self.route)
+            page.once("close", lambda closed_page: self.pages.discard(closed_page))
+            self.pages.add(page)
+        return page
+
+    def run_config(self, css_selector):
+        # CrawlerRunConfig keyword arguments
+        return {
+            "wait_until": "domcontentloaded",
+            "wait_for": f"css:{css_selector}" if css_selector else None,
+            "wait_for_timeout": WAIT_TIMEOUT,
+            "wait_for_images": False,
+            "delay_before_return_html": 0,
+        }
+
+    def report(self):
+        per_page = self.blocked_count / self.page_count if self.page_count else 0
+        return f"RENDER PROFILE {self.name}: {self.page_count} pages, {self.blocked_count} requests blocked ({per_page:.1f}/page), {self.allowed_count} allowed."
+
+
+## COMPARE FULL RENDER VS PROFILE
+async def load(browser_config, url, config, render_profile=None):
+    from crawl4ai import AsyncWebCrawler
+    loaded = {"bytes": 0, "requests": 0}
+
+    async def count_bytes(request):
+        sizes = await request.sizes()
+        loaded["bytes"] += sizes["responseBodySize"] + sizes["responseHeadersSize"]
+        loaded["requests"] += 1
+
+    async def on_page(page, context=None, **kwargs):
+        if render_profile is not None:
+            await render_profile.attach(page)
+        page.on("requestfinished", lambda request: asyncio.ensure_future(count_bytes(request)))
+        return page
+
+    async with AsyncWebCrawler(config=browser_config) as crawler:
+        crawler.crawler_strategy.set_hook("on_page_context_created", on_page)
+        start_time = time.perf_counter()
+        result = await crawler.arun(url, config=config)
+        elapsed = time.perf_counter() - start_time
+    return result, elapsed, loaded
+
+async def compare(site_name, page_number=1):
+    site = importlib.import_module(site_name)
+    output_pipeline = site.Output_Pipeline()
+    url = output_pipeline.page_url(page_number)
+    config = output_pipeline.get_crawler_config()
+    full_config = config.clone(wait_for=None, wait_for_images=True, delay_before_return_html=0.1, wait_until="load")
+
+    full, full_time, full_loaded = await load(site.get_browser_config(), url, full_config)
+    light, light_time, light_loaded = await load(site.get_browser_config(), url, config, site.RENDER_PROFILE)
+    same = full.extracted_content == light.extracted_content
+    print(f"{url}")
+    print(f"Full render:    {full_loaded['bytes'] / 1024:.0f} KB in {full_loaded['requests']} requests, {full_time:.2f}s")
+    print(f"Render profile: {light_loaded['bytes'] / 1024:.0f} KB in {light_loaded['requests']} requests, {light_time:.2f}s")
+    print(f"Saved per page: {(full_loaded['bytes'] - light_loaded['bytes']) / 1024:.0f} KB, {full_time - light_time:.2f}s. Same output: {same}")
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ["compare"]:
+        asyncio.run(compare(sys.argv[2], *map(int, sys.argv[3:4])))
+    else:
+        print(__doc__)
@@ -0,0 +1,124 @@
+"""
+Concurrent multi-category crawl scheduler.
+Runs many entries of URLS_TO_CRAWL at once (one Output_Pipeline per category, browser pages share the site's tab pool, see browser_pool.py),
+caps concurrency globally and per host, and prints one merged report at the end.
+
+Usage:: python scheduler.py [configs module name ...]    e.g. python scheduler.py configs configs_startech
+"""
+
+import asyncio, importlib, sys, time
+from contextlib import AsyncExitStack
+from urllib.parse import urlparse
+from dotenv import load_dotenv
+import configs, storage, dedup, http_fetcher, metrics, worker_pool
+from metrics import log
+
+load_dotenv()
+
+
+def entry_url(entry):
+    return entry.get("url") or entry.get("base_url", "")
+
+
+class Crawl_Scheduler:
+    def __init__(self, jobs, max_concurrent=configs.MAX_CONCURRENT_CRAWLS, max_per_host=configs.MAX_CRAWLS_PER_HOST):
+        self.jobs = jobs # List of (configs module, crawl_number)
+        self.global_limit = asyncio.Semaphore(max_concurrent)
+        self.max_per_host = max_per_host
+        self.host_limits = {}
+        self.report = []
+
+    @classmethod
+    def for_sites(cls, sites, **kwargs):
+        # Every category of every given configs module
+        jobs = [(site, crawl_number) for site in sites for crawl_number in range(len(site.URLS_TO_CRAWL))]
+        return cls(jobs, **kwargs)
+
+    def host_limit(self, url):
+        host = urlparse(url).netloc
+        if host not in self.host_limits:
+            self.host_limits[host] = asyncio.Semaphore(self.max_per_host)
+        return self.host_limits[host]
+
+    # CRAWL ONE CATEGORY UNTIL ITS PIPELINE STOPS
+    async def crawl_category(self, crawler, site, crawl_number):
+        entry = site.URLS_TO_CRAWL[crawl_number]
+        output_pipeline = site.Output_Pipeline(
+            crawl_number=crawl_number,
+            session_id=f"{site.SESSION_ID}-{crawl_number}" # Browser tabs come from the pool, see browser_pool.py
+            )
+        status = "COMPLETE"
+        # Host slot first, a category waiting on a busy host mustn't hold a global slot meanwhile
+        async with self.host_limit(entry_url(entry)), self.global_limit:
+            start_time = time.perf_counter()
+            log(f"STATUS: INITIATING CRAWLING. {site.__name__} #{crawl_number} ({output_pipeline.label})", event="category_started", crawl_number=crawl_number, label=output_pipeline.label)
+            try:
+                await output_pipeline.run(crawler=crawler)
+            except Exception as error:
+                status = f"FAILED: {error!r}"
+                log(f"[{output_pipeline.label}] STATUS: {status}", event="category_failed", label=output_pipeline.label, error=repr(error))
+            elapsed = time.perf_counter() - start_time
+        if status == "COMPLETE" and output_pipeline.failed_page is not None:
+            status = f"FAILED AT PAGE {output_pipeline.failed_page}, RESUMABLE" # Other categories carry on
+        if status == "COMPLETE" and output_pipeline.caught_up:
+            status = "UP TO DATE" # Incremental crawl stopped at known products
+
+        result = {
+            "site": site.__name__,
+            "crawl_number": crawl_number,
+            "label": output_pipeline.label,
+            "pages": output_pipeline.crawled_page_count,
+            "unchanged_pages": output_pipeline.unchanged_page_count,
+            "products": output_pipeline.product_count,
+            "new_products": output_pipeline.new_product_count,
+            "seconds": round(elapsed, 1),
+            "pages_per_minute": round(output_pipeline.pages_per_minute, 1),
+            "status": status,
+        }
+        self.report.append(result)
+        return result
+
+    async def run(self):
+        # One browser (or HTTP session) per configs module, shared by all of its categories
+        async with AsyncExitStack() as stack:
+            crawlers = {}
+            for site, _ in self.jobs:
+                if site not in crawlers:
+                    crawlers[site] = await stack.enter_async_context(http_fetcher.get_crawler(site))
+            try:
+                await asyncio.gather(*(
+                    self.crawl_category(crawlers[site], site, crawl_number) for site, crawl_number in self.jobs
+                    ))
+            finally:
+                dedup.save_indexes()
+                await storage.close_stores()
+                worker_pool.POOL.shutdown()
+        self.print_report()
+        return self.report
+
+    # FINAL LOG
+    def print_report(self):
+        log("CRAWLING COMPLETE.", event="crawl_complete")
+        for result in sorted(self.report, key=lambda r: (r["site"], r["crawl_number"])):
+            log(f"{result['site']} #{result['crawl_number']} {result['label']}: "
+                f"{result['pages']} pages ({result['unchanged_pages']} unchanged, {result['pages_per_minute']} pages/min), {result['products']} products ({result['new_products']} new), {result['seconds']}s, {result['status']}",
+                event="category_report", **result)
+        total_pages = sum(result["pages"] for result in self.report)
+        total_products = sum(result["products"] for result in self.report)
+        total_new = sum(result["new_products"] for result in self.report)
+        failed = sum(1 for result in self.report if result["status"].startswith("FAILED"))
+        up_to_date = sum(1 for result in self.report if result["status"] == "UP TO DATE")
+        log(f"Crawled {total_pages} Pages from {len(self.report)} categories ({up_to_date} up to date, {failed} failed).",
+            event="crawl_report", pages=total_pages, categories=len(self.report), up_to_date=up_to_date, failed=failed)
+        log(f"Total {total_products} information added to Database ({total_new} new).", event="crawl_report", products=total_products, new_products=total_new)
+        log(worker_pool.POOL.report(), event="worker_pool", pages=worker_pool.POOL.page_count, batches=worker_pool.POOL.batch_count)
+
+
+async def main(site_names):
+    sites = [importlib.import_module(name) for name in site_names]
+    metrics.configure()
+    async with metrics.exporting():
+        await Crawl_Scheduler.for_sites(sites).run()
+
+if __name__ == '__main__':
+    asyncio.run(main(sys.argv[1:] or ["configs"]))
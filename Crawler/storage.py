@@ -0,0 +1,314 @@
+"""
+SQLite storage for crawled products, shared by every configs module.
+Each crawled page is written as ONE batched transaction, upserting on the product URL,
+so a re-crawl updates rows in place instead of appending duplicates like the CSV writers did.
+Database runs in WAL mode so readers (exports, matching) don't block the crawler.
+
+Usage:: python storage.py import <csv file> <site>    Seed the database from an existing CSV
+        python storage.py export <csv file> [site]    Dump the database (or one site) to CSV
+"""
+
+import asyncio, csv, json, os, sys
+from datetime import datetime, timezone
+import aiosqlite
+
+## CONTROL VARIABLES
+DATABASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Database")
+DB_FILE = os.path.join(DATABASE_DIR, "products.db")
+TEST_DB_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "trials", "test_products.db")
+
+COLUMNS = ["site", "category", "name", "image_url", "description", "price", "url"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    url TEXT PRIMARY KEY, -- Primary key doubles as the URL index
+    site TEXT NOT NULL,
+    category TEXT,
+    name TEXT,
+    image_url TEXT,
+    description TEXT,
+    price TEXT,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_products_site_category ON products(site, category);
+CREATE TABLE IF NOT EXISTS pages ( -- Listing page cache, see page_cache.py
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    html_hash TEXT,
+    content_hash TEXT,
+    product_count INTEGER,
+    checked_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS checkpoints ( -- Crawl progress per category, see Output_Pipeline.resume()
+    site TEXT NOT NULL,
+    entry_url TEXT NOT NULL,
+    next_page INTEGER NOT NULL,
+    product_count INTEGER NOT NULL,
+    new_product_count INTEGER NOT NULL,
+    crawled_page_count INTEGER NOT NULL,
+    unchanged_page_count INTEGER NOT NULL,
+    dedup_cursor INTEGER NOT NULL, -- URL index size after the page, a smaller index on resume missed its save
+    status TEXT NOT NULL, -- running | complete
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (site, entry_url)
+);
+CREATE TABLE IF NOT EXISTS specs ( -- Spec table rows of product detail pages, see detail_crawler.py
+    url TEXT NOT NULL,
+    category TEXT NOT NULL, -- e.g. Display
+    name TEXT NOT NULL, -- e.g. Size
+    value TEXT,
+    PRIMARY KEY (url, category, name)
+);
+CREATE TABLE IF NOT EXISTS detail_pages ( -- Detail crawl progress, a 'done' page is not fetched again
+    url TEXT PRIMARY KEY,
+    status TEXT NOT NULL, -- done | failed
+    spec_count INTEGER NOT NULL,
+    fetched_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS product_links ( -- The same product on another site, see matching.py
+    url TEXT NOT NULL,
+    site TEXT NOT NULL,
+    other_site TEXT NOT NULL,
+    other_url TEXT NOT NULL,
+    score REAL,
+    confidence REAL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (url, other_site)
+);
+"""
+
+PAGE_COLUMNS = ["url", "etag", "last_modified", "html_hash", "content_hash", "product_count", "checked_at"]
+
+UPSERT_PAGE = f"""
+INSERT OR REPLACE INTO pages ({', '.join(PAGE_COLUMNS)}) VALUES ({', '.join('?' * len(PAGE_COLUMNS))})
+"""
+
+CHECKPOINT_COLUMNS = ["site", "entry_url", "next_page", "product_count", "new_product_count", "crawled_page_count",
+                      "unchanged_page_count", "dedup_cursor", "status", "updated_at"]
+
+UPSERT_CHECKPOINT = f"""
+INSERT OR REPLACE INTO checkpoints ({', '.join(CHECKPOINT_COLUMNS)}) VALUES ({', '.join('?' * len(CHECKPOINT_COLUMNS))})
+"""
+
+UPSERT_SPEC = """
+INSERT OR REPLACE INTO specs (url, category, name, value) VALUES (?, ?, ?, ?)
+"""
+
+UPSERT_DETAIL_PAGE = """
+INSERT OR REPLACE INTO detail_pages (url, status, spec_count, fetched_at) VALUES (?, ?, ?, ?)
+"""
+
+LINK_COLUMNS = ["url", "site", "other_site", "other_url", "score", "confidence", "updated_at"]
+
+UPSERT_LINK = f"""
+INSERT OR REPLACE INTO product_links ({', '.join(LINK_COLUMNS)}) VALUES ({', '.join('?' * len(LINK_COLUMNS))})
+"""
+
+UPSERT = """
+INSERT INTO products (site, category, name, image_url, description, price, url, first_seen, last_seen)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(url) DO UPDATE SET
+    site = excluded.site,
+    category = excluded.category,
+    name = excluded.name,
+    image_url = excluded.image_url,
+    description = excluded.description,
+    price = excluded.price,
+    last_seen = excluded.last_seen
+"""
+
+
+def now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def as_text(value):
+    # Lists/dicts (e.g. description features) are kept as JSON
+    if value is None:
+        return ""
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+class Product_Store:
+    def __init__(self, db_file=DB_FILE):
+        self.db_file = db_file
+        self.db = None
+        self.lock = asyncio.Lock() # One transaction at a time on the shared connection
+
+    async def open(self):
+        os.makedirs(os.path.dirname(self.db_file), exist_ok=True)
+        self.db = await aiosqlite.connect(self.db_file)
+        await self.db.execute("PRAGMA journal_mode=WAL")
+        await self.db.execute("PRAGMA synchronous=NORMAL") # Safe with WAL, fsync at checkpoints only
+        await self.db.executescript(SCHEMA)
+        await self.db.commit()
+        return self
+
+    async def close(self):
+        if self.db is not None:
+            await self.db.close()
+            self.db = None
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    # WRITE ONE PAGE, RETURNS NUMBER OF URLS NOT SEEN BEFORE (0 IF count_new IS FALSE)
+    # page: optional pages row, checkpoint: optional checkpoints row, committed in the same transaction as the products
+    async def upsert(self, records, count_new=True, page=None, checkpoint=None):
+        records = [record for record in records if record.get("url")]
+        if not records and page is None and checkpoint is None:
+            return 0
+        timestamp = now()
+        rows = [[as_text(record.get(column)) for column in COLUMNS] + [timestamp, timestamp] for record in records]
+        async with self.lock:
+            try:
+                known = await self._known_urls([record["url"] for record in records]) if count_new else None
+                await self.db.executemany(UPSERT, rows)
+                if page is not None:
+                    await self.db.execute(UPSERT_PAGE, [page.get(column) for column in PAGE_COLUMNS[:-1]] + [timestamp])
+                if checkpoint is not None:
+                    await self.db.execute(UPSERT_CHECKPOINT, [checkpoint.get(column) for column in CHECKPOINT_COLUMNS[:-1]] + [timestamp])
+                await self.db.commit()
+            except BaseException:
+                await self.db.rollback()
+                raise
+        return len({record["url"] for record in records} - known) if count_new else 0
+
+    async def known_urls(self, urls):
+        async with self.lock:
+            return await self._known_urls(urls)
+
+    async def _known_urls(self, urls):
+        urls = list(urls)
+        known = set()
+        for start in range(0, len(urls), 500): # Stay under SQLite's bound-parameter limit
+            chunk = urls[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            async with self.db.execute(f"SELECT url FROM products WHERE url IN ({placeholders})", chunk) as cursor:
+                known.update(row[0] for row in await cursor.fetchall())
+        return known
+
+    async def pages(self):
+        async with self.db.execute(f"SELECT {', '.join(PAGE_COLUMNS)} FROM pages") as cursor:
+            return [dict(zip(PAGE_COLUMNS, row)) for row in await cursor.fetchall()]
+
+    async def checkpoint(self, site, entry_url):
+        query = f"SELECT {', '.join(CHECKPOINT_COLUMNS)} FROM checkpoints WHERE site = ? AND entry_url = ?"
+        async with self.db.execute(query, (site, entry_url)) as cursor:
+            row = await cursor.fetchone()
+        return dict(zip(CHECKPOINT_COLUMNS, row)) if row else None
+
+    async def complete_checkpoint(self, site, entry_url):
+        async with self.lock:
+            await self.db.execute("UPDATE checkpoints SET status = 'complete', updated_at = ? WHERE site = ? AND entry_url = ?", (now(), site, entry_url))
+            await self.db.commit()
+
+    # WRITE A BATCH OF DETAIL PAGES, details: list of (url, status, spec rows) ONE TRANSACTION FOR ALL
+    async def upsert_specs(self, details):
+        timestamp = now()
+        async with self.lock:
+            try:
+                for url, status, specs in details:
+                    if status == "done": # A failed fetch keeps the specs of an earlier run
+                        await self.db.execute("DELETE FROM specs WHERE url = ?", (url,)) # Specs dropped from the page go too
+                        await self.db.executemany(UPSERT_SPEC, [(url, spec["category"], spec["name"], spec["value"]) for spec in specs])
+                    await self.db.execute(UPSERT_DETAIL_PAGE, (url, status, len(specs), timestamp))
+                await self.db.commit()
+            except BaseException:
+                await self.db.rollback()
+                raise
+
+    # WRITE A BATCH OF PRODUCT LINKS (matching.py), ONE ROW PER DIRECTION
+    # A listing linked anew drops the link of its former match on that site
+    async def upsert_links(self, links):
+        if not links:
+            return
+        timestamp = now()
+        async with self.lock:
+            try:
+                await self.db.executemany("DELETE FROM product_links WHERE site = ? AND other_url = ? AND url != ?",
+                                          [(link["other_site"], link["url"], link["other_url"]) for link in links])
+                await self.db.executemany(UPSERT_LINK, [[link.get(column) for column in LINK_COLUMNS[:-1]] + [timestamp] for link in links])
+                await self.db.commit()
+            except BaseException:
+                await self.db.rollback()
+                raise
+
+    async def detail_urls(self, status="done"):
+        async with self.db.execute("SELECT url FROM detail_pages WHERE status = ?", (status,)) as cursor:
+            return {row[0] for row in await cursor.fetchall()}
+
+    async def rows(self, site=None):
+        query = f"SELECT {', '.join(COLUMNS)} FROM products"
+        params = ()
+        if site:
+            query += " WHERE site = ?"
+            params = (site,)
+        async with self.db.execute(query, params) as cursor:
+            async for row in cursor:
+                yield dict(zip(COLUMNS, row))
+
+
+# STORES SHARED BY EVERY PIPELINE IN THE PROCESS, OPENED ON FIRST USE
+STORES = {}
+
+async def get_store(db_file=DB_FILE):
+    if db_file not in STORES:
+        store = await Product_Store(db_file).open()
+        if db_file in STORES: # Concurrent pipelines (scheduler.py), another one opened it meanwhile
+            await store.close()
+        else:
+            STORES[db_file] = store
+    return STORES[db_file]
+
+async def close_stores():
+    while STORES:
+        _, store = STORES.popitem()
+        await store.close()
+
+
+## CSV IMPORT / EXPORT
+async def import_csv(csv_file, site, db_file=DB_FILE, batch_size=1000):
+    # Header names are matched case-insensitively, gsmarena's Brand/Model map to category/name
+    aliases = {"brand": "category", "model": "name"}
+    count = 0
+    async with Product_Store(db_file) as store:
+        with open(csv_file, newline='', encoding='utf-8') as file:
+            batch = []
+            for row in csv.DictReader(file):
+                record = {aliases.get(key.lower(), key.lower()): value for key, value in row.items()}
+                record["site"] = site
+                batch.append(record)
+                if len(batch) >= batch_size:
+                    count += await store.upsert(batch)
+                    batch = []
+            count += await store.upsert(batch)
+    print(f"Imported {count} new products from {csv_file}.")
+
+async def export_csv(csv_file, site=None, db_file=DB_FILE):
+    count = 0
+    async with Product_Store(db_file) as store:
+        with open(csv_file, mode='w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(COLUMNS)
+            async for row in store.rows(site):
+                writer.writerow([row[column] for column in COLUMNS])
+                count += 1
+    print(f"Exported {count} products to {csv_file}.")
+
+
+if __name__ == '__main__':
+    command, arguments = sys.argv[1], sys.argv[2:]
+    if command == "import":
+        asyncio.run(import_csv(*arguments))
+    elif command == "export":
+        asyncio.run(export_csv(*arguments))
+    else:
+        print(__doc__)
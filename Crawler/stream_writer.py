@@ -0,0 +1,89 @@
+"""
+Async buffered CSV writer for crawlers that produce rows page by page.
+Rows are kept in a small buffer and written out when it reaches FLUSH_ROWS or every FLUSH_INTERVAL seconds,
+each flush followed by fsync, so memory stays flat however many pages are crawled and a crash loses
+at most one buffer. File writes run in a worker thread so the event loop keeps crawling meanwhile.
+"""
+
+import asyncio, csv, io, os, time
+
+## CONTROL VARIABLES
+FLUSH_ROWS = 200 # Buffered rows that trigger a flush
+FLUSH_INTERVAL = 10.0 # Seconds, a non-empty buffer is flushed at least this often
+
+
+class Async_Csv_Writer:
+    def __init__(self, csv_file, headers, mode='w', flush_rows=FLUSH_ROWS, flush_interval=FLUSH_INTERVAL):
+        self.csv_file = csv_file
+        self.headers = headers
+        self.mode = mode # 'w' starts a fresh file, 'a' appends (header written only to an empty file)
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.file = None
+        self.buffer = []
+        self.lock = asyncio.Lock() # One flush at a time, rows keep their order
+        self.flusher = None
+        self.row_count = 0
+        self.flush_count = 0
+        self.peak_buffer = 0
+
+    async def open(self):
+        directory = os.path.dirname(self.csv_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = await asyncio.to_thread(open, self.csv_file, self.mode, newline='', encoding='utf-8')
+        if self.file.tell() == 0:
+            self.buffer.append(self.headers)
+        self.flusher = asyncio.create_task(self.flush_periodically())
+        return self
+
+    async def close(self):
+        if self.flusher is not None:
+            # Cancelled under the lock, so never while its flush is writing in the worker thread
+            async with self.lock:
+                self.flusher.cancel()
+            await asyncio.gather(self.flusher, return_exceptions=True)
+            self.flusher = None
+        if self.file is not None:
+            await self.flush()
+            await asyncio.to_thread(self.file.close)
+            self.file = None
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    # ROWS ARE DICTS (MISSING FIELDS WRITTEN EMPTY) OR LISTS IN HEADER ORDER
+    async def write(self, rows):
+        for row in rows:
+            self.buffer.append([row.get(field, "") for field in self.headers] if isinstance(row, dict) else row)
+            self.row_count += 1
+        self.peak_buffer = max(self.peak_buffer, len(self.buffer))
+        if len(self.buffer) >= self.flush_rows:
+            await self.flush()
+
+    async def flush(self):
+        async with self.lock:
+            if not self.buffer:
+                return
+            rows, self.buffer = self.buffer, []
+            text = io.StringIO()
+            csv.writer(text).writerows(rows)
+            await asyncio.to_thread(self.write_through, text.getvalue())
+            self.flush_count += 1
+
+    def write_through(self, text):
+        # Worker thread: write, flush Python's buffer, then fsync to the disk
+        self.file.write(text)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    async def flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def report(self):
+        return f"CSV WRITER: {self.row_count} rows to {self.csv_file} in {self.flush_count} flushes, at most {self.peak_buffer} rows buffered."
@@ -3,11 +3,15 @@ from ryanscomputerbd
 """
 
 import asyncio, os
-from crawl4ai import AsyncWebCrawler, CrawlerRunConfig, BrowserConfig, LLMExtractionStrategy, LLMConfig,  CacheMode
+from crawl4ai import CrawlerRunConfig, BrowserConfig, LLMConfig,  CacheMode
 from dotenv import load_dotenv
 from pydantic import BaseModel, Field
-import json
-import csv
+from rate_limiter import RATE_LIMITER
+from browser_pool import Browser_Pool
+from llm_cache import Cached_LLM_Strategy
+from llm_packing import Chunk_Packer, prompt_tokens, prune_cards
+from dedup import url_key
+from stream_writer import Async_Csv_Writer
 
 load_dotenv()
 
@@ -22,6 +26,12 @@ class Products(BaseModel):
     url : str
 
 
+async def extract_chunk(strategy, url, chunk_number, chunk):
+    # ONE LLM CALL FOR A PACKED CHUNK OF CARDS, crawl4ai's extract() blocks so it runs in a thread
+    blocks = await asyncio.to_thread(strategy.extract, url, chunk_number, chunk)
+    return [block for block in blocks if not block.get("error")]
+
+
 async def crawl_products():
     # initialize config
     browser_config = BrowserConfig(
@@ -30,7 +40,7 @@ async def crawl_products():
         verbose=True # Verbose logging
     )
     
-    llm_extraction_strategy = LLMExtractionStrategy(
+    llm_extraction_strategy = Cached_LLM_Strategy( # Unchanged chunks are answered from llm_cache.py, no tokens
         llm_config = LLMConfig(provider="groq/meta-llama/llama-4-maverick-17b-128e-instruct", api_token=os.getenv("GROQ_API_KEY")),
         schema=Products.model_json_schema(),
         extraction_type='schema',
@@ -39,81 +49,85 @@ async def crawl_products():
         verbose=True 
     )
     
-    session_id = 'product_crawl_session'
+    session_id = 'product_crawl_session' # Prefix, the pool rotates the tab's session ID as it recycles it
 
     # initialize state variables
     page_number = 1 # Start from page 1
-    all_products = [] # List to hold all scraped products
+    product_count = 0 # Products written so far, rows go to the CSV as they are extracted
     seen_names = set() # Set to track unique products
-    delay_time = 60 # Delay between requests to avoid overwhelming the server + Rate limiting
+    delay_time = 60 # Starting interval between requests, adapted per host by RATE_LIMITER
+
+    # Cards from several pages are packed into one LLM call, see llm_packing.py
+    packer = Chunk_Packer(prompt_tokens(llm_extraction_strategy))
+    category_url = "https://www.ryans.com/category/laptop"
+
+    # Buffered, flushed & fsynced every few hundred rows or seconds, see stream_writer.py
+    csv_file = "D:/My Codes/Projects/scraping/MyDeepSeekCrawlProject/products.csv"
+    writer = Async_Csv_Writer(csv_file, headers=list(Products.model_json_schema()["properties"].keys()))
+
+    async def add_products(extracted_data):
+        # Filter for duplicates, keyed on the normalized product URL (falls back to name), and stream them out
+        nonlocal product_count
+        new_products = []
+        for item in extracted_data:
+            key = url_key(item['url']) if item.get('url') else item.get('name')
+            if key not in seen_names:
+                seen_names.add(key)
+                new_products.append(item)
+        await writer.write(new_products)
+        product_count += len(new_products)
+        print(f"LLM call {packer.chunk_count}: Found {len(new_products)} new products, Total so far: {product_count}.")
 
     # Start the crawler, TRY to ensure proper cleanup if crawler fails
     try:
-        async with AsyncWebCrawler(config=browser_config) as crawler:
+        async with writer, Browser_Pool(browser_config, size=1, prefix=session_id) as crawler:
             while True:
-                url = f"https://www.ryans.com/category/laptop?page={page_number}" # URL with pagination
+                url = f"{category_url}?page={page_number}" # URL with pagination
                 css_selector= "[class*='cus-col-2 cus-col-3 cus-col-4 cus-col-5 category-single-product mb-2 context1']" # Only select where class contains this string
 
-                # Crawl the page    
-                result = await crawler.arun(
+                # Crawl the page, paced by the per-host rate limiter, no extraction in the browser
+                result = await RATE_LIMITER.fetch(
+                    crawler=crawler,
+                    initial_interval=delay_time,
                     url=url,
                     config=CrawlerRunConfig(
                     session_id=session_id, # Unique session ID for the crawl
-                    extraction_strategy=llm_extraction_strategy,
-                    css_selector=css_selector,
                     cache_mode=CacheMode.BYPASS
                     )
                 )
-                    
+                if not result.success:
+                    print(f"Error crawling Page {page_number}: {result.error_message}")
+                    break
 
-                # Parse results safely, skip if JSON is invalid
-                try:
-                    extracted_data = json.loads(result.extracted_content)
-                except json.JSONDecodeError:
-                    print(f"Error decoding JSON in Page {page_number}, skipping.")
-                    page_number += 1
-                    continue 
+                # Prune every product card to the fields Products needs
+                cards = prune_cards(result.html, css_selector)
 
                 # Stop if no products found
-                if not extracted_data:
+                if not cards:
                     print(f"No products found in Page {page_number}.")
-                    break 
-                
-                # Append new unique products
-                for item in extracted_data:
-                    all_products.append(item)
-                print(f"Page {page_number}: added {len(extracted_data)} products, Total so far: {len(all_products)}.")
+                    break
 
-                """# Filter for duplicates
-                new_products = []
-                for item in extracted_data:
-                    if item['name'] not in seen_names:
-                        seen_names.add(item['name'])
-                        all_products.append(item)
-                        new_products.append(item)
-
-                print(f"Page {page_number}: Found {len(new_products)} new products.")"""
+                # Extract every chunk these cards filled, the rest waits for the next page
+                chunks = packer.add(cards)
+                print(f"Page {page_number}: {len(cards)} product cards, {len(chunks)} chunks ready for the LLM.")
+                for chunk in chunks:
+                    await add_products(await extract_chunk(llm_extraction_strategy, category_url, packer.chunk_count, chunk))
 
                 page_number +=1
                 
-                print(f"Proceeding to Page after {delay_time} seconds...")
-                await asyncio.sleep(delay_time) # Be polite and avoid overwhelming the server
+                print(f"Proceeding to Page {page_number}, current interval {RATE_LIMITER.delay(url):.1f} seconds...")
 
+            # Last, partly filled chunk
+            chunk = packer.flush()
+            if chunk:
+                await add_products(await extract_chunk(llm_extraction_strategy, category_url, packer.chunk_count, chunk))
 
-    finally: # CSV will be saved even if error occurs
-        await crawler.close()    
-        # Save to CSV once after all pages are crawled
-        csv_file = "D:/My Codes/Projects/scraping/MyDeepSeekCrawlProject/products.csv"
-        with open (csv_file, mode='w', newline='', encoding='utf-8') as file:
-            writer = csv.writer(file)
-            headers = list(Products.model_json_schema()["properties"].keys())
-            writer.writerow(headers)
-            for product in all_products:
-                writer.writerow([product.get(field, "") for field in headers])
 
-        
-        print(f"Saved {len(all_products)} unique products to {csv_file}.")
-        print(f"Tokens used: {llm_extraction_strategy.show_usage()}")
+    finally: # Buffered rows are flushed by the writer's exit even if an error occurs
+        print(f"Saved {product_count} unique products to {csv_file}.")
+        print(writer.report())
+        llm_extraction_strategy.show_usage() # Token usage & LLM cache hits/misses
+        print(packer.report())
 
 
         
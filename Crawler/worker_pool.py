@@ -0,0 +1,143 @@
+"""
+Process pool for the CPU-bound part of a page, so it never blocks the event loop that keeps every fetch going:
+    1. schema extraction of the raw HTML (HTTP fast path, http_fetcher leaves it to the pool) or
+       json.loads of crawl4ai's extracted_content (browser path),
+    2. organize() of the site's Output_Pipeline & normalize.py (pandas),
+    3. dedup URL keys of the products, the pipeline only looks them up in its set.
+Pages from every pipeline running in the process are handed off in batches (up to BATCH_PAGES, or whatever
+arrived within BATCH_WAIT seconds), one pickled round trip per batch instead of per page.
+At most MAX_IN_FLIGHT pages are submitted and not yet returned, further pages wait (backpressure on the fetchers).
+With PROCESS_POOL = False the same code runs inline on the event loop, as it used to.
+"""
+
+import asyncio, json, multiprocessing, os, time
+from concurrent.futures import ProcessPoolExecutor
+
+## CONTROL VARIABLES
+PROCESS_POOL = True # False: extraction & normalization run on the event loop
+WORKERS = os.cpu_count() or 1
+BATCH_PAGES = 8 # Pages sent to a worker in one task
+BATCH_WAIT = 0.005 # Seconds a partial batch waits for more pages
+MAX_IN_FLIGHT = WORKERS * BATCH_PAGES * 2 # Pages submitted & not yet returned, enough to keep every worker busy
+# The pool starts after aiosqlite & archive threads are running, a plain fork could copy a lock one of them holds
+# (sqlite, logging) into the worker & deadlock it. Workers come from a clean server process, pipelines pickle by import.
+START_METHOD = "forkserver" # or "spawn"
+
+
+## IN THE WORKER PROCESS
+SCHEMAS = {} # Schema JSON -> Compiled_Schema, every job carries an unpickled copy of its schema
+
+def compiled_schema(schema):
+    from extraction_engine import Compiled_Schema
+    key = json.dumps(schema, sort_keys=True)
+    if key not in SCHEMAS:
+        SCHEMAS[key] = Compiled_Schema(schema)
+    return SCHEMAS[key]
+
+def warm_up():
+    # Worker initializer, pandas & lxml load before the first batch arrives
+    import normalize, extraction_engine, dedup
+
+def process_page(output_pipeline, url, html, extracted_content, extraction):
+    # extraction: (schema, css_selector) when the HTML still has to be extracted, else extracted_content is crawl4ai's JSON
+    # Returns (extracted_content, products found, products, dedup keys, stage -> seconds)
+    import normalize, dedup
+    timings = {}
+    start_time = time.perf_counter()
+    if extraction is not None:
+        schema, css_selector = extraction
+        extracted_data = compiled_schema(schema).extract(html, css_selector)
+        extracted_content = json.dumps(extracted_data, ensure_ascii=False)
+        timings["extraction"] = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+    else:
+        extracted_data = json.loads(extracted_content)
+    products = normalize.normalize_records(output_pipeline.organize(extracted_data), base_url=url) if extracted_data else []
+    keys = [dedup.url_key(product.get("url", "")) for product in products]
+    timings["normalization"] = time.perf_counter() - start_time
+    return extracted_content, bool(extracted_data), products, keys, timings
+
+def process_pages(jobs):
+    # A failing page fails only its own pipeline, not the others sharing the batch
+    results = []
+    for job in jobs:
+        try:
+            results.append(process_page(*job))
+        except Exception as error:
+            results.append(error)
+    return results
+
+
+## ON THE EVENT LOOP
+class Worker_Pool:
+    def __init__(self, workers=WORKERS, batch_pages=BATCH_PAGES, batch_wait=BATCH_WAIT, max_in_flight=MAX_IN_FLIGHT):
+        self.workers = workers
+        self.batch_pages = batch_pages
+        self.batch_wait = batch_wait
+        self.max_in_flight = max_in_flight
+        self.executor = None # Started on the first page, shut down at exit
+        self.loop = None
+        self.slots = None # Semaphore of max_in_flight pages, one per event loop
+        self.batch = [] # (job, future) waiting to be sent
+        self.timer = None
+        self.page_count = 0
+        self.batch_count = 0
+
+    async def process(self, output_pipeline, url, html, extracted_content, extraction=None):
+        job = (output_pipeline, url, html, extracted_content, extraction)
+        if not PROCESS_POOL:
+            return process_page(*job)
+        loop = asyncio.get_running_loop()
+        if loop is not self.loop:
+            self.loop, self.slots, self.batch, self.timer = loop, asyncio.Semaphore(self.max_in_flight), [], None
+        async with self.slots:
+            future = loop.create_future()
+            self.batch.append((job, future))
+            if len(self.batch) >= self.batch_pages:
+                self.send()
+            elif self.timer is None:
+                self.timer = loop.call_later(self.batch_wait, self.send)
+            return await future
+
+    def send(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        batch, self.batch = self.batch, []
+        batch = [(job, future) for job, future in batch if not future.cancelled()]
+        if not batch:
+            return
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=warm_up,
+                                                mp_context=multiprocessing.get_context(START_METHOD))
+        task = self.loop.run_in_executor(self.executor, process_pages, [job for job, _ in batch])
+        task.add_done_callback(lambda done: self.resolve(batch, done))
+        self.page_count += len(batch)
+        self.batch_count += 1
+
+    def resolve(self, batch, done):
+        if done.cancelled():
+            for _, future in batch:
+                future.cancel()
+            return
+        error = done.exception()
+        results = [None] * len(batch) if error else done.result()
+        for (_, future), result in zip(batch, results):
+            if future.done(): # Its pipeline was cancelled meanwhile
+                continue
+            if error or isinstance(result, Exception):
+                future.set_exception(error or result)
+            else:
+                future.set_result(result)
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+    def report(self):
+        return f"WORKER POOL: {self.page_count} pages in {self.batch_count} batches on {self.workers} processes."
+
+
+# SHARED BY EVERY PIPELINE IN THE PROCESS
+POOL = Worker_Pool()